@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Benchmark JVM startup time saved by AppCDS archives (`jvm.cds`).
+
+Two modes:
+
+* Default (no --project): start Mars.jar on a trivial MIPS program (exit
+  syscall only) --runs times with and without the cached archive, so the
+  numbers are almost pure JVM startup. Builds the archive first if needed.
+* --project <zip_dir|zip|project_dir>: run the real pipeline on the first
+  --cases cases for every compiler instance, once with AppCDS disabled and
+  once enabled, and report compile + Mars stage time saved per case.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.cds import TrainingRun, archive_flags, get_cds_cache  # noqa: E402
+from src.commands import stage_jvm_options  # noqa: E402
+from src.config import get_config  # noqa: E402
+from src.discovery import TestDiscovery  # noqa: E402
+from src.models import TestCase  # noqa: E402
+from src.process import run_process  # noqa: E402
+
+TRIVIAL_MIPS = "li $v0, 10\nsyscall\n"
+
+
+def _collect_cases(match: Optional[List[str]]) -> List[TestCase]:
+    testcases_dir = ROOT_DIR / "testcases"
+    cases: List[TestCase] = []
+    for lib in TestDiscovery.discover_test_libs(testcases_dir):
+        rel = lib.relative_to(testcases_dir)
+        for case in TestDiscovery.discover_in_dir(lib):
+            if str(rel) != ".":
+                case.name = f"{rel}/{case.name}"
+            cases.append(case)
+    if match:
+        lowered = [m.lower() for m in match if m]
+        cases = [c for c in cases if any(m in c.name.lower() for m in lowered)]
+    return cases
+
+
+def _time_runs(cmd: List[str], cwd: Path, runs: int) -> List[int]:
+    run_process(cmd, cwd=str(cwd), timeout=60)  # warmup (page cache)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run_process(cmd, cwd=str(cwd), timeout=60)
+        samples.append(int((time.perf_counter() - start) * 1000))
+    return samples
+
+
+def _bench_mars(runs: int) -> int:
+    config = get_config()
+    mars_jar = Path(config.mars_jar)
+    if not mars_jar.is_absolute():
+        mars_jar = (ROOT_DIR / mars_jar).resolve()
+    if not mars_jar.exists():
+        print(f"Mars jar not found: {mars_jar}", file=sys.stderr)
+        return 1
+
+    java = config.tools.get_java()
+    cds_dir = Path(config.jvm.cds_dir)
+    cache = get_cds_cache(cds_dir if cds_dir.is_absolute() else ROOT_DIR / cds_dir)
+    info = cache.jdk_info(java)
+    if info is None:
+        print(f"Cannot run '{java} -version'", file=sys.stderr)
+        return 1
+
+    with tempfile.TemporaryDirectory(prefix="bench_cds_") as tmp:
+        work = Path(tmp)
+        mips = work / "mips.txt"
+        mips.write_text(TRIVIAL_MIPS, encoding="utf-8")
+
+        start = time.perf_counter()
+        archive, msg = cache.ensure(java, mars_jar, [TrainingRun(["nc", str(mips)], work)], config.timeout.mars)
+        if msg:
+            print(f"{mars_jar.name}: {msg} ({time.perf_counter() - start:.1f}s)")
+        if archive is None:
+            return 1
+
+        base = [java] + stage_jvm_options(config, "mars")
+        tail = ["-jar", str(mars_jar), "nc", str(mips)]
+        variants: Dict[str, List[str]] = {
+            "no-cds": base + tail,
+            "cds": base + archive_flags(archive) + tail,
+        }
+        print(f"Mars startup, {runs} run(s) each, JDK {info[1]}, flags {base[1:]}")
+        medians = {}
+        for label, cmd in variants.items():
+            samples = _time_runs(cmd, work, runs)
+            medians[label] = statistics.median(samples)
+            print(f"  {label:<8} median {medians[label]:7.1f} ms  min {min(samples):5d} ms  max {max(samples):5d} ms")
+    saved = medians["no-cds"] - medians["cds"]
+    print(f"  saved per Mars invocation: {saved:.1f} ms ({saved / medians['no-cds'] * 100:.1f}%)")
+    return 0
+
+
+def _bench_pipeline(project: Path, cases: List[TestCase], count: int) -> int:
+    from src.cli import build_testers
+    from src.multi_runner import compile_testers
+
+    config = get_config()
+    testers = build_testers(project, ROOT_DIR, None)
+    if not testers:
+        return 1
+    compiled = compile_testers(testers, max_workers=config.parallel.max_workers)
+    ok_testers = [t for t in testers if compiled.get(t.instance_name, (False, ""))[0]]
+    if not ok_testers:
+        print("compile failed", file=sys.stderr)
+        return 1
+
+    cases = cases[:count]
+    print(f"Pipeline stage times over {len(cases)} case(s), sequential")
+    for tester in ok_testers:
+        config.jvm.cds = True
+        for msg in tester.prepare_jvm_archives(cases):
+            print(f"  {msg}")
+        per_mode: Dict[str, List[int]] = {}
+        for label, enabled in (("no-cds", False), ("cds", True)):
+            config.jvm.cds = enabled
+            tester.test_case(cases[0])  # warmup
+            totals = []
+            for case in cases:
+                result = tester.test_case(case)
+                stages = result.stage_times_ms or {}
+                totals.append(stages.get("compile", 0) + stages.get("mars", 0))
+            per_mode[label] = totals
+        no_cds = statistics.mean(per_mode["no-cds"])
+        cds = statistics.mean(per_mode["cds"])
+        print(
+            f"  [{tester.instance_name}] compile+mars per case: no-cds {no_cds:7.1f} ms, "
+            f"cds {cds:7.1f} ms, saved {no_cds - cds:6.1f} ms/case"
+        )
+        tester.cleanup_workers()
+    return 0
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="bench_cds.py", description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Mars startups per variant (default: 10)")
+    parser.add_argument("--project", help="Benchmark the real pipeline with this zip dir / zip / project dir")
+    parser.add_argument("--match", action="append", help="Only use cases whose name contains this substring")
+    parser.add_argument("--cases", type=int, default=20, help="Cases per variant for --project (default: 20)")
+    args = parser.parse_args(argv)
+
+    if not args.project:
+        return _bench_mars(max(1, args.runs))
+
+    cases = _collect_cases(args.match)
+    if not cases:
+        print("No testcases found", file=sys.stderr)
+        return 1
+    return _bench_pipeline(Path(args.project).resolve(), cases, max(1, args.cases))
+
+
+if __name__ == "__main__":
+    os.chdir(ROOT_DIR)
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Benchmark worker-dir placement (`work_root`) on the full testcase corpus.
+
+Two modes:
+
+* Default (no --project): replay the per-case file traffic of the test
+  pipeline (stage testfile.txt, write mips.txt and InstructionStatistics.txt,
+  read the statistics back) for every case under ./testcases, once per
+  candidate root. Needs no JDK.
+* --project <zip_dir|zip|project_dir>: run the real pipeline (compiler + Mars
+  + comparison) over the selected cases once per candidate root and report
+  wall time and cases/s.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.config import get_config  # noqa: E402
+from src.discovery import TestDiscovery  # noqa: E402
+from src.models import TestCase  # noqa: E402
+from src.utils import place_text_file, read_file_safe  # noqa: E402
+
+
+def _collect_cases(match: Optional[List[str]]) -> List[TestCase]:
+    testcases_dir = ROOT_DIR / "testcases"
+    cases: List[TestCase] = []
+    for lib in TestDiscovery.discover_test_libs(testcases_dir):
+        rel = lib.relative_to(testcases_dir)
+        for case in TestDiscovery.discover_in_dir(lib):
+            if str(rel) != ".":
+                case.name = f"{rel}/{case.name}"
+            cases.append(case)
+    if match:
+        lowered = [m.lower() for m in match if m]
+        cases = [c for c in cases if any(m in c.name.lower() for m in lowered)]
+    return cases
+
+
+def _candidate_roots(raw: List[str]) -> Dict[str, str]:
+    """label -> work_root value ("" means the persistent default)."""
+    roots: Dict[str, str] = {}
+    for value in raw:
+        if value in ("", "default"):
+            roots["default(.tmp/compilers)"] = ""
+        else:
+            roots[value] = value
+    return roots
+
+
+def _replay_io(cases: List[TestCase], worker_dir: Path, rounds: int) -> float:
+    """Replay the file traffic of one pipeline pass per case; returns seconds."""
+    worker_dir.mkdir(parents=True, exist_ok=True)
+    testfile = worker_dir / "testfile.txt"
+    mips = worker_dir / "mips.txt"
+    stats = worker_dir / "InstructionStatistics.txt"
+    stats_body = "Division (div): 10\nMultiply (mul): 10\nJump/Branch: 100\nMemory: 100\nOthers: 1000\n"
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for case in cases:
+            place_text_file(case.testfile, testfile)
+            if mips.exists():
+                mips.unlink()
+            # mips.txt is typically several times larger than the source.
+            size = max(1, testfile.stat().st_size) * 6
+            with open(mips, "wb") as f:
+                f.write(b"\t# generated\n" * (size // 13 + 1))
+            if stats.exists():
+                stats.unlink()
+            stats.write_text(stats_body, encoding="utf-8")
+            read_file_safe(stats)
+    return time.perf_counter() - start
+
+
+def _bench_io(cases: List[TestCase], roots: Dict[str, str], rounds: int) -> int:
+    print(f"Replaying file traffic for {len(cases)} case(s) x {rounds} round(s)")
+    results = []
+    for label, value in roots.items():
+        if value == "":
+            base = ROOT_DIR / ".tmp" / "bench_work_root"
+        elif value.lower() == "auto":
+            base = Path("/dev/shm") if Path("/dev/shm").is_dir() else None
+        else:
+            base = Path(value)
+        if base is None or (value and not base.is_dir()):
+            print(f"  {label:<28} unavailable, skipped")
+            continue
+        base.mkdir(parents=True, exist_ok=True)
+        worker_dir = Path(tempfile.mkdtemp(prefix="bench_worker_", dir=str(base)))
+        try:
+            elapsed = _replay_io(cases, worker_dir, rounds)
+        finally:
+            shutil.rmtree(worker_dir, ignore_errors=True)
+        per_case_us = elapsed / max(1, len(cases) * rounds) * 1e6
+        results.append((label, elapsed, per_case_us))
+        print(f"  {label:<28} {elapsed:8.3f}s  {per_case_us:8.1f} us/case")
+
+    if len(results) > 1:
+        baseline = results[0][1]
+        for label, elapsed, _ in results[1:]:
+            if elapsed > 0:
+                print(f"  speedup {label} vs {results[0][0]}: {baseline / elapsed:.2f}x")
+    return 0
+
+
+def _bench_pipeline(project: Path, cases: List[TestCase], roots: Dict[str, str], workers: int) -> int:
+    from src.cli import build_testers
+    from src.multi_runner import compile_testers, test_multi
+
+    config = get_config()
+    workers = workers or config.parallel.max_workers
+    print(f"Full pipeline run: {len(cases)} case(s), {workers} worker(s)")
+    for label, value in roots.items():
+        config.work_root = value
+        testers = build_testers(project, ROOT_DIR, None)
+        if not testers:
+            print(f"  {label:<28} no compiler instance found")
+            return 1
+        compiled = compile_testers(testers, max_workers=workers)
+        ok_testers = [t for t in testers if compiled.get(t.instance_name, (False, ""))[0]]
+        if not ok_testers:
+            print(f"  {label:<28} compile failed")
+            return 1
+        start = time.perf_counter()
+        results = test_multi(ok_testers, cases, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        passed = sum(1 for _, _, r in results if r.passed)
+        roots_used = sorted({str(t.worker_root) for t in ok_testers})
+        print(
+            f"  {label:<28} {elapsed:8.2f}s  {len(results) / elapsed if elapsed else 0:7.1f} cases/s  "
+            f"passed={passed}/{len(results)}  worker_root={', '.join(roots_used)}"
+        )
+        for t in ok_testers:
+            t.cleanup_workers()
+    return 0
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="bench_work_root.py", description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--root",
+        action="append",
+        help="work_root value to compare; 'default' for .tmp/compilers (default: default + auto)",
+    )
+    parser.add_argument("--project", help="Run the real pipeline with this zip dir / zip / project dir")
+    parser.add_argument("--match", action="append", help="Only use cases whose name contains this substring")
+    parser.add_argument("--rounds", type=int, default=3, help="I/O replay rounds (default: 3)")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="Workers for --project (default: config)")
+    args = parser.parse_args(argv)
+
+    cases = _collect_cases(args.match)
+    if not cases:
+        print("No testcases found", file=sys.stderr)
+        return 1
+    roots = _candidate_roots(args.root or ["default", "auto"])
+
+    if args.project:
+        return _bench_pipeline(Path(args.project).resolve(), cases, roots, args.jobs)
+    return _bench_io(cases, roots, max(1, args.rounds))
+
+
+if __name__ == "__main__":
+    os.chdir(ROOT_DIR)
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,234 @@
+"""
+无界面批量生成 - 并发运行多个 Agent 会话，每个会话生成一个测试用例
+
+- 每个会话使用独立的 AgentClient 与 SysYToolServer（独立工作目录），互不覆盖
+- 并发数由信号量限制；限流 / 过载由 AgentClient 退避重试
+- 模型不能直接保存（不提供 save_testcase）；会话结束时最近一次 run_compiler 成功且输出与 g++ 一致，
+  才由本模块按顺序分配编号保存到目标测试库
+"""
+import asyncio
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from .client import AgentClient, AgentConfig, Message, UsageStats
+from .server import SysYToolServer
+
+_BATCH_INSTRUCTION = """
+
+（这是无人值守的批量任务，不会有人回复你。请直接完成：生成代码与输入数据，调用 run_compiler，\
+根据输出修改直到编译通过且 Mars 输出与 g++ 输出一致，然后简要说明用例测试的内容并结束。\
+无需也无法保存，由程序自动保存；实在无法完成时调用 discard_case。）"""
+
+_SOURCE_PROMPT = "请将以下代码（{name}）改写为符合 SysY 文法的测试用例：\n\n```\n{code}\n```"
+_SOURCE_SUFFIXES = {".c", ".cc", ".cpp", ".cxx", ".h", ".java", ".py", ".sy", ".txt"}
+
+
+@dataclass
+class BatchTask:
+    """一个会话的输入"""
+    index: int
+    label: str
+    prompt: str
+
+
+@dataclass
+class BatchOutcome:
+    """一个会话的结果"""
+    task: BatchTask
+    status: str  # saved / discarded / rejected / error / timeout
+    detail: str = ""
+    elapsed_s: float = 0.0
+    usage: UsageStats = field(default_factory=UsageStats)
+
+
+def load_tasks(prompts_file: Optional[Path], sources: Optional[List[Path]]) -> List[BatchTask]:
+    """读取提示词文件（每行一条，# 开头为注释）与源代码文件 / 目录"""
+    tasks: List[BatchTask] = []
+    if prompts_file is not None:
+        for lineno, line in enumerate(prompts_file.read_text(encoding="utf-8").splitlines(), 1):
+            line = line.strip()
+            if line and not line.startswith("#"):
+                tasks.append(BatchTask(len(tasks), f"{prompts_file.name}:{lineno}", line))
+    for source in sources or []:
+        files = sorted(f for f in source.rglob("*") if f.is_file()) if source.is_dir() else [source]
+        for path in files:
+            if path.suffix.lower() not in _SOURCE_SUFFIXES:
+                continue
+            code = path.read_text(encoding="utf-8", errors="replace").strip()
+            if code:
+                tasks.append(BatchTask(len(tasks), path.name, _SOURCE_PROMPT.format(name=path.name, code=code)))
+    return tasks
+
+
+class BatchRunner:
+    """并发运行批量会话并把通过的用例保存到 lib_name"""
+
+    def __init__(self, test_dir: Path, agent_config: AgentConfig, config, lib_name: str,
+                 jobs: int = 4, timeout_s: float = 600.0, verbose: bool = False):
+        self.test_dir = test_dir
+        self.agent_config = agent_config
+        self.config = config
+        self.lib_name = lib_name
+        self.jobs = max(1, jobs)
+        self.timeout_s = timeout_s
+        self.verbose = verbose
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.run_dir = test_dir / ".tmp" / "agent_batch" / stamp
+        self.lib_path = test_dir / "testcases" / lib_name
+        self._save_lock = asyncio.Lock()
+        self._next_number: Optional[int] = None
+
+    async def run(self, tasks: List[BatchTask]) -> List[BatchOutcome]:
+        semaphore = asyncio.Semaphore(self.jobs)
+
+        async def guarded(task: BatchTask) -> BatchOutcome:
+            async with semaphore:
+                return await self._run_session(task)
+
+        return list(await asyncio.gather(*(guarded(t) for t in tasks)))
+
+    async def _run_session(self, task: BatchTask) -> BatchOutcome:
+        work_dir = self.run_dir / f"{task.index:04d}"
+        server = SysYToolServer.from_config(self.test_dir, self.config, work_dir=work_dir, allow_save=False)
+        client = AgentClient(self.agent_config, server)
+        transcript: List[str] = []
+
+        def on_message(msg: Message):
+            if msg.role == "assistant_delta":
+                return
+            line = f"[{msg.role}] {msg.content}"
+            if msg.tool_args:
+                line += "\n" + json.dumps(msg.tool_args, ensure_ascii=False, indent=2)
+            transcript.append(line)
+            if self.verbose and msg.role in ("tool_call", "system"):
+                print(f"  [{task.label}] {msg.content.splitlines()[0] if msg.content else msg.role}", flush=True)
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(client.chat(task.prompt + _BATCH_INSTRUCTION, on_message), self.timeout_s)
+            outcome = await self._judge(task, client, server)
+        except asyncio.TimeoutError:
+            client.stop()
+            outcome = BatchOutcome(task, "timeout", f"超过 {self.timeout_s:.0f}s")
+        except Exception as e:
+            outcome = BatchOutcome(task, "error", str(e))
+        finally:
+            await client.aclose()
+            server.close()
+        outcome.elapsed_s = time.monotonic() - started
+        outcome.usage = client.usage
+        (work_dir / "transcript.txt").write_text("\n\n".join(transcript), encoding="utf-8")
+        return outcome
+
+    async def _judge(self, task: BatchTask, client: AgentClient, server: SysYToolServer) -> BatchOutcome:
+        if client.last_error:
+            return BatchOutcome(task, "error", client.last_error)
+        if server.current_testfile is None:
+            return BatchOutcome(task, "discarded", "模型放弃了该用例")
+        run = server.last_run
+        if run is None or not run.success:
+            return BatchOutcome(task, "rejected", "最近一次编译未通过" if run else "未运行编译器")
+        if not (run.data or {}).get("matched"):
+            return BatchOutcome(task, "rejected", "Mars 输出与 g++ 不一致")
+        async with self._save_lock:
+            number = self._allocate_number()
+            result = server._save_testcase(self.lib_name, number)
+        return BatchOutcome(task, "saved" if result.success else "error", result.message)
+
+    def _allocate_number(self) -> int:
+        """分配下一个未使用的 testcase 编号（在保存锁内调用）"""
+        if self._next_number is None:
+            used = [0]
+            if self.lib_path.is_dir():
+                for child in self.lib_path.iterdir():
+                    match = re.fullmatch(r"testcase(\d+)", child.name)
+                    if match and child.is_dir():
+                        used.append(int(match.group(1)))
+            self._next_number = max(used) + 1
+        number = self._next_number
+        self._next_number += 1
+        return number
+
+
+def format_summary(outcomes: List[BatchOutcome], elapsed_s: float, jobs: int) -> List[str]:
+    """吞吐汇总"""
+    counts = {}
+    for o in outcomes:
+        counts[o.status] = counts.get(o.status, 0) + 1
+    saved = counts.get("saved", 0)
+    total = UsageStats()
+    for o in outcomes:
+        for name in ("requests", "input_tokens", "output_tokens", "cache_write_tokens",
+                     "cache_read_tokens", "retries", "hit_requests"):
+            setattr(total, name, getattr(total, name) + getattr(o.usage, name))
+    busy = sum(o.elapsed_s for o in outcomes)
+    lines = [
+        f"会话 {len(outcomes)} 个（并发 {jobs}），耗时 {elapsed_s:.1f}s",
+        "  " + "  ".join(f"{status} {n}" for status, n in sorted(counts.items())),
+        f"  保存 {saved} 个用例，{saved / elapsed_s * 60 if elapsed_s else 0:.1f} 个/分钟；"
+        f"平均每个会话 {busy / len(outcomes) if outcomes else 0:.1f}s，并发加速 {busy / elapsed_s if elapsed_s else 0:.1f}x",
+        f"  API 请求 {total.requests} 次，重试 {total.retries} 次，输出 {total.output_tokens} tokens",
+    ]
+    if total.requests:
+        lines.append("  " + total.summary())
+    return lines
+
+
+def run_agent_batch_cli(
+    prompts: Optional[str],
+    sources: Optional[List[str]],
+    lib_name: str,
+    jobs: int,
+    timeout_s: float,
+    agent_config_path: Optional[str],
+    verbose: bool = False,
+) -> int:
+    """命令行模式：批量生成测试用例"""
+    from ..cli import format_output
+    from ..config import get_config
+    from .client import httpx
+
+    test_dir = Path(__file__).parent.parent.parent.resolve()
+    if httpx is None:
+        print(format_output("ERROR", "请安装 httpx 库 (pip install httpx)"))
+        return 1
+
+    config_path = Path(agent_config_path) if agent_config_path else test_dir / "agent_config.json"
+    try:
+        agent_config = AgentConfig.from_dict(json.loads(config_path.read_text(encoding="utf-8")))
+    except (OSError, ValueError) as e:
+        print(format_output("ERROR", f"读取 Agent 配置失败 ({config_path}): {e}"))
+        return 1
+    if not agent_config.api_key:
+        print(format_output("ERROR", f"请在 {config_path} 中设置 api_key"))
+        return 1
+
+    if not (test_dir / ".tmp" / "Compiler.jar").exists():
+        print(format_output("WARN", "未找到 .tmp/Compiler.jar，请先在「测试运行」页或命令行编译你的编译器"))
+
+    tasks = load_tasks(Path(prompts) if prompts else None, [Path(s) for s in sources or []])
+    if not tasks:
+        print(format_output("WARN", "没有可运行的提示词或源文件"))
+        return 1
+
+    runner = BatchRunner(test_dir, agent_config, get_config(), lib_name,
+                         jobs=jobs, timeout_s=timeout_s, verbose=verbose)
+    print(format_output("INFO", f"批量生成: {len(tasks)} 个会话，并发 {runner.jobs}，保存到 testcases/{lib_name}"))
+    print(format_output("INFO", f"会话记录: {runner.run_dir}"))
+
+    started = time.monotonic()
+    outcomes = asyncio.run(runner.run(tasks))
+    elapsed = time.monotonic() - started
+
+    for o in outcomes:
+        level = "PASS" if o.status == "saved" else "WARN" if o.status in ("discarded", "rejected") else "ERROR"
+        detail = o.detail.splitlines()[0] if o.detail else ""
+        print(format_output(level, f"[{o.task.label}] {o.status} ({o.elapsed_s:.0f}s) {detail}"))
+    for line in format_summary(outcomes, elapsed, runner.jobs):
+        print(line)
+    return 0 if any(o.status == "saved" for o in outcomes) else 1
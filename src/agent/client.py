@@ -2,8 +2,10 @@
 Agent Client - 连接 LLM 与 MCP 工具
 """
 import json
+import time
+import random
 import asyncio
-from typing import Callable, Optional, AsyncGenerator
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -12,6 +14,13 @@ try:
 except ImportError:
     httpx = None
 
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+from .context import compact_messages, estimate_tokens
 from .server import SysYToolServer, ToolResult
 
 
@@ -21,20 +30,103 @@ class AgentConfig:
     base_url: str
     api_key: str
     model: str
+    # 将系统提示词与工具定义标记为可缓存（prompt caching）
+    prompt_cache: bool = True
+    # 在系统提示词后附带 skill 中的完整文法参考（随静态前缀一起缓存）
+    include_grammar: bool = False
+    # 对话历史（messages）的估算 token 上限，超出时丢弃最早的轮次；0 表示不限制
+    context_budget: int = 24000
     
     @classmethod
     def from_dict(cls, data: dict) -> 'AgentConfig':
         return cls(
             base_url=data.get("base_url", "https://api.anthropic.com"),
             api_key=data.get("api_key", ""),
-            model=data.get("model", "claude-sonnet-4-20250514")
+            model=data.get("model", "claude-sonnet-4-20250514"),
+            prompt_cache=bool(data.get("prompt_cache", True)),
+            include_grammar=bool(data.get("include_grammar", False)),
+            context_budget=int(data.get("context_budget", 24000))
         )
 
 
+class RetryableError(Exception):
+    """限流 / 过载等可重试的 HTTP 错误"""
+    
+    def __init__(self, status: int, text: str, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}: {text}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+@dataclass
+class UsageStats:
+    """会话级 token 用量与缓存命中统计"""
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_write_tokens: int = 0
+    cache_read_tokens: int = 0
+    # 因限流 / 过载重试的次数
+    retries: int = 0
+    # 首个 token 延迟：按是否命中缓存分别累计
+    hit_requests: int = 0
+    hit_ttft_ms: float = 0.0
+    miss_ttft_ms: float = 0.0
+    
+    # 相对普通输入 token 的计费倍率
+    CACHE_WRITE_RATE = 1.25
+    CACHE_READ_RATE = 0.1
+    
+    def record(self, usage: dict, ttft_ms: Optional[float]) -> None:
+        read = usage.get("cache_read_input_tokens") or 0
+        self.requests += 1
+        self.input_tokens += usage.get("input_tokens") or 0
+        self.output_tokens += usage.get("output_tokens") or 0
+        self.cache_write_tokens += usage.get("cache_creation_input_tokens") or 0
+        self.cache_read_tokens += read
+        if read:
+            self.hit_requests += 1
+        if ttft_ms is not None:
+            if read:
+                self.hit_ttft_ms += ttft_ms
+            else:
+                self.miss_ttft_ms += ttft_ms
+    
+    @property
+    def prompt_tokens(self) -> int:
+        """不使用缓存时应计费的输入 token 数"""
+        return self.input_tokens + self.cache_write_tokens + self.cache_read_tokens
+    
+    @property
+    def savings_ratio(self) -> float:
+        """输入 token 费用节省比例（写缓存的额外费用计为负）"""
+        total = self.prompt_tokens
+        if not total:
+            return 0.0
+        saved = (self.cache_read_tokens * (1 - self.CACHE_READ_RATE)
+                 - self.cache_write_tokens * (self.CACHE_WRITE_RATE - 1))
+        return saved / total
+    
+    def summary(self) -> str:
+        if not self.requests:
+            return ""
+        text = (f"缓存命中 {self.hit_requests}/{self.requests} 次，读取 {self.cache_read_tokens} / "
+                f"写入 {self.cache_write_tokens} / 未缓存 {self.input_tokens} tokens，"
+                f"输入费用节省 {self.savings_ratio * 100:.0f}%")
+        misses = self.requests - self.hit_requests
+        if self.hit_requests and misses:
+            hit = self.hit_ttft_ms / self.hit_requests
+            miss = self.miss_ttft_ms / misses
+            text += f"，首 token {hit:.0f} ms（未命中 {miss:.0f} ms）"
+        return text
+
+
 @dataclass
 class Message:
     """消息"""
-    role: str  # user, assistant, system, tool_call, tool_result
+    # user, assistant, assistant_delta（流式文本片段，随后以完整的 assistant 消息结束）,
+    # system, tool_call, tool_result
+    role: str
     content: str
     tool_name: Optional[str] = None
     tool_args: Optional[dict] = None
@@ -117,20 +209,94 @@ class AgentClient:
 - 编译错误时仔细阅读编译器输出，针对性修改
 - 用中文回复用户"""
 
+    # 请求超时（秒）：连接 / 两次读取之间
+    CONNECT_TIMEOUT = 10
+    READ_TIMEOUT = 120
+    # 限流（429）/ 过载（529）/ 5xx 时的重试：优先遵循 retry-after，否则指数退避
+    RETRY_STATUS = {429, 500, 502, 503, 504, 529}
+    MAX_RETRIES = 5
+    MAX_BACKOFF = 60
+
+    # skill 中的文法参考（相对测试目录）
+    GRAMMAR_REFERENCE = Path(".codex") / "skills" / "create-sysy-testcase" / "references" / "sysy_lang_grammar.md"
+
     def __init__(self, config: AgentConfig, tool_server: SysYToolServer):
         self.config = config
         self.tool_server = tool_server
         self.messages = []
         self._stop_flag = False
+        self.usage = UsageStats()
+        self._grammar: Optional[str] = None
+        # 最近一次 chat 中 API 调用失败的原因（成功时为 None）
+        self.last_error: Optional[str] = None
+        # 会话级连接池：同一事件循环内复用（keep-alive，装有 h2 时使用 HTTP/2）
+        self._http: Optional["httpx.AsyncClient"] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
     
     def stop(self):
         """停止当前执行"""
         self._stop_flag = True
     
+    def _get_http(self) -> "httpx.AsyncClient":
+        """取当前事件循环上的 AsyncClient；事件循环变化时重建"""
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http.is_closed or self._http_loop is not loop:
+            self._http = httpx.AsyncClient(
+                http2=_HTTP2,
+                timeout=httpx.Timeout(self.READ_TIMEOUT, connect=self.CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=2, keepalive_expiry=120),
+            )
+            self._http_loop = loop
+        return self._http
+    
+    async def aclose(self):
+        """关闭连接池（须在创建它的事件循环中调用）"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+            self._http_loop = None
+    
     def reset(self):
         """重置对话"""
         self.messages = []
         self._stop_flag = False
+        self.usage = UsageStats()
+    
+    def context_tokens(self) -> int:
+        """对话历史的估算 token 数"""
+        return sum(estimate_tokens(m) for m in self.messages)
+    
+    def _grammar_reference(self) -> str:
+        if self._grammar is None:
+            path = self.tool_server.test_dir / self.GRAMMAR_REFERENCE
+            try:
+                self._grammar = path.read_text(encoding="utf-8")
+            except OSError:
+                self._grammar = ""
+        return self._grammar
+    
+    def _build_request(self) -> dict:
+        """构造请求体；静态前缀（工具定义、系统提示词、文法参考）在末尾打上缓存断点
+        
+        缓存按 tools -> system -> messages 的顺序匹配前缀，因此工具定义与系统提示词各放一个断点，
+        每轮对话只有 messages 部分按原价计费。
+        """
+        system = [{"type": "text", "text": self.SYSTEM_PROMPT}]
+        if self.config.include_grammar and self._grammar_reference():
+            system.append({"type": "text", "text": "## SysY 文法参考\n\n" + self._grammar_reference()})
+        tools = self.tool_server.get_tools_schema()
+        if self.config.prompt_cache:
+            system[-1]["cache_control"] = {"type": "ephemeral"}
+            if tools:
+                tools[-1] = dict(tools[-1], cache_control={"type": "ephemeral"})
+        return {
+            "model": self.config.model,
+            "max_tokens": 4096,
+            "system": system,
+            "messages": self.messages,
+            "tools": tools,
+            "stream": True
+        }
     
     async def chat(self, user_message: str, 
                    on_message: Callable[[Message], None]) -> None:
@@ -150,6 +316,7 @@ class AgentClient:
             return
         
         self._stop_flag = False
+        self.last_error = None
         
         # 添加用户消息
         self.messages.append({
@@ -160,98 +327,234 @@ class AgentClient:
         
         # Agent 循环
         while not self._stop_flag:
+            self.messages, dropped = compact_messages(self.messages, self.config.context_budget)
+            if dropped:
+                on_message(Message("system", f"上下文已压缩：省略了最早的 {dropped} 条消息，"
+                                             f"当前约 {self.context_tokens()} tokens"))
+            
+            # 工具调用在其内容块结束时即开始执行（按顺序串行），与后续流式输出重叠
+            tool_tasks: List[asyncio.Task] = []
+            
+            def on_tool_use(block: dict):
+                previous = tool_tasks[-1] if tool_tasks else None
+                tool_tasks.append(asyncio.ensure_future(self._run_tool(block, previous, on_message)))
+            
             try:
-                response = await self._call_api()
+                response = await self._call_api_with_retry(on_message, on_tool_use)
             except Exception as e:
+                self.last_error = str(e)
                 on_message(Message("system", f"API 调用失败: {e}"))
+                if tool_tasks:
+                    await asyncio.gather(*tool_tasks, return_exceptions=True)
                 break
             
             if response is None:
+                if tool_tasks:
+                    await asyncio.gather(*tool_tasks, return_exceptions=True)
                 break
             
-            # 处理响应
-            assistant_content = []
-            tool_calls = []
-            
-            for block in response.get("content", []):
-                if block.get("type") == "text":
-                    text = block.get("text", "")
-                    if text:
-                        on_message(Message("assistant", text))
-                        assistant_content.append(block)
-                
-                elif block.get("type") == "tool_use":
-                    tool_calls.append(block)
-                    assistant_content.append(block)
-            
             # 保存助手消息
+            assistant_content = [
+                block for block in response.get("content", [])
+                if block.get("type") == "tool_use" or (block.get("type") == "text" and block.get("text"))
+            ]
             if assistant_content:
                 self.messages.append({
                     "role": "assistant",
                     "content": assistant_content
                 })
             
-            # 检查是否结束
-            if response.get("stop_reason") != "tool_use":
-                break
+            tool_results = [r for r in await asyncio.gather(*tool_tasks) if r is not None]
             
-            # 处理工具调用
-            tool_results = []
-            for tool_call in tool_calls:
-                if self._stop_flag:
-                    break
-                
-                tool_name = tool_call.get("name", "")
-                tool_args = tool_call.get("input", {})
-                tool_id = tool_call.get("id", "")
-                
-                # 显示工具调用
-                on_message(Message("tool_call", f"调用 {tool_name}", 
-                                   tool_name=tool_name, tool_args=tool_args))
-                
-                # 执行工具
-                result = self.tool_server.call_tool(tool_name, tool_args)
-                
-                # 显示结果
-                on_message(Message("tool_result", result.message,
-                                   tool_name=tool_name))
-                
-                tool_results.append({
-                    "type": "tool_result",
-                    "tool_use_id": tool_id,
-                    "content": result.message
-                })
-            
-            # 添加工具结果到消息
+            # 添加工具结果到消息；停止时补齐未执行的调用，保持对话合法
+            answered = {r["tool_use_id"] for r in tool_results}
+            for block in assistant_content:
+                if block.get("type") == "tool_use" and block.get("id") not in answered:
+                    tool_results.append({
+                        "type": "tool_result",
+                        "tool_use_id": block.get("id", ""),
+                        "content": "已被用户停止",
+                        "is_error": True
+                    })
             if tool_results:
                 self.messages.append({
                     "role": "user",
                     "content": tool_results
                 })
+            
+            # 检查是否结束
+            if response.get("stop_reason") != "tool_use":
+                break
+    
+    async def _run_tool(self, tool_call: dict, previous: Optional[asyncio.Task],
+                        on_message: Callable[[Message], None]) -> Optional[dict]:
+        """执行一个工具调用（等待前一个调用完成）；返回 tool_result 块，停止时返回 None"""
+        if previous is not None:
+            await asyncio.wait([previous])
+        if self._stop_flag:
+            return None
+        
+        tool_name = tool_call.get("name", "")
+        tool_args = tool_call.get("input", {})
+        tool_id = tool_call.get("id", "")
+        
+        # 显示工具调用
+        on_message(Message("tool_call", f"调用 {tool_name}", 
+                           tool_name=tool_name, tool_args=tool_args))
+        
+        # 执行工具（不阻塞事件循环上的流式读取）
+        result = await self.tool_server.acall_tool(tool_name, tool_args)
+        
+        # 显示结果
+        on_message(Message("tool_result", result.message,
+                           tool_name=tool_name))
+        
+        return {
+            "type": "tool_result",
+            "tool_use_id": tool_id,
+            "content": result.message
+        }
+    
+    async def _call_api_with_retry(self, on_message: Callable[[Message], None],
+                                   on_tool_use: Callable[[dict], None]) -> Optional[dict]:
+        """调用 API；限流 / 过载时退避重试（此时尚未产生任何流式输出，可以安全重试）"""
+        attempt = 0
+        while True:
+            try:
+                return await self._call_api(on_message, on_tool_use)
+            except RetryableError as e:
+                if attempt >= self.MAX_RETRIES or self._stop_flag:
+                    raise
+                delay = e.retry_after
+                if delay is None:
+                    delay = min(self.MAX_BACKOFF, 2 ** attempt) * (1 + random.random() * 0.25)
+                attempt += 1
+                self.usage.retries += 1
+                on_message(Message("system", f"HTTP {e.status}，{delay:.1f}s 后重试（第 {attempt} 次）"))
+                await asyncio.sleep(delay)
     
-    async def _call_api(self) -> Optional[dict]:
-        """调用 API"""
+    async def _call_api(self, on_message: Callable[[Message], None],
+                        on_tool_use: Callable[[dict], None]) -> Optional[dict]:
+        """以 SSE 流式调用 API
+        
+        文本增量通过 assistant_delta 消息实时回调，每个文本块结束时再回调完整的 assistant 消息；
+        tool_use 块在其 content_block_stop 到达时交给 on_tool_use。
+        返回组装好的完整响应（content / stop_reason / usage），被停止时返回 None。
+        """
         url = f"{self.config.base_url.rstrip('/')}/v1/messages"
         
         headers = {
             "Content-Type": "application/json",
+            "Accept": "text/event-stream",
             "x-api-key": self.config.api_key,
             "anthropic-version": "2023-06-01"
         }
         
-        payload = {
-            "model": self.config.model,
-            "max_tokens": 4096,
-            "system": self.SYSTEM_PROMPT,
-            "messages": self.messages,
-            "tools": self.tool_server.get_tools_schema()
-        }
+        payload = self._build_request()
         
-        async with httpx.AsyncClient(timeout=120) as client:
-            response = await client.post(url, headers=headers, json=payload)
-            
+        client = self._get_http()
+        started = time.monotonic()
+        ttft_ms: Optional[float] = None
+        async with client.stream("POST", url, headers=headers, json=payload) as response:
             if response.status_code != 200:
-                error_text = response.text
+                error_text = (await response.aread()).decode("utf-8", errors="replace")
+                if response.status_code in self.RETRY_STATUS:
+                    raise RetryableError(response.status_code, error_text,
+                                         _retry_after(response.headers.get("retry-after")))
                 raise Exception(f"HTTP {response.status_code}: {error_text}")
             
-            return response.json()
+            message: Dict[str, Any] = {"content": [], "stop_reason": None, "usage": {}}
+            blocks: Dict[int, dict] = {}
+            partial_json: Dict[int, List[str]] = {}
+            
+            # 不在 message_stop 处提前退出：读完整个响应体，连接才能放回连接池复用
+            async for event, data in _iter_sse(response):
+                if self._stop_flag:
+                    return None
+                
+                if ttft_ms is None and event in ("content_block_start", "content_block_delta"):
+                    ttft_ms = (time.monotonic() - started) * 1000
+                
+                if event == "message_start":
+                    message["usage"].update(data.get("message", {}).get("usage", {}))
+                
+                elif event == "content_block_start":
+                    index = data.get("index", len(blocks))
+                    block = dict(data.get("content_block", {}))
+                    if block.get("type") == "text":
+                        block["text"] = block.get("text", "")
+                    elif block.get("type") == "tool_use":
+                        partial_json[index] = []
+                    blocks[index] = block
+                
+                elif event == "content_block_delta":
+                    index = data.get("index", 0)
+                    delta = data.get("delta", {})
+                    block = blocks.get(index)
+                    if block is None:
+                        continue
+                    if delta.get("type") == "text_delta":
+                        text = delta.get("text", "")
+                        block["text"] += text
+                        if text:
+                            on_message(Message("assistant_delta", text))
+                    elif delta.get("type") == "input_json_delta":
+                        partial_json[index].append(delta.get("partial_json", ""))
+                
+                elif event == "content_block_stop":
+                    index = data.get("index", 0)
+                    block = blocks.get(index)
+                    if block is None:
+                        continue
+                    if block.get("type") == "text":
+                        if block["text"]:
+                            on_message(Message("assistant", block["text"]))
+                    elif block.get("type") == "tool_use":
+                        raw = "".join(partial_json.pop(index, []))
+                        block["input"] = json.loads(raw) if raw else block.get("input") or {}
+                        on_tool_use(block)
+                
+                elif event == "message_delta":
+                    delta = data.get("delta", {})
+                    if "stop_reason" in delta:
+                        message["stop_reason"] = delta["stop_reason"]
+                    message["usage"].update(data.get("usage", {}))
+                
+                elif event == "error":
+                    error = data.get("error", {})
+                    raise Exception(f"{error.get('type', 'error')}: {error.get('message', data)}")
+            
+            message["content"] = [blocks[i] for i in sorted(blocks)]
+            self.usage.record(message["usage"], ttft_ms)
+            return message
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 retry-after 头（秒数）；无法解析时返回 None"""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+async def _iter_sse(response: "httpx.Response") -> AsyncIterator[Tuple[str, dict]]:
+    """解析 SSE 流，逐个产出 (event, data)；忽略注释行与 ping"""
+    event = ""
+    data_lines: List[str] = []
+    async for line in response.aiter_lines():
+        if line == "":
+            if data_lines:
+                payload = json.loads("\n".join(data_lines))
+                name = event or payload.get("type", "")
+                if name != "ping":
+                    yield name, payload
+            event, data_lines = "", []
+        elif line.startswith(":"):
+            continue
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[5:].lstrip())
+    if data_lines:
+        payload = json.loads("\n".join(data_lines))
+        yield event or payload.get("type", ""), payload
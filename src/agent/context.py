@@ -0,0 +1,135 @@
+"""
+对话上下文压缩 - 控制 AgentClient.messages 的规模
+
+每轮请求前调用 compact_messages()：
+1. 只保留最新一版 testfile：较早的 generate_testfile 调用参数替换为占位说明
+2. 截断较早的工具结果（run_compiler 的结果包含编译器 / Mars / g++ 全部输出）
+3. 估算 token 数仍超过预算时，从最早的完整轮次（一条用户输入及其后的全部消息）开始丢弃
+4. 最后一轮（单条输入后的工具调用循环）仍超出预算时，成对丢弃其中最早的 tool_use / tool_result
+
+token 数用本地估算（CJK 字符按 1 token，其余按 4 字符 1 token），不需要调用 API。
+"""
+import json
+from typing import Any, List, Tuple
+
+# 较早的工具结果保留的字符数（首尾各一半）
+OLD_TOOL_RESULT_CHARS = 600
+# 被替换的旧版 testfile 占位说明
+_SUPERSEDED = "（已被后续版本替换，省略）"
+_DROPPED = "（较早的对话已省略）\n\n"
+
+
+def estimate_tokens(value: Any) -> int:
+    """粗略估算文本 / 消息结构的 token 数"""
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False)
+    cjk = sum(1 for ch in value if ord(ch) >= 0x2E80)
+    return cjk + (len(value) - cjk + 3) // 4
+
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    half = limit // 2
+    return f"{text[:half]}\n...（已省略 {len(text) - limit} 字符）...\n{text[-half:]}"
+
+
+def _blocks(message: dict) -> List[dict]:
+    content = message.get("content")
+    return content if isinstance(content, list) else []
+
+
+def _is_prompt(message: dict) -> bool:
+    """是否为用户输入（而非工具结果）"""
+    return message.get("role") == "user" and not any(
+        block.get("type") == "tool_result" for block in _blocks(message)
+    )
+
+
+def _shrink_history(messages: List[dict]) -> List[dict]:
+    """替换旧版 testfile、截断旧工具结果；只复制被修改的消息"""
+    latest_testfile = None
+    for i, message in enumerate(messages):
+        for j, block in enumerate(_blocks(message)):
+            if block.get("type") == "tool_use" and block.get("name") == "generate_testfile":
+                latest_testfile = (i, j)
+
+    result = []
+    last = len(messages) - 1
+    for i, message in enumerate(messages):
+        blocks = _blocks(message)
+        changed = False
+        new_blocks = []
+        for j, block in enumerate(blocks):
+            if (block.get("type") == "tool_use" and block.get("name") == "generate_testfile"
+                    and (i, j) != latest_testfile and block.get("input", {}).get("content") != _SUPERSEDED):
+                block = dict(block, input={"content": _SUPERSEDED})
+                changed = True
+            elif block.get("type") == "tool_result" and i != last:
+                content = block.get("content")
+                if isinstance(content, str) and len(content) > OLD_TOOL_RESULT_CHARS + 64:
+                    block = dict(block, content=_truncate(content, OLD_TOOL_RESULT_CHARS))
+                    changed = True
+            new_blocks.append(block)
+        result.append(dict(message, content=new_blocks) if changed else message)
+    return result
+
+
+def _is_tool_round(messages: List[dict], i: int) -> bool:
+    """messages[i] 是否为含 tool_use 的助手消息，且 messages[i + 1] 是对应的工具结果"""
+    if i + 1 >= len(messages):
+        return False
+    uses = [b for b in _blocks(messages[i]) if b.get("type") == "tool_use"]
+    results = [b for b in _blocks(messages[i + 1]) if b.get("type") == "tool_result"]
+    return (messages[i].get("role") == "assistant" and bool(uses) and bool(results)
+            and {b.get("id") for b in uses} == {b.get("tool_use_id") for b in results})
+
+
+def _holds_testfile(message: dict) -> bool:
+    """是否包含最新一版 testfile（未被替换为占位说明的 generate_testfile）"""
+    return any(
+        block.get("type") == "tool_use" and block.get("name") == "generate_testfile"
+        and block.get("input", {}).get("content") != _SUPERSEDED
+        for block in _blocks(message)
+    )
+
+
+def compact_messages(messages: List[dict], budget: int) -> Tuple[List[dict], int]:
+    """压缩对话，返回 (新的消息列表, 丢弃的消息数)；不修改传入的列表"""
+    messages = _shrink_history(messages)
+    if budget <= 0:
+        return messages, 0
+
+    sizes = [estimate_tokens(m) for m in messages]
+    total = sum(sizes)
+    start = 0
+    # 先丢弃最早的完整轮次，保证首条消息仍是用户输入；最后一轮始终保留
+    while total > budget:
+        following = next((k for k in range(start + 1, len(messages)) if _is_prompt(messages[k])), None)
+        if following is None:
+            break
+        total -= sum(sizes[start:following])
+        start = following
+    kept, sizes = messages[start:], sizes[start:]
+    dropped = start
+
+    # 仍超出预算时（单条输入后的长工具调用循环），在最后一轮内成对丢弃最早的 tool_use 与其 tool_result；
+    # 最近一次工具调用与最新版 testfile 所在的调用始终保留
+    i = 1
+    while total > budget and i < len(kept) - 2:
+        if _is_tool_round(kept, i) and not _holds_testfile(kept[i]):
+            total -= sizes[i] + sizes[i + 1]
+            del kept[i:i + 2], sizes[i:i + 2]
+            dropped += 2
+        else:
+            i += 1
+    if not dropped:
+        return messages, 0
+
+    first = kept[0]
+    if isinstance(first.get("content"), str):
+        if not first["content"].startswith(_DROPPED):
+            first = dict(first, content=_DROPPED + first["content"])
+    elif not (_blocks(first) and _blocks(first)[0].get("text") == _DROPPED):
+        first = dict(first, content=[{"type": "text", "text": _DROPPED}] + _blocks(first))
+    return [first] + kept[1:], dropped
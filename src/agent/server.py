@@ -1,12 +1,21 @@
 """
 MCP Server - SysY 编译器工具定义
 """
+import asyncio
+import hashlib
+import shutil
 import subprocess
+import tempfile
+import threading
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+from ..commands import build_command
+
 
 @dataclass
 class ToolResult:
@@ -19,25 +28,82 @@ class ToolResult:
 class SysYToolServer:
     """SysY 编译器工具服务器（本地调用版本）"""
     
+    # 默认命令模板（与 config.yaml 的 commands 段含义相同）
+    DEFAULT_COMMANDS = {
+        "compile": "{java} {jvm_options} -jar {jar}",
+        "mars": "{java} {jvm_options} -jar {jar} nc {mips}",
+    }
+    # g++ 参考输出缓存条数（按源码 + 输入的哈希）
+    REFERENCE_CACHE_SIZE = 32
+    
     def __init__(self, test_dir: Path, compiler_jar: Path, mars_jar: Path, 
-                 java_cmd: str = "java", gcc_cmd: str = "g++", c_header: str = ""):
+                 java_cmd: str = "java", gcc_cmd: str = "g++", c_header: str = "",
+                 jvm_options: Optional[Dict[str, List[str]]] = None,
+                 commands: Optional[Dict[str, str]] = None,
+                 work_dir: Optional[Path] = None, allow_save: bool = True):
         self.test_dir = Path(test_dir)
         self.compiler_jar = Path(compiler_jar)
         self.mars_jar = Path(mars_jar)
         self.java_cmd = java_cmd
         self.gcc_cmd = gcc_cmd
         self.c_header = c_header
+        # 各阶段（compile / mars）的 JVM 参数与命令模板
+        self.jvm_options = jvm_options or {}
+        self.commands = dict(self.DEFAULT_COMMANDS, **(commands or {}))
         
-        # 当前工作目录
-        self.work_dir = self.test_dir / ".tmp" / "agent_work"
+        # 当前工作目录（批量模式下每个会话使用独立目录）
+        self.work_dir = Path(work_dir) if work_dir else self.test_dir / ".tmp" / "agent_work"
         self.work_dir.mkdir(parents=True, exist_ok=True)
+        # 为 False 时不向模型提供 save_testcase（批量模式由调用方统一保存）
+        self.allow_save = allow_save
+        # 最近一次 run_compiler 的结果
+        self.last_run: Optional[ToolResult] = None
         
         # 当前生成的文件
         self.current_testfile: Optional[Path] = None
         self.current_input: Optional[Path] = None
+        
+        # g++ 参考输出与被测编译器 + Mars 并发执行；结果按哈希缓存（None 表示 g++ 编译失败）
+        self._reference_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="agent-ref")
+        self._reference_cache: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._reference_lock = threading.Lock()
+    
+    @classmethod
+    def from_config(cls, test_dir: Path, config, work_dir: Optional[Path] = None,
+                    allow_save: bool = True) -> 'SysYToolServer':
+        """按全局配置创建（编译器使用「测试运行」页编译出的 .tmp/Compiler.jar）"""
+        from ..commands import stage_jvm_options
+        
+        # Mars.jar 路径（从配置读取，支持相对路径）
+        mars_path = Path(config.mars_jar)
+        if not mars_path.is_absolute():
+            mars_path = (test_dir / mars_path).resolve()
+        
+        return cls(
+            test_dir=test_dir,
+            compiler_jar=test_dir / ".tmp" / "Compiler.jar",
+            mars_jar=mars_path,
+            java_cmd=config.tools.get_java(),
+            gcc_cmd=config.tools.get_gcc(),
+            c_header=config.c_header,
+            jvm_options={stage: stage_jvm_options(config, stage) for stage in ("compile", "mars")},
+            commands={stage: config.commands.template(stage, "java") for stage in ("compile", "mars")},
+            work_dir=work_dir,
+            allow_save=allow_save,
+        )
+    
+    def close(self):
+        """释放后台线程池（不等待仍在运行的 g++ 任务，尚未开始的任务直接取消）"""
+        self._reference_pool.shutdown(wait=False, cancel_futures=True)
     
     def get_tools_schema(self) -> list:
         """获取工具定义（Anthropic 格式）"""
+        tools = self._tools_schema()
+        if not self.allow_save:
+            tools = [tool for tool in tools if tool["name"] != "save_testcase"]
+        return tools
+    
+    def _tools_schema(self) -> list:
         return [
             {
                 "name": "generate_testfile",
@@ -117,8 +183,9 @@ class SysYToolServer:
         elif name == "generate_input":
             return self._generate_input(arguments.get("content", ""))
         elif name == "run_compiler":
-            return self._run_compiler()
-        elif name == "save_testcase":
+            self.last_run = self._run_compiler()
+            return self.last_run
+        elif name == "save_testcase" and self.allow_save:
             return self._save_testcase(
                 arguments.get("lib_name", ""),
                 arguments.get("test_number", 1)
@@ -128,6 +195,10 @@ class SysYToolServer:
         else:
             return ToolResult(False, f"未知工具: {name}")
     
+    async def acall_tool(self, name: str, arguments: dict) -> ToolResult:
+        """异步调用工具（在线程中执行，不阻塞事件循环）"""
+        return await asyncio.to_thread(self.call_tool, name, arguments)
+    
     def _generate_testfile(self, content: str) -> ToolResult:
         """生成测试文件"""
         if not content.strip():
@@ -180,6 +251,16 @@ class SysYToolServer:
         except Exception as e:
             return ToolResult(False, f"写入文件失败: {e}")
     
+    def _stage_cmd(self, stage: str, jar: Path, mips_path: Path) -> List[str]:
+        return build_command(
+            self.commands[stage],
+            jvm_options=self.jvm_options.get(stage),
+            java=self.java_cmd,
+            jar=str(jar),
+            exe="",
+            mips=str(mips_path),
+        )
+    
     def _run_compiler(self) -> ToolResult:
         """运行编译器"""
         if not self.current_testfile or not self.current_testfile.exists():
@@ -188,6 +269,56 @@ class SysYToolServer:
         if not self.compiler_jar.exists():
             return ToolResult(False, f"编译器不存在: {self.compiler_jar}")
         
+        source_code = self.current_testfile.read_text(encoding='utf-8')
+        input_data = ""
+        if self.current_input and self.current_input.exists():
+            input_data = self.current_input.read_text(encoding='utf-8')
+        
+        # g++ 参考输出只依赖源码与输入，与编译器、Mars 并发执行
+        reference = self._reference_pool.submit(self._reference_output, source_code, input_data)
+        
+        error, compiler_output, mars_output = self._run_student(input_data)
+        if error is not None:
+            # 参考输出仍在后台完成并写入缓存，修改后重新编译时可直接使用
+            return error
+        
+        try:
+            gcc_output = reference.result()
+        except Exception:
+            gcc_output = None
+        
+        # 构建结果
+        result_msg = "✓ 编译成功！\n"
+        
+        # 显示编译器输出（如果有）
+        if compiler_output:
+            result_msg += f"\n【编译器输出】\n{compiler_output}\n"
+        
+        result_msg += f"\n【Mars 输出】\n{mars_output if mars_output else '(无输出)'}\n"
+        
+        matched = False
+        if gcc_output is not None:
+            result_msg += f"\n【g++ 输出】\n{gcc_output if gcc_output else '(无输出)'}\n"
+            
+            # 比较输出
+            mars_lines = mars_output.strip().split('\n') if mars_output.strip() else []
+            gcc_lines = gcc_output.strip().split('\n') if gcc_output.strip() else []
+            
+            matched = mars_lines == gcc_lines
+            if matched:
+                result_msg += "\n✓ 输出一致！"
+            else:
+                result_msg += f"\n⚠ 输出不一致！Mars {len(mars_lines)} 行，g++ {len(gcc_lines)} 行"
+        
+        return ToolResult(True, result_msg, {
+            "compiler_output": compiler_output,
+            "mars_output": mars_output,
+            "gcc_output": gcc_output,
+            "matched": matched
+        })
+    
+    def _run_student(self, input_data: str) -> Tuple[Optional[ToolResult], str, str]:
+        """运行被测编译器与 Mars；返回 (失败时的结果, 编译器输出, Mars 输出)"""
         mips_path = self.work_dir / "mips.txt"
         if mips_path.exists():
             mips_path.unlink()
@@ -195,7 +326,7 @@ class SysYToolServer:
         # 1. 运行编译器
         compiler_output = ""
         try:
-            cmd = [self.java_cmd, "-jar", str(self.compiler_jar)]
+            cmd = self._stage_cmd("compile", self.compiler_jar, mips_path)
             result = subprocess.run(
                 cmd, capture_output=True, text=True, errors="replace",
                 timeout=30, cwd=str(self.work_dir)
@@ -207,49 +338,51 @@ class SysYToolServer:
                 error_msg = f"编译器返回错误 (code {result.returncode})"
                 if compiler_output:
                     error_msg += f"\n\n【编译器输出】\n{compiler_output}"
-                return ToolResult(False, error_msg)
+                return ToolResult(False, error_msg), compiler_output, ""
             
             if not mips_path.exists():
                 error_msg = "编译器未生成 mips.txt"
                 if compiler_output:
                     error_msg += f"\n\n【编译器输出】\n{compiler_output}"
-                return ToolResult(False, error_msg)
+                return ToolResult(False, error_msg), compiler_output, ""
             
         except subprocess.TimeoutExpired:
-            return ToolResult(False, "编译器执行超时")
+            return ToolResult(False, "编译器执行超时"), compiler_output, ""
         except Exception as e:
-            return ToolResult(False, f"编译器执行失败: {e}")
+            return ToolResult(False, f"编译器执行失败: {e}"), compiler_output, ""
         
         # 2. 运行 Mars
-        mars_output = ""
         try:
-            input_data = ""
-            if self.current_input and self.current_input.exists():
-                input_data = self.current_input.read_text(encoding='utf-8')
-            
-            mars_cmd = [self.java_cmd, "-jar", str(self.mars_jar), "nc", str(mips_path)]
+            mars_cmd = self._stage_cmd("mars", self.mars_jar, mips_path)
             mars_result = subprocess.run(
                 mars_cmd, input=input_data, capture_output=True, text=True, errors="replace",
                 timeout=10, cwd=str(self.work_dir)
             )
-            
-            mars_output = mars_result.stdout
-            
         except subprocess.TimeoutExpired:
-            return ToolResult(False, "Mars 执行超时（可能存在死循环）")
+            return ToolResult(False, "Mars 执行超时（可能存在死循环）"), compiler_output, ""
         except Exception as e:
-            return ToolResult(False, f"Mars 执行失败: {e}")
+            return ToolResult(False, f"Mars 执行失败: {e}"), compiler_output, ""
+        
+        return None, compiler_output, mars_result.stdout
+    
+    def _reference_output(self, source_code: str, input_data: str) -> Optional[str]:
+        """g++ 编译运行（c_header + 源码）得到参考输出；按源码与输入的哈希缓存"""
+        key = hashlib.sha1(f"{self.c_header}\0{source_code}\0{input_data}".encode("utf-8")).hexdigest()
+        with self._reference_lock:
+            if key in self._reference_cache:
+                self._reference_cache.move_to_end(key)
+                return self._reference_cache[key]
         
-        # 3. 运行 g++ 对比
+        # 每个任务使用独立的临时目录：相同源码的任务并发运行时也不会删掉彼此的文件
+        ref_dir = None
         gcc_output = None
         try:
-            tmp_src = self.work_dir / "tmp_test.c"
-            tmp_exe = self.work_dir / "tmp_test.exe"
-            
-            source_code = self.current_testfile.read_text(encoding='utf-8')
-            full_code = self.c_header + source_code
+            (self.work_dir / "ref").mkdir(parents=True, exist_ok=True)
+            ref_dir = Path(tempfile.mkdtemp(prefix=f"{key[:12]}_", dir=self.work_dir / "ref"))
+            tmp_src = ref_dir / "tmp_test.c"
+            tmp_exe = ref_dir / "tmp_test.exe"
             with open(tmp_src, "w", encoding="utf-8", newline="\n") as f:
-                f.write(full_code)
+                f.write(self.c_header + source_code)
             
             compile_result = subprocess.run(
                 [self.gcc_cmd, str(tmp_src), "-o", str(tmp_exe)],
@@ -262,41 +395,18 @@ class SysYToolServer:
                     timeout=10
                 )
                 gcc_output = run_result.stdout
-            
-            # 清理
-            for f in [tmp_src, tmp_exe]:
-                if f.exists():
-                    f.unlink()
-                    
         except Exception:
-            pass
-        
-        # 构建结果
-        result_msg = "✓ 编译成功！\n"
-        
-        # 显示编译器输出（如果有）
-        if compiler_output:
-            result_msg += f"\n【编译器输出】\n{compiler_output}\n"
-        
-        result_msg += f"\n【Mars 输出】\n{mars_output if mars_output else '(无输出)'}\n"
-        
-        if gcc_output is not None:
-            result_msg += f"\n【g++ 输出】\n{gcc_output if gcc_output else '(无输出)'}\n"
-            
-            # 比较输出
-            mars_lines = mars_output.strip().split('\n') if mars_output.strip() else []
-            gcc_lines = gcc_output.strip().split('\n') if gcc_output.strip() else []
-            
-            if mars_lines == gcc_lines:
-                result_msg += "\n✓ 输出一致！"
-            else:
-                result_msg += f"\n⚠ 输出不一致！Mars {len(mars_lines)} 行，g++ {len(gcc_lines)} 行"
+            # 超时等异常不缓存，下次重试
+            return None
+        finally:
+            if ref_dir is not None:
+                shutil.rmtree(ref_dir, ignore_errors=True)
         
-        return ToolResult(True, result_msg, {
-            "compiler_output": compiler_output,
-            "mars_output": mars_output,
-            "gcc_output": gcc_output
-        })
+        with self._reference_lock:
+            self._reference_cache[key] = gcc_output
+            while len(self._reference_cache) > self.REFERENCE_CACHE_SIZE:
+                self._reference_cache.popitem(last=False)
+        return gcc_output
     
     def _save_testcase(self, lib_name: str, test_number: int) -> ToolResult:
         """保存测试用例"""
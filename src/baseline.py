@@ -0,0 +1,145 @@
+"""
+Cycle 基线对比模块 - 将本次运行的加权 cycle 与历史运行或基线文件比较
+
+基线来源：
+- 运行历史中的 run id（`12`），或 `last`（最近一次运行）
+- JSON 文件：{"compilers": {"<实例>": {"<case_key>": cycle, ...}}}（由 --save-baseline 生成）
+
+只比较在两侧都通过且有 cycle 的用例；按测试库计算 cycle 比值（本次 / 基线）的几何平均。
+"""
+import json
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .history import HistoryStore, case_key
+from .models import TestCase, TestResult
+
+# compiler -> case_key -> cycle
+CycleTable = Dict[str, Dict[str, int]]
+
+
+@dataclass
+class CycleDelta:
+    """单个用例的 cycle 变化"""
+    compiler: str
+    case_key: str
+    baseline: int
+    current: int
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+    @property
+    def percent(self) -> float:
+        return (self.ratio - 1.0) * 100
+
+
+@dataclass
+class CycleReport:
+    """一次对比的结果"""
+    label: str
+    deltas: List[CycleDelta] = field(default_factory=list)
+    # (compiler, library) -> (几何平均比值, 用例数)
+    library_geomean: Dict[Tuple[str, str], Tuple[float, int]] = field(default_factory=dict)
+    unmatched: int = 0
+
+    def regressions(self, threshold_pct: float) -> List[CycleDelta]:
+        return sorted((d for d in self.deltas if d.percent > threshold_pct), key=lambda d: -d.percent)
+
+    def improvements(self) -> List[CycleDelta]:
+        return sorted((d for d in self.deltas if d.percent < 0), key=lambda d: d.percent)
+
+
+def load_baseline(spec: str, history: Optional[HistoryStore]) -> Tuple[str, CycleTable]:
+    """解析 --baseline 参数；无法解析时抛出 ValueError"""
+    spec = spec.strip()
+    if spec.isdigit() or spec.lower() == "last":
+        if history is None:
+            raise ValueError("运行历史不可用，无法按 run id 读取基线")
+        if spec.lower() == "last":
+            runs = history.recent_runs(1)
+            if not runs:
+                raise ValueError("运行历史为空")
+            run_id = runs[0][0]
+        else:
+            run_id = int(spec)
+        table = history.run_cycles(run_id)
+        if not table:
+            raise ValueError(f"run #{run_id} 没有可用的 cycle 数据")
+        return f"run #{run_id}", table
+
+    path = Path(spec)
+    if not path.exists():
+        raise ValueError(f"基线既不是 run id 也不是已存在的文件: {spec}")
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        compilers = data["compilers"]
+        table = {str(name): {str(k): int(v) for k, v in cycles.items()} for name, cycles in compilers.items()}
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"无法解析基线文件 {path}: {e}")
+    return path.name, table
+
+
+def collect_cycles(results: Sequence[Tuple[str, TestCase, TestResult]], testcases_dir: Path) -> CycleTable:
+    """从 test_multi 的结果中提取通过用例的 cycle"""
+    table: CycleTable = {}
+    for name, case, result in results:
+        if result.passed and result.cycle is not None:
+            table.setdefault(name, {})[case_key(case, testcases_dir)] = result.cycle
+    return table
+
+
+def save_baseline(path: Path, cycles: CycleTable) -> None:
+    """保存为基线文件（可用于之后的 --baseline <file>）"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"compilers": {name: dict(sorted(c.items())) for name, c in sorted(cycles.items())}}
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+
+
+def compare_cycles(label: str, baseline: CycleTable, current: CycleTable) -> CycleReport:
+    """对比 cycle。实例按名称对应；基线只有一个实例时，所有实例都与它比较"""
+    report = CycleReport(label)
+    single = next(iter(baseline.values())) if len(baseline) == 1 else None
+    log_sums: Dict[Tuple[str, str], Tuple[float, int]] = {}
+    for name, cycles in current.items():
+        base = baseline.get(name, single)
+        if base is None:
+            report.unmatched += len(cycles)
+            continue
+        for key, cycle in cycles.items():
+            base_cycle = base.get(key)
+            if not base_cycle or cycle <= 0:
+                report.unmatched += 1
+                continue
+            delta = CycleDelta(name, key, base_cycle, cycle)
+            report.deltas.append(delta)
+            library = key.split("/", 1)[0]
+            total, n = log_sums.get((name, library), (0.0, 0))
+            log_sums[(name, library)] = (total + math.log(delta.ratio), n + 1)
+    for group, (total, n) in sorted(log_sums.items()):
+        report.library_geomean[group] = (math.exp(total / n), n)
+    return report
+
+
+def format_report(report: CycleReport, threshold_pct: float, top: int) -> List[str]:
+    """生成对比报告的文本行"""
+    lines = [f"Cycle 对比基线 {report.label}：{len(report.deltas)} 个用例（未匹配 {report.unmatched} 个）"]
+    for (name, library), (ratio, n) in report.library_geomean.items():
+        lines.append(f"  [{name}] {library or '.'}: 几何平均比值 {ratio:.4f} ({(ratio - 1) * 100:+.2f}%, n={n})")
+
+    regressions = report.regressions(threshold_pct)
+    improvements = report.improvements()
+    worse = sorted((d for d in report.deltas if d.percent > 0), key=lambda d: -d.percent)
+    if worse:
+        lines.append(f"  变差最多（阈值 +{threshold_pct:g}%，超出 {len(regressions)} 个）:")
+        for d in worse[:top]:
+            mark = "!" if d.percent > threshold_pct else " "
+            lines.append(f"   {mark} {d.percent:+7.2f}%  [{d.compiler}] {d.case_key}  {d.baseline} -> {d.current}")
+    if improvements:
+        lines.append(f"  改进最多（共 {len(improvements)} 个）:")
+        for d in improvements[:top]:
+            lines.append(f"     {d.percent:+7.2f}%  [{d.compiler}] {d.case_key}  {d.baseline} -> {d.current}")
+    return lines
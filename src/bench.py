@@ -0,0 +1,167 @@
+"""
+基准测试模块 - 多次重复运行选中的用例，统计编译器耗时与 Mars 耗时
+
+- 每个（编译器实例, 用例）重复 warmup + repeat 次，丢弃前 warmup 次
+- 报告中位数、p95 与 MAD（中位数绝对偏差），以及 cycle（应当是确定的）
+- 并发默认为 1，避免多个 JVM 相互干扰计时
+"""
+import math
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .models import TestCase, TestResult, TestStatus
+from .multi_runner import prepare_archives
+from .tester import CompilerTester
+
+
+@dataclass
+class SampleStats:
+    """一组耗时样本的统计量（ms）"""
+    n: int
+    median: float
+    p95: float
+    mad: float
+
+    @classmethod
+    def of(cls, samples: Sequence[int]) -> Optional["SampleStats"]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        median = statistics.median(ordered)
+        # p95 取 nearest-rank
+        p95 = ordered[min(len(ordered) - 1, max(0, math.ceil(0.95 * len(ordered)) - 1))]
+        mad = statistics.median(abs(x - median) for x in ordered)
+        return cls(len(ordered), median, float(p95), mad)
+
+    def format(self) -> str:
+        return f"med {self.median:7.1f}  p95 {self.p95:7.1f}  mad {self.mad:5.1f}"
+
+
+@dataclass
+class CaseBench:
+    """单个（编译器实例, 用例）的样本"""
+    compile_ms: List[int] = field(default_factory=list)
+    mars_ms: List[int] = field(default_factory=list)
+    cycles: Set[int] = field(default_factory=set)
+    failures: int = 0
+
+    def add(self, result: TestResult) -> None:
+        if result.status == TestStatus.SKIPPED:
+            return
+        if not result.passed:
+            self.failures += 1
+        stages = result.stage_times_ms or {}
+        if "compile" in stages:
+            self.compile_ms.append(stages["compile"])
+        if "mars" in stages:
+            self.mars_ms.append(stages["mars"])
+        if result.cycle is not None:
+            self.cycles.add(result.cycle)
+
+
+def run_bench(
+    testers: List[CompilerTester],
+    cases: List[TestCase],
+    repeat: int = 5,
+    warmup: int = 1,
+    jobs: int = 1,
+) -> Dict[Tuple[str, str], CaseBench]:
+    """运行基准测试，返回 (instance_name, case.name) -> CaseBench（已丢弃预热样本）"""
+    jobs = max(1, jobs)
+    for tester in testers:
+        tester.worker_slots.set_limit(jobs)
+    prepare_archives(testers, cases, jobs)
+
+    benches: Dict[Tuple[str, str], CaseBench] = {
+        (t.instance_name, c.name): CaseBench() for t in testers for c in cases
+    }
+    # 每一轮内按 用例 × 实例 交错，预热轮与计时轮之间不混跑
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for round_i in range(warmup + repeat):
+            tasks = [(t, c) for c in cases for t in testers]
+            results = executor.map(lambda tc: tc[0].test_case(tc[1]), tasks)
+            for (tester, case), result in zip(tasks, results):
+                if round_i >= warmup:
+                    benches[(tester.instance_name, case.name)].add(result)
+    return benches
+
+
+def format_bench(benches: Dict[Tuple[str, str], CaseBench]) -> List[str]:
+    """生成基准测试报告的文本行"""
+    lines: List[str] = []
+    totals: Dict[str, Tuple[List[float], List[float]]] = {}
+    for (name, case_name), bench in benches.items():
+        compile_stats = SampleStats.of(bench.compile_ms)
+        mars_stats = SampleStats.of(bench.mars_ms)
+        if len(bench.cycles) == 1:
+            cycle = str(next(iter(bench.cycles)))
+        elif bench.cycles:
+            cycle = "不确定: " + ",".join(str(c) for c in sorted(bench.cycles))
+        else:
+            cycle = "-"
+        lines.append(f"[{name}] {case_name}  cycle={cycle}" + (f"  失败 {bench.failures} 次" if bench.failures else ""))
+        if compile_stats:
+            lines.append(f"    compile  {compile_stats.format()}  ms (n={compile_stats.n})")
+        if mars_stats:
+            lines.append(f"    mars     {mars_stats.format()}  ms (n={mars_stats.n})")
+        per_compiler = totals.setdefault(name, ([], []))
+        if compile_stats:
+            per_compiler[0].append(compile_stats.median)
+        if mars_stats:
+            per_compiler[1].append(mars_stats.median)
+
+    for name, (compile_medians, mars_medians) in totals.items():
+        lines.append(
+            f"[{name}] 合计（各用例中位数之和）: compile {sum(compile_medians):.0f} ms, mars {sum(mars_medians):.0f} ms"
+        )
+    return lines
+
+
+def run_bench_cli(
+    project: str,
+    compilers: Optional[List[str]],
+    match: Optional[List[str]],
+    repeat: int,
+    warmup: int,
+    jobs: int,
+) -> int:
+    """命令行模式：编译选中的编译器实例并运行基准测试"""
+    from .cli import build_testers, collect_cases, format_output
+    from .config import get_config
+    from .multi_runner import compile_testers
+
+    config = get_config()
+    test_dir = Path(__file__).parent.parent.resolve()
+    selected = [c.strip() for c in (compilers or []) if c and c.strip()] or None
+    testers = build_testers(Path(project).resolve(), test_dir, selected)
+    if not testers:
+        return 1
+
+    compiled = compile_testers(testers, max_workers=config.parallel.max_workers)
+    ok_testers = []
+    for t in testers:
+        ok, msg = compiled.get(t.instance_name, (False, "编译失败"))
+        print(format_output("INFO" if ok else "ERROR", f"[{t.instance_name}] {msg}"))
+        if ok:
+            ok_testers.append(t)
+    if not ok_testers:
+        return 1
+
+    _libs, cases = collect_cases(test_dir / "testcases", match)
+    if not cases:
+        print(format_output("WARN", "未发现测试用例"))
+        return 0
+
+    print(format_output(
+        "INFO",
+        f"基准测试: {len(ok_testers)} 个实例 × {len(cases)} 个用例，预热 {warmup} 次 + 计时 {repeat} 次，并发 {jobs}",
+    ))
+    benches = run_bench(ok_testers, cases, repeat=repeat, warmup=warmup, jobs=jobs)
+    for line in format_bench(benches):
+        print(line, flush=True)
+    for t in ok_testers:
+        t.cleanup_workers()
+    return 0
@@ -0,0 +1,250 @@
+"""
+AppCDS 模块 - 为 Mars.jar / Compiler.jar 生成并缓存类数据共享（CDS）归档，缩短 JVM 启动时间
+
+流程（JDK 11+）：
+1. 训练：用 -XX:DumpLoadedClassList 在若干用例上运行 jar，合并各次加载过的类
+2. 生成：java -Xshare:dump -XX:SharedClassListFile=... -XX:SharedArchiveFile=... -cp <jar>
+3. 校验：java -Xshare:on -XX:SharedArchiveFile=... -cp <jar> -version，失败则不使用该归档
+
+归档按 jar 内容哈希与 JDK 版本命名，缓存在 jvm.cds_dir 下；jar 内容或 JDK 变化后自动重新生成。
+每次运行都会重新打包的 Compiler.jar 只要内容不变就复用原归档（见 CdsCache._is_current）。
+"""
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .process import run_process
+
+
+# AppCDS 在 JDK 10 开源、JDK 11 起无需额外开关
+MIN_JDK_MAJOR = 11
+
+_VERSION_RE = re.compile(r'version "([^"]+)"')
+# 只保留内置类加载器加载的类（去掉 JDK 15+ 的 " id: N" 后缀；跳过 @lambda-proxy 等扩展行与自定义加载器的类）
+_CLASSLIST_RE = re.compile(r"^([\w/$]+)(?: id: \d+)?$")
+# 关闭统一日志在 stdout 上的输出，避免 CDS 警告混入被测程序输出（警告仍写到 stderr）
+_QUIET_LOG_FLAGS = ["-Xlog:disable", "-Xlog:all=warning:stderr"]
+
+
+@dataclass
+class TrainingRun:
+    """一次训练运行：在 cwd 下执行 java -jar <jar> *args，stdin 为 input"""
+    args: List[str]
+    cwd: Path
+    input: Optional[bytes] = None
+
+
+def archive_flags(archive: Path) -> List[str]:
+    """使用归档启动 JVM 所需的参数（归档不可用时 -Xshare:auto 会静默回退）"""
+    return [f"-XX:SharedArchiveFile={archive}", "-Xshare:auto"] + _QUIET_LOG_FLAGS
+
+
+def _parse_major(version: str) -> int:
+    # "1.8.0_392" -> 8，"17.0.2" -> 17，"21-ea" -> 21
+    parts = version.split(".")
+    head = parts[1] if parts[0] == "1" and len(parts) > 1 else parts[0]
+    m = re.match(r"\d+", head)
+    return int(m.group(0)) if m else 0
+
+
+class CdsCache:
+    """AppCDS 归档缓存（线程安全；同一归档只会被生成一次）"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._jdk: Dict[str, Optional[Tuple[int, str]]] = {}
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._failed: Dict[str, str] = {}
+
+    def jdk_info(self, java: str) -> Optional[Tuple[int, str]]:
+        """返回 (主版本号, 版本标签)；java 不可用时返回 None"""
+        with self._lock:
+            if java in self._jdk:
+                return self._jdk[java]
+        info = None
+        try:
+            result = run_process([java, "-version"], timeout=30)
+            text = (result.stderr + result.stdout).decode("utf-8", errors="replace")
+            m = _VERSION_RE.search(text)
+            if result.returncode == 0 and m:
+                version = m.group(1)
+                # 同版本号的不同发行版/构建生成的归档不通用，标签中带上完整版本输出的哈希
+                digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:6]
+                safe = re.sub(r"[^\w.]", "_", version)
+                info = (_parse_major(version), f"jdk{safe}-{digest}")
+        except (OSError, subprocess.TimeoutExpired):
+            info = None
+        with self._lock:
+            self._jdk[java] = info
+        return info
+
+    def _jar_hash(self, jar: Path) -> Optional[str]:
+        try:
+            st = jar.stat()
+        except OSError:
+            return None
+        key = (str(jar), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._hashes.get(key)
+        if cached:
+            return cached
+        h = hashlib.sha256()
+        with open(jar, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()[:16]
+        with self._lock:
+            self._hashes[key] = digest
+        return digest
+
+    @staticmethod
+    def _jar_stamp(jar: Path) -> str:
+        st = jar.stat()
+        return f"{jar}|{st.st_size}|{st.st_mtime_ns}"
+
+    @staticmethod
+    def _restore_mtime(jar: Path, stamp: str) -> bool:
+        """内容相同（归档名中的哈希一致）但被重新打包的 jar：把 mtime 恢复为生成归档时的值"""
+        path, size, mtime_ns = stamp.rsplit("|", 2)
+        st = jar.stat()
+        if path != str(jar) or int(size) != st.st_size:
+            return False
+        os.utime(jar, ns=(st.st_atime_ns, int(mtime_ns)))
+        return True
+
+    def archive_path(self, java: str, jar: Path) -> Optional[Path]:
+        """jar + JDK 对应的归档路径；JDK 不支持 AppCDS 时返回 None"""
+        info = self.jdk_info(java)
+        if info is None or info[0] < MIN_JDK_MAJOR:
+            return None
+        jar_hash = self._jar_hash(jar)
+        if jar_hash is None:
+            return None
+        return self.cache_dir / f"{jar.stem}-{jar_hash}-{info[1]}.jsa"
+
+    def _is_current(self, archive: Path, jar: Path) -> bool:
+        # 归档名已包含 jar 内容哈希；但 JVM 还会校验 classpath 上 jar 的路径/大小/mtime，
+        # 内容相同、只是被重新打包（mtime 变化）时恢复 mtime 即可继续使用，无需重新训练
+        try:
+            if not archive.exists():
+                return False
+            stamp = archive.with_suffix(".stamp").read_text(encoding="utf-8")
+            return stamp == self._jar_stamp(jar) or self._restore_mtime(jar, stamp)
+        except (OSError, ValueError):
+            return False
+
+    def lookup(self, java: str, jar: Path) -> Optional[Path]:
+        """返回可直接使用的归档；尚未生成或已过期时返回 None"""
+        archive = self.archive_path(java, jar)
+        if archive is not None and self._is_current(archive, jar):
+            return archive
+        return None
+
+    def needs_build(self, java: str, jar: Path) -> bool:
+        archive = self.archive_path(java, jar)
+        if archive is None or str(archive) in self._failed:
+            return False
+        return not self._is_current(archive, jar)
+
+    def _build_lock(self, archive: Path) -> threading.Lock:
+        with self._lock:
+            return self._build_locks.setdefault(str(archive), threading.Lock())
+
+    def ensure(self, java: str, jar: Path, runs: List[TrainingRun], timeout: float) -> Tuple[Optional[Path], str]:
+        """确保 jar 的归档存在（必要时训练并生成），返回 (归档路径, 信息)"""
+        info = self.jdk_info(java)
+        if info is None:
+            return None, "无法获取 JDK 版本"
+        if info[0] < MIN_JDK_MAJOR:
+            return None, f"JDK {info[0]} 不支持 AppCDS（需要 {MIN_JDK_MAJOR}+）"
+        archive = self.archive_path(java, jar)
+        if archive is None:
+            return None, f"找不到 {jar.name}"
+
+        with self._build_lock(archive):
+            if self._is_current(archive, jar):
+                return archive, ""
+            if str(archive) in self._failed:
+                return None, self._failed[str(archive)]
+            try:
+                msg = self._build(java, jar, archive, runs, timeout)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                msg = f"生成归档失败: {e}"
+            if msg:
+                self._failed[str(archive)] = msg
+                return None, msg
+            return archive, f"已生成 AppCDS 归档 {archive.name}"
+
+    def _build(self, java: str, jar: Path, archive: Path, runs: List[TrainingRun], timeout: float) -> str:
+        """训练并生成归档；成功返回空串，失败返回原因"""
+        if not runs:
+            return "没有可用于训练的用例"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix="cds_", dir=str(self.cache_dir)))
+        try:
+            classes: List[str] = []
+            seen = set()
+            for i, run in enumerate(runs):
+                classlist = tmp_dir / f"train_{i}.lst"
+                cmd = [java, f"-XX:DumpLoadedClassList={classlist}", "-jar", str(jar)] + run.args
+                try:
+                    run_process(cmd, input=run.input, timeout=timeout, cwd=str(run.cwd))
+                except subprocess.TimeoutExpired:
+                    pass
+                if not classlist.exists():
+                    continue
+                for line in classlist.read_text(encoding="utf-8", errors="replace").splitlines():
+                    m = _CLASSLIST_RE.match(line.strip())
+                    if m and m.group(1) not in seen:
+                        seen.add(m.group(1))
+                        classes.append(m.group(1))
+            if not classes:
+                return "训练运行未产生类列表"
+
+            merged = tmp_dir / "classes.lst"
+            merged.write_text("\n".join(classes) + "\n", encoding="utf-8")
+            tmp_archive = tmp_dir / "archive.jsa"
+            dump = run_process(
+                [java, "-Xshare:dump", f"-XX:SharedClassListFile={merged}",
+                 f"-XX:SharedArchiveFile={tmp_archive}", "-cp", str(jar)],
+                timeout=max(timeout, 120),
+            )
+            if dump.returncode != 0 or not tmp_archive.exists():
+                tail = dump.stderr.decode("utf-8", errors="replace").strip().splitlines()[-3:]
+                return "生成归档失败: " + " | ".join(tail)
+
+            verify = run_process(
+                [java, "-Xshare:on", f"-XX:SharedArchiveFile={tmp_archive}", "-cp", str(jar), "-version"],
+                timeout=30,
+            )
+            if verify.returncode != 0:
+                return "归档校验失败，已忽略"
+
+            tmp_archive.replace(archive)
+            archive.with_suffix(".stamp").write_text(self._jar_stamp(jar), encoding="utf-8")
+            return ""
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+_caches: Dict[str, CdsCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cds_cache(cache_dir: Path) -> CdsCache:
+    """按目录共享的 CdsCache 实例（多个编译器实例共用 Mars.jar 的归档）"""
+    key = str(Path(cache_dir).resolve())
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = CdsCache(Path(key))
+        return cache
@@ -2,14 +2,21 @@
 命令行接口模块
 """
 import argparse
+import dataclasses
 import sys
+from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from .config import get_config
+from .baseline import collect_cycles, compare_cycles, format_report, load_baseline, save_baseline
+from .config import RunConfig, get_config
 from .discovery import TestDiscovery
-from .models import TestResult, TestStatus
+from .history import open_history
+from .leaderboard import Leaderboard
+from .models import TestCase, TestResult, TestStatus
 from .multi_runner import compile_testers, test_multi
+from .progress import NORMAL, QUIET, VERBOSE, ProgressRenderer
+from .reports import StreamingReports
 from .tester import CompilerTester
 from .zip_compilers import discover_zip_compilers, extract_zip_instance
 
@@ -33,43 +40,48 @@ LOGO = r"""
 """
 
 
-def _format_output(label: str, message: str) -> str:
+def format_output(label: str, message: str) -> str:
     return f"[{label}] {message}"
 
 
-def _print_failure_detail(case_name: str, result: TestResult):
-    print(_format_output("FAIL", f"{case_name} - {result.status.value} {result.message}".strip()), flush=True)
+def _failure_lines(case_name: str, result: TestResult, detail: bool = True) -> List[str]:
+    lines = [format_output("FAIL", f"{case_name} - {result.status.value} {result.message}".strip())]
+    if not detail:
+        return lines
     if result.actual_output is not None:
-        print("  实际输出:", flush=True)
-        for line in (result.actual_output or "").splitlines():
-            print(f"    {line}", flush=True)
+        lines.append("  实际输出:")
+        lines.extend(f"    {line}" for line in (result.actual_output or "").splitlines())
     if result.expected_output is not None:
-        print("  期望输出:", flush=True)
-        for line in (result.expected_output or "").splitlines():
-            print(f"    {line}", flush=True)
+        lines.append("  期望输出:")
+        lines.extend(f"    {line}" for line in (result.expected_output or "").splitlines())
+    return lines
 
 
-def run_cli(
-    project: Path,
-    show_cycle: bool = False,
-    show_time: bool = False,
-    match: Optional[List[str]] = None,
-    compilers: Optional[List[str]] = None,
-) -> int:
-    """命令行模式：编译并运行所有测试，日志输出到控制台"""
-    config = get_config()
-    test_dir = Path(__file__).parent.parent.resolve()
-    project_path = Path(project).resolve()
+def collect_cases(testcases_dir: Path, match: Optional[List[str]] = None) -> Tuple[List[Path], List[TestCase]]:
+    """发现所有测试库与用例（用例名带上测试库相对路径），并按 --match 过滤"""
+    libs = TestDiscovery.discover_test_libs(testcases_dir)
+    cases: List[TestCase] = []
+    for lib in libs:
+        rel = lib.relative_to(testcases_dir)
+        for case in TestDiscovery.discover_in_dir(lib):
+            if str(rel) != ".":
+                case.name = f"{rel}/{case.name}"
+            cases.append(case)
 
-    print(LOGO)
-    print(_format_output("INFO", f"使用路径: {project_path}"))
+    if match:
+        lowered = [m.lower() for m in match if m]
+        if lowered:
+            cases = [c for c in cases if any(m in c.name.lower() for m in lowered)]
+    return libs, cases
 
-    if not project_path.exists():
-        print(_format_output("ERROR", "路径不存在"))
-        return 1
 
+def build_testers(
+    project_path: Path,
+    test_dir: Path,
+    selected_names: Optional[List[str]] = None,
+) -> List[CompilerTester]:
+    """根据 --project 参数构建编译器实例（zip 目录 / 单个 zip / 旧工程目录）；失败时打印原因并返回空列表"""
     testers: List[CompilerTester] = []
-    selected_names: Optional[List[str]] = [c.strip() for c in (compilers or []) if c and c.strip()] or None
 
     # 兼容：--project <zip_dir> / <zip> / <旧工程目录>
     if project_path.is_file() and project_path.suffix.lower() == ".zip":
@@ -77,8 +89,8 @@ def run_cli(
         instances = discover_zip_compilers(zip_dir)
         inst = next((i for i in instances if i.zip_path.resolve() == project_path), None)
         if inst is None:
-            print(_format_output("ERROR", f"未能识别 zip: {project_path.name}"))
-            return 1
+            print(format_output("ERROR", f"未能识别 zip: {project_path.name}"))
+            return []
         extracted = extract_zip_instance(inst, test_dir / ".tmp" / "zip_sources")
         testers = [CompilerTester(extracted, test_dir, instance_name=inst.name)]
     elif project_path.is_dir():
@@ -90,26 +102,70 @@ def run_cli(
                 instances = [i for i in instances if i.name.lower() in wanted or i.zip_path.name.lower() in wanted]
             instances = [i for i in instances if i.valid]
             if not instances:
-                print(_format_output("ERROR", "未找到可用的编译器 zip（或选择为空）"))
-                return 1
+                print(format_output("ERROR", "未找到可用的编译器 zip（或选择为空）"))
+                return []
             for inst in instances:
                 extracted = extract_zip_instance(inst, test_dir / ".tmp" / "zip_sources")
                 testers.append(CompilerTester(extracted, test_dir, instance_name=inst.name))
         else:
             testers = [CompilerTester(project_path, test_dir, instance_name=project_path.name)]
     else:
-        print(_format_output("ERROR", "参数必须为目录或 zip 文件"))
+        print(format_output("ERROR", "参数必须为目录或 zip 文件"))
+        return []
+
+    return testers
+
+
+def run_cli(
+    project: Path,
+    show_cycle: bool = False,
+    show_time: bool = False,
+    match: Optional[List[str]] = None,
+    compilers: Optional[List[str]] = None,
+    run: Optional[RunConfig] = None,
+    baseline: Optional[str] = None,
+    regression_threshold: float = 1.0,
+    top: int = 10,
+    save_baseline_path: Optional[str] = None,
+    leaderboard: bool = False,
+    leaderboard_csv: Optional[str] = None,
+    leaderboard_html: Optional[str] = None,
+    report_jsonl: Optional[str] = None,
+    report_junit: Optional[str] = None,
+    verbosity: int = NORMAL,
+) -> int:
+    """命令行模式：编译并运行所有测试，日志输出到控制台
+
+    指定 baseline 时对比 cycle；有用例变差超过 regression_threshold（%）时返回非零。
+    多个实例（或 leaderboard=True）时在最后输出排行榜，也可另存为 CSV / HTML。
+    report_jsonl / report_junit 指定时随结果到达增量写出机器可读报告。
+    verbosity 为 QUIET / NORMAL / VERBOSE：默认只输出失败与进度，VERBOSE 时输出每个 PASS 行。
+    """
+    config = get_config()
+    test_dir = Path(__file__).parent.parent.resolve()
+    project_path = Path(project).resolve()
+
+    print(LOGO)
+    print(format_output("INFO", f"使用路径: {project_path}"))
+
+    if not project_path.exists():
+        print(format_output("ERROR", "路径不存在"))
+        return 1
+
+    selected_names: Optional[List[str]] = [c.strip() for c in (compilers or []) if c and c.strip()] or None
+    testers = build_testers(project_path, test_dir, selected_names)
+    if not testers:
         return 1
 
     for t in testers:
         lang = t.get_compiler_language().upper()
-        print(_format_output("INFO", f"编译器实例: {t.instance_name} ({lang})"))
+        print(format_output("INFO", f"编译器实例: {t.instance_name} ({lang})"))
 
     compile_results = compile_testers(testers, max_workers=config.parallel.max_workers)
     ok_testers: List[CompilerTester] = []
     for t in testers:
         ok, msg = compile_results.get(t.instance_name, (False, "编译失败"))
-        print(_format_output("INFO" if ok else "ERROR", f"[{t.instance_name}] {msg}"))
+        print(format_output("INFO" if ok else "ERROR", f"[{t.instance_name}] {msg}"))
         if ok:
             ok_testers.append(t)
 
@@ -117,60 +173,170 @@ def run_cli(
         return 1
 
     testcases_dir = test_dir / "testcases"
-    libs = TestDiscovery.discover_test_libs(testcases_dir)
-    cases: List = []
-    for lib in libs:
-        rel = lib.relative_to(testcases_dir)
-        for case in TestDiscovery.discover_in_dir(lib):
-            if str(rel) == ".":
-                case.name = case.name
-            else:
-                case.name = f"{rel}/{case.name}"
-            cases.append(case)
-
-    if match:
-        lowered = [m.lower() for m in match if m]
-        if lowered:
-            cases = [c for c in cases if any(m in c.name.lower() for m in lowered)]
+    libs, cases = collect_cases(testcases_dir, match)
 
     if not cases:
-        print(_format_output("WARN", "未发现测试用例"))
+        print(format_output("WARN", "未发现测试用例"))
         return 0
     
-    print(_format_output("INFO", f"发现 {len(libs)} 个测试库，共 {len(cases)} 个用例"))
-    print(_format_output("INFO", f"并行线程: {config.parallel.max_workers}"))
-    print(_format_output("INFO", f"编译器实例: {len(ok_testers)} 个"))
+    print(format_output("INFO", f"发现 {len(libs)} 个测试库，共 {len(cases)} 个用例"))
+    workers_label = "auto" if config.parallel.auto else str(config.parallel.max_workers)
+    print(format_output("INFO", f"并行线程: {workers_label}"))
+    print(format_output("INFO", f"编译器实例: {len(ok_testers)} 个"))
     
     passed = 0
     failed = 0
     total = len(cases) * len(ok_testers)
     per_compiler = {t.instance_name: [0, 0] for t in ok_testers}  # passed, failed
+    board = None
+    if leaderboard or leaderboard_csv or leaderboard_html or len(ok_testers) > 1:
+        board = Leaderboard(testcases_dir, config.instruction_weights)
+    reports = StreamingReports(
+        testcases_dir,
+        jsonl_path=Path(report_jsonl) if report_jsonl else None,
+        junit_path=Path(report_junit) if report_junit else None,
+    )
     
+    renderer = ProgressRenderer(total, verbosity)
+
+    # 回调只格式化要输出的行并交给渲染线程，不直接写 stdout
     def on_result(tester: CompilerTester, case, result, completed, total_tasks):
         nonlocal passed, failed
+        if board is not None:
+            board.add(tester.instance_name, case, result)
+        lines: List[str] = []
         if result.passed:
             passed += 1
             per_compiler[tester.instance_name][0] += 1
-            extra_parts = []
-            if show_time and result.compile_time_ms is not None:
-                extra_parts.append(f"compile={result.compile_time_ms}ms")
-            if show_cycle and result.cycle is not None:
-                extra_parts.append(f"cycle={result.cycle}")
-            suffix = f" ({', '.join(extra_parts)})" if extra_parts else ""
-            print(_format_output("PASS", f"[{tester.instance_name}] {case.name}{suffix}"), flush=True)
+            if verbosity >= VERBOSE:
+                extra_parts = []
+                if show_time and result.compile_time_ms is not None:
+                    extra_parts.append(f"compile={result.compile_time_ms}ms")
+                if show_cycle and result.cycle is not None:
+                    extra_parts.append(f"cycle={result.cycle}")
+                suffix = f" ({', '.join(extra_parts)})" if extra_parts else ""
+                lines.append(format_output("PASS", f"[{tester.instance_name}] {case.name}{suffix}"))
         else:
             failed += 1
             per_compiler[tester.instance_name][1] += 1
-            _print_failure_detail(f"[{tester.instance_name}] {case.name}", result)
-        progress = completed / total_tasks * 100 if total_tasks else 100.0
-        print(_format_output("INFO", f"进度: {passed + failed}/{total} ({progress:.1f}%)"), flush=True)
+            lines = _failure_lines(f"[{tester.instance_name}] {case.name}", result, detail=verbosity > QUIET)
+        renderer.result(result.passed, lines)
+        if reports:
+            reports.add(tester.instance_name, case, result)
+        # 完整输出已格式化（并落盘到报告 artifacts），不再随结果列表保留到运行结束
+        result.actual_output = None
+        result.expected_output = None
     
-    test_multi(ok_testers, cases, max_workers=config.parallel.max_workers, callback=on_result)
+    history = open_history(test_dir, config.history_db)
+    baseline_table = None
+    if baseline:
+        try:
+            baseline_label, baseline_table = load_baseline(baseline, history)
+        except ValueError as e:
+            print(format_output("ERROR", str(e)))
+            if history:
+                history.close()
+            reports.close()
+            return 1
+        print(format_output("INFO", f"Cycle 基线: {baseline_label}"))
+    renderer.start()
+    try:
+        results = test_multi(
+            ok_testers, cases,
+            max_workers=config.parallel.max_workers,
+            callback=on_result,
+            adaptive=config.parallel.auto,
+            log=lambda m: renderer.message(format_output("INFO", m)),
+            run=run or config.run,
+            history=history,
+        )
+        # 被跳过的用例不触发回调，结束时补记到报告
+        if reports:
+            for name, case, result in results:
+                if result.status == TestStatus.SKIPPED:
+                    reports.add(name, case, result)
+    finally:
+        renderer.stop()
+        if history:
+            history.close()
+        reports.close()
+    if report_jsonl:
+        print(format_output("INFO", f"已写出 JSON Lines 报告: {report_jsonl}"))
+    if report_junit:
+        print(format_output("INFO", f"已写出 JUnit 报告: {report_junit}"))
     
-    print(_format_output("INFO", f"完成: {passed} 通过, {failed} 失败, 共 {total}"))
+    skipped = sum(1 for _, _, r in results if r.status == TestStatus.SKIPPED)
+    skipped_part = f", {skipped} 跳过" if skipped else ""
+    print(format_output("INFO", f"完成: {passed} 通过, {failed} 失败{skipped_part}, 共 {total}"))
     for name, (p, f) in per_compiler.items():
-        print(_format_output("INFO", f"  - {name}: {p} 通过, {f} 失败"), flush=True)
-    return 0 if failed == 0 else 1
+        print(format_output("INFO", f"  - {name}: {p} 通过, {f} 失败"), flush=True)
+
+    if board is not None:
+        for line in board.format_table():
+            print(format_output("RANK", line), flush=True)
+        if leaderboard_csv:
+            board.write_csv(Path(leaderboard_csv))
+            print(format_output("INFO", f"已保存排行榜 CSV: {leaderboard_csv}"))
+        if leaderboard_html:
+            board.write_html(Path(leaderboard_html))
+            print(format_output("INFO", f"已保存排行榜 HTML: {leaderboard_html}"))
+
+    regressed = False
+    if baseline_table is not None or save_baseline_path:
+        cycles = collect_cycles(results, testcases_dir)
+        if save_baseline_path:
+            save_baseline(Path(save_baseline_path), cycles)
+            print(format_output("INFO", f"已保存 cycle 基线: {save_baseline_path}"))
+        if baseline_table is not None:
+            report = compare_cycles(baseline_label, baseline_table, cycles)
+            for line in format_report(report, regression_threshold, top):
+                print(format_output("CYCLE", line), flush=True)
+            regressed = bool(report.regressions(regression_threshold))
+            if regressed:
+                print(format_output("ERROR", f"有用例 cycle 变差超过 {regression_threshold:g}%"))
+    return 0 if failed == 0 and not regressed else 1
+
+
+def _format_time(ts: Optional[float]) -> str:
+    if not ts:
+        return "-"
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M")
+
+
+def run_history_query(query: str, compiler: Optional[str], runs: int, limit: int, stage: str) -> int:
+    """命令行模式：查询运行历史"""
+    config = get_config()
+    test_dir = Path(__file__).parent.parent.resolve()
+    history = open_history(test_dir, config.history_db)
+    if history is None:
+        return 1
+    try:
+        if query == "runs":
+            rows = history.recent_runs(limit)
+            print(f"{'run':>5}  {'开始时间':<16}  {'结束时间':<16}  {'来源':<4}  用例数")
+            for run_id, started, finished, source, case_count in rows:
+                print(f"{run_id:>5}  {_format_time(started):<16}  {_format_time(finished):<16}  {source:<4}  {case_count}")
+        elif query == "flaky":
+            rows = history.flaky_cases(compiler, runs=runs, limit=limit)
+            if not rows:
+                print(format_output("INFO", f"最近 {runs} 次运行中没有结果不一致的用例"))
+            for name, key, passes, fails, statuses in rows:
+                print(f"[{name}] {key}  通过 {passes} 次 / 未通过 {fails} 次  ({statuses})")
+        elif query == "trend":
+            rows = history.pass_rate_trend(compiler, runs=runs)
+            for run_id, started, name, passed, total in rows:
+                rate = passed / total * 100 if total else 0.0
+                bar = "█" * int(rate // 5)
+                print(f"{run_id:>5}  {_format_time(started):<16}  [{name}] {passed}/{total} {rate:5.1f}% {bar}")
+        else:
+            rows = history.slowest_cases(compiler, stage=stage, runs=runs, limit=limit)
+            for name, key, avg_ms, max_ms, n in rows:
+                print(f"{avg_ms:9.0f} ms (max {max_ms:.0f}, n={n})  [{name}] {key}")
+        if not rows and query != "flaky":
+            print(format_output("INFO", "暂无运行历史"))
+    finally:
+        history.close()
+    return 0
 
 
 def main(argv=None):
@@ -194,22 +360,197 @@ def main(argv=None):
     parser.add_argument(
         "--show-cycle",
         action="store_true",
-        help="在 PASS 行显示 FinalCycle（若可用）",
+        help="在 PASS 行显示 FinalCycle（若可用；PASS 行需配合 -v）",
     )
     parser.add_argument(
         "--show-time",
         action="store_true",
-        help="在 PASS 行显示编译耗时（ms）",
+        help="在 PASS 行显示编译耗时（ms；PASS 行需配合 -v）",
+    )
+    parser.add_argument(
+        "--max-failures",
+        type=int,
+        metavar="N",
+        help="单个编译器实例失败 N 次后停止该实例（覆盖 config.yaml 的 run.max_failures）",
+    )
+    parser.add_argument(
+        "--max-compile-errors",
+        type=int,
+        metavar="M",
+        help="连续 M 次编译错误后停止该实例",
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        metavar="SECONDS",
+        help="总时间预算（秒），用尽后跳过剩余用例",
+    )
+    parser.add_argument(
+        "--smoke",
+        action="store_true",
+        help="冒烟顺序：先从每个测试库各取一个用例",
+    )
+    parser.add_argument(
+        "--failures-first",
+        action="store_true",
+        help="历史优先：先运行上次失败的用例，再运行上次运行后文件有改动的用例",
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="RUN_ID|FILE",
+        help="与运行历史中的某次运行（run id 或 last）或基线文件对比 cycle",
+    )
+    parser.add_argument(
+        "--regression-threshold",
+        type=float,
+        default=1.0,
+        metavar="PCT",
+        help="cycle 变差超过该百分比时视为回归并返回非零（默认 1.0）",
     )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="显示变差/改进最多的前 N 个用例（默认 10）",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        metavar="FILE",
+        help="把本次通过用例的 cycle 保存为基线文件",
+    )
+    parser.add_argument(
+        "--leaderboard",
+        action="store_true",
+        help="输出排行榜（多个编译器实例时默认输出）",
+    )
+    parser.add_argument(
+        "--leaderboard-csv",
+        metavar="FILE",
+        help="把排行榜保存为 CSV",
+    )
+    parser.add_argument(
+        "--leaderboard-html",
+        metavar="FILE",
+        help="把排行榜保存为 HTML",
+    )
+    parser.add_argument(
+        "--report-jsonl",
+        metavar="FILE",
+        help="随结果到达写出 JSON Lines 报告（每个结果一行）",
+    )
+    parser.add_argument(
+        "--report-junit",
+        metavar="FILE",
+        help="写出 JUnit XML 报告（按编译器实例与测试库分组）",
+    )
+    verbosity_group = parser.add_mutually_exclusive_group()
+    verbosity_group.add_argument(
+        "-q", "--quiet",
+        action="store_true",
+        help="只输出失败用例（不含输出对比）与最终汇总",
+    )
+    verbosity_group.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="输出每个 PASS 行（默认只输出失败与进度）",
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="{history,bench,agent-batch}")
+    history_parser = subparsers.add_parser(
+        "history",
+        help="查询运行历史（runs / flaky / trend / slowest）",
+        description="查询 .tmp/history.sqlite3 中的运行历史",
+    )
+    history_parser.add_argument(
+        "query",
+        choices=["runs", "flaky", "trend", "slowest"],
+        help="runs=最近运行，flaky=同一版本结果不一致的用例，trend=通过率趋势，slowest=最慢用例",
+    )
+    history_parser.add_argument("--compiler", help="只看指定编译器实例")
+    history_parser.add_argument("--runs", type=int, default=20, help="只统计最近 N 次运行（默认 20）")
+    history_parser.add_argument("--limit", type=int, default=20, help="最多显示的行数（默认 20）")
+    history_parser.add_argument(
+        "--stage",
+        choices=["total", "compile", "mars", "gcc"],
+        default="total",
+        help="slowest 按哪个阶段的耗时排序（默认 compile+mars）",
+    )
+    bench_parser = subparsers.add_parser(
+        "bench",
+        help="多次重复运行选中的用例，统计编译/Mars 耗时（中位数、p95、MAD）",
+        description="多次重复运行选中的用例，统计编译器耗时与 Mars 耗时",
+    )
+    bench_parser.add_argument("--project", required=True, help="zip 目录 / 单个 zip / 编译器项目目录")
+    bench_parser.add_argument("--compiler", action="append", help="只选择指定的编译器实例（可重复指定）")
+    bench_parser.add_argument("--match", action="append", help="只运行用例名包含该子串的用例（可重复指定）")
+    bench_parser.add_argument("-k", "--repeat", type=int, default=5, help="每个用例计时的次数（默认 5）")
+    bench_parser.add_argument("--warmup", type=int, default=1, help="丢弃的预热次数（默认 1）")
+    bench_parser.add_argument("-j", "--jobs", type=int, default=1, help="并发数（默认 1，避免相互干扰）")
+    batch_parser = subparsers.add_parser(
+        "agent-batch",
+        help="无界面批量运行 AI Agent，并发生成测试用例",
+        description="每条提示词 / 每个源文件运行一个独立的 Agent 会话，通过的用例保存到指定测试库",
+    )
+    batch_parser.add_argument("--prompts", help="提示词文件，每行一条（# 开头为注释）")
+    batch_parser.add_argument(
+        "--sources", action="append", help="需要改写为 SysY 的源文件或目录（可重复指定）"
+    )
+    batch_parser.add_argument("--lib", required=True, help="保存到的测试库（testcases/ 下的相对路径）")
+    batch_parser.add_argument("-j", "--jobs", type=int, default=4, help="同时运行的会话数（默认 4）")
+    batch_parser.add_argument("--timeout", type=float, default=600, help="单个会话的超时秒数（默认 600）")
+    batch_parser.add_argument("--agent-config", help="Agent 配置文件（默认 agent_config.json）")
+    batch_parser.add_argument("-v", "--verbose", action="store_true", help="输出每个会话的工具调用")
     args = parser.parse_args(argv)
 
+    if args.command == "agent-batch":
+        if not args.prompts and not args.sources:
+            batch_parser.error("至少需要 --prompts 或 --sources")
+        from .agent.batch import run_agent_batch_cli
+        sys.exit(run_agent_batch_cli(
+            args.prompts, args.sources, args.lib,
+            jobs=max(1, args.jobs), timeout_s=max(1.0, args.timeout),
+            agent_config_path=args.agent_config, verbose=args.verbose,
+        ))
+
+    if args.command == "bench":
+        from .bench import run_bench_cli
+        sys.exit(run_bench_cli(
+            args.project, args.compiler, args.match,
+            repeat=max(1, args.repeat), warmup=max(0, args.warmup), jobs=max(1, args.jobs),
+        ))
+
+    if args.command == "history":
+        sys.exit(run_history_query(args.query, args.compiler, args.runs, args.limit, args.stage))
+
     if args.project:
+        run = get_config().run
+        overrides = {}
+        if args.max_failures is not None:
+            overrides["max_failures"] = max(0, args.max_failures)
+        if args.max_compile_errors is not None:
+            overrides["max_consecutive_compile_errors"] = max(0, args.max_compile_errors)
+        if args.budget is not None:
+            overrides["time_budget_s"] = max(0.0, args.budget)
+        if args.smoke:
+            overrides["order"] = "smoke"
+        if args.failures_first:
+            overrides["failures_first"] = True
         exit_code = run_cli(
             args.project,
             show_cycle=args.show_cycle,
             show_time=args.show_time,
             match=args.match,
             compilers=args.compiler,
+            run=dataclasses.replace(run, **overrides),
+            baseline=args.baseline,
+            regression_threshold=args.regression_threshold,
+            top=max(1, args.top),
+            save_baseline_path=args.save_baseline,
+            leaderboard=args.leaderboard,
+            leaderboard_csv=args.leaderboard_csv,
+            leaderboard_html=args.leaderboard_html,
+            report_jsonl=args.report_jsonl,
+            report_junit=args.report_junit,
+            verbosity=QUIET if args.quiet else VERBOSE if args.verbose else NORMAL,
         )
         sys.exit(exit_code)
 
@@ -0,0 +1,50 @@
+"""
+命令模板模块 - 根据 config.yaml 的 commands / jvm 段构造各阶段的命令行
+"""
+import hashlib
+import json
+import shlex
+from typing import List, Optional
+
+from .config import Config
+
+
+JVM_OPTIONS_PLACEHOLDER = "{jvm_options}"
+
+
+def stage_jvm_options(config: Config, stage: str) -> List[str]:
+    """某阶段的 JVM 参数：公共 startup_flags + 该阶段的 stage_options"""
+    jvm = config.jvm
+    return list(jvm.startup_flags) + list(jvm.stage_options.get(stage, []))
+
+
+def build_command(template: str, jvm_options: Optional[List[str]] = None, **values: str) -> List[str]:
+    """展开命令模板为参数列表。
+
+    先按 shell 规则拆分模板再替换占位符，因此路径中的空格无需转义；
+    单独成项的 {jvm_options} 展开为多个参数（可为空）。
+    """
+    cmd: List[str] = []
+    for token in shlex.split(template):
+        if token == JVM_OPTIONS_PLACEHOLDER:
+            cmd.extend(jvm_options or [])
+        else:
+            cmd.append(token.format(**values))
+    return cmd
+
+
+def command_fingerprint(config: Config, language: str) -> str:
+    """影响运行结果的命令配置指纹（java 路径、JVM 参数、各阶段模板）。
+
+    结果缓存/历史记录的键应包含该指纹，修改 JVM 参数或命令模板后旧结果即失效。
+    AppCDS 归档只影响启动速度，不计入指纹。
+    """
+    payload = {
+        "java": config.tools.get_java(),
+        "startup_flags": list(config.jvm.startup_flags),
+        "stage_options": {k: list(v) for k, v in sorted(config.jvm.stage_options.items())},
+        "compile": config.commands.template("compile", language),
+        "mars": config.commands.template("mars", language),
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
@@ -0,0 +1,201 @@
+"""
+并发控制模块 - 根据 CPU、可用内存与观测到的子进程 RSS 自动调节并发（AIMD）
+
+`parallel.max_workers: auto` 时启用：
+- 从较低并发起步，吞吐量仍在提升时加性增加（+1）
+- 出现超时或内存紧张时乘性减小（减半）
+- 并发上限受 CPU 核数与「可用内存 / 单任务峰值 RSS」约束
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+from .config import get_config
+from .models import TestResult
+
+
+# 尚未观测到 RSS 时，按一个 JVM 的典型占用估算（MB）
+_DEFAULT_TASK_RSS_MB = 256
+
+
+def available_memory_mb() -> Optional[int]:
+    """当前可用物理内存（MB）；无法获取时返回 None"""
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/meminfo", "r", encoding="ascii") as f:
+                for line in f:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) // 1024
+        except (OSError, ValueError, IndexError):
+            return None
+        return None
+
+    if os.name == "nt":
+        try:
+            import ctypes
+
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [
+                    ("dwLength", ctypes.c_ulong),
+                    ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong),
+                    ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong),
+                    ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong),
+                    ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+                ]
+
+            stat = MEMORYSTATUSEX()
+            stat.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(stat)):
+                return int(stat.ullAvailPhys // (1024 * 1024))
+        except Exception:
+            return None
+        return None
+
+    try:
+        pages = os.sysconf("SC_AVPHYS_PAGES")
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        return int(pages * page_size // (1024 * 1024))
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def cpu_count() -> int:
+    """当前进程可用的 CPU 核数"""
+    if hasattr(os, "sched_getaffinity"):
+        try:
+            return max(1, len(os.sched_getaffinity(0)))
+        except OSError:
+            pass
+    return max(1, os.cpu_count() or 1)
+
+
+class ConcurrencyController:
+    """并发控制器。
+
+    调用方在「在途任务数 < limit」时提交新任务，并在每个结果返回后调用 on_result。
+    adaptive=False 时 limit 恒等于 max_limit。
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        max_limit: int,
+        adaptive: bool = False,
+        memory_reserve_mb: int = 512,
+        window_s: float = 2.0,
+    ):
+        self.max_limit = max(1, int(max_limit))
+        self.adaptive = adaptive
+        self.memory_reserve_mb = max(0, int(memory_reserve_mb))
+        self.window_s = window_s
+
+        self._lock = threading.Lock()
+        self._limit = max(1, min(int(initial), self.max_limit))
+        self._window_start = time.monotonic()
+        self._window_done = 0
+        self._window_timeouts = 0
+        self._prev_throughput: Optional[float] = None
+        self._last_decrease = 0.0
+
+        # 各阶段观测到的峰值 RSS（KB）
+        self.stage_rss_kb: Dict[str, int] = {}
+        self.last_action = ""
+
+    @classmethod
+    def create(cls, max_workers: int, adaptive: bool = False) -> "ConcurrencyController":
+        """根据配置构建控制器：固定并发，或 AIMD 自动调节"""
+        max_workers = max(1, int(max_workers or 1))
+        if not adaptive:
+            return cls(max_workers, max_workers, adaptive=False)
+
+        parallel = get_config().parallel
+        cores = cpu_count()
+        ceiling = int(getattr(parallel, "auto_max_workers", 0) or 0) or cores * 2
+        initial = max(1, min(ceiling, cores // 2 or 1))
+        return cls(
+            initial,
+            ceiling,
+            adaptive=True,
+            memory_reserve_mb=getattr(parallel, "auto_memory_reserve_mb", 512),
+        )
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def task_rss_mb(self) -> int:
+        """单个在途任务的峰值内存估计（各阶段串行执行，取各阶段最大值）"""
+        if not self.stage_rss_kb:
+            return _DEFAULT_TASK_RSS_MB
+        return max(1, max(self.stage_rss_kb.values()) // 1024)
+
+    def on_result(self, result: TestResult) -> None:
+        with self._lock:
+            for stage, rss in (result.stage_rss_kb or {}).items():
+                if rss > self.stage_rss_kb.get(stage, 0):
+                    self.stage_rss_kb[stage] = rss
+            if not self.adaptive:
+                return
+
+            self._window_done += 1
+            if result.timed_out:
+                self._window_timeouts += 1
+
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            # 超时立即退避（每个窗口至多一次）；其余情况按窗口评估吞吐量
+            if self._window_timeouts and now - self._last_decrease >= self.window_s:
+                self._decrease(now, "timeout")
+                self._reset_window(now, None)
+                return
+            if elapsed < self.window_s:
+                return
+
+            throughput = self._window_done / elapsed if elapsed > 0 else 0.0
+            avail = available_memory_mb()
+            if avail is not None and avail < self.memory_reserve_mb:
+                self._decrease(now, f"memory {avail}MB")
+                self._reset_window(now, None)
+                return
+
+            prev = self._prev_throughput
+            if prev is None or throughput > prev * 1.05:
+                self._increase(avail)
+            elif throughput < prev * 0.9 and self._limit > 1:
+                # 加并发后吞吐下降：回退一步
+                self._limit -= 1
+                self.last_action = f"-1 (throughput {throughput:.2f}/s)"
+            else:
+                self.last_action = f"hold (throughput {throughput:.2f}/s)"
+            self._reset_window(now, throughput)
+
+    def _increase(self, avail_mb: Optional[int]) -> None:
+        cap = self.max_limit
+        if avail_mb is not None:
+            spare = max(0, avail_mb - self.memory_reserve_mb) // self.task_rss_mb()
+            cap = min(cap, self._limit + spare)
+        if self._limit < cap:
+            self._limit += 1
+            self.last_action = "+1"
+        else:
+            self.last_action = "hold (cap)"
+
+    def _decrease(self, now: float, reason: str) -> None:
+        self._limit = max(1, self._limit // 2)
+        self._last_decrease = now
+        self.last_action = f"/2 ({reason})"
+
+    def _reset_window(self, now: float, throughput: Optional[float]) -> None:
+        self._window_start = now
+        self._window_done = 0
+        self._window_timeouts = 0
+        self._prev_throughput = throughput
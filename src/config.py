@@ -1,10 +1,11 @@
 """
 配置模块 - 从YAML文件加载配置
 """
+import os
 import yaml
 from pathlib import Path
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, List, Optional
 try:
     import tkinter.font as tkfont
 except Exception:
@@ -27,6 +28,48 @@ class TimeoutConfig:
 class ParallelConfig:
     """并行配置"""
     max_workers: int = 4
+    auto: bool = False                 # max_workers: auto 时按 CPU/内存/RSS 自动调节并发
+    auto_max_workers: int = 0          # 自动调节的并发上限（0 = CPU 核数 × 2）
+    auto_memory_reserve_mb: int = 512  # 可用内存低于该值时降低并发
+
+
+@dataclass
+class RunConfig:
+    """运行模式（快速失败 / 时间预算 / 用例顺序）"""
+    max_failures: int = 0                    # 单个编译器实例失败达到 N 次后停止该实例（0 = 不限）
+    max_consecutive_compile_errors: int = 0  # 连续 M 次编译错误后停止该实例（0 = 不限）
+    time_budget_s: float = 0                 # 总时间预算（秒），用尽后不再提交新用例（0 = 不限）
+    order: str = "default"                   # 用例顺序：default / smoke（先从每个测试库各取一个）
+    failures_first: bool = False             # 历史优先：先跑上次失败的用例，再跑文件有改动的用例
+
+
+@dataclass
+class JvmConfig:
+    """JVM 启动配置（Mars.jar / Compiler.jar）"""
+    startup_flags: List[str] = field(default_factory=lambda: ["-XX:+UseSerialGC"])  # 所有 JVM 共用的启动参数
+    stage_options: Dict[str, List[str]] = field(default_factory=dict)  # 按阶段追加的参数：compile / mars
+    cds: bool = True              # 为每个 jar 生成并使用 AppCDS 归档（需 JDK 11+）
+    cds_training_cases: int = 3   # 生成归档时用于训练的用例数
+    cds_dir: str = ".tmp/cds"     # 归档缓存目录（相对于测试框架目录）
+
+
+@dataclass
+class CommandsConfig:
+    """各阶段命令模板（按语言区分，"*" 为默认）
+
+    占位符：{java} {jvm_options} {jar} {exe} {mips}；{jvm_options} 必须单独作为一项，展开为多个参数
+    """
+    compile: Dict[str, str] = field(default_factory=lambda: {
+        "java": "{java} {jvm_options} -jar {jar}",
+        "*": "{exe}",
+    })
+    mars: Dict[str, str] = field(default_factory=lambda: {
+        "*": "{java} {jvm_options} -jar {jar} nc {mips}",
+    })
+
+    def template(self, stage: str, language: str) -> str:
+        templates = getattr(self, stage)
+        return templates.get(language) or templates["*"]
 
 
 @dataclass
@@ -107,6 +150,9 @@ class Config:
     """全局配置"""
     compiler_project_dir: str = "zips/"
     mars_jar: str = "MARS2025+.jar"
+    work_root: str = ""                 # worker 目录根：空=.tmp/compilers，"auto"=优先 /dev/shm，或显式路径
+    work_root_min_free_mb: int = 256    # work_root 剩余空间低于该值时回退到 .tmp/compilers
+    history_db: str = ".tmp/history.sqlite3"  # 运行历史数据库（相对于测试框架目录）
     c_header: str = ""
     instruction_weights: dict = field(default_factory=lambda: {
         "Division": 15,
@@ -117,6 +163,9 @@ class Config:
     })
     timeout: TimeoutConfig = field(default_factory=TimeoutConfig)
     parallel: ParallelConfig = field(default_factory=ParallelConfig)
+    run: RunConfig = field(default_factory=RunConfig)
+    jvm: JvmConfig = field(default_factory=JvmConfig)
+    commands: CommandsConfig = field(default_factory=CommandsConfig)
     tools: ToolsConfig = field(default_factory=ToolsConfig)
     gui: GuiConfig = field(default_factory=GuiConfig)
     
@@ -167,10 +216,55 @@ class Config:
         )
         
         parallel_data = data.get('parallel', {})
+        raw_workers = parallel_data.get('max_workers', 4)
+        auto_workers = isinstance(raw_workers, str) and raw_workers.strip().lower() == 'auto'
+        if auto_workers:
+            # 自动模式下 max_workers 取 CPU 核数，供编译等非自适应场景使用
+            raw_workers = os.cpu_count() or 4
         parallel = ParallelConfig(
-            max_workers=parallel_data.get('max_workers', 4)
+            max_workers=int(raw_workers),
+            auto=auto_workers,
+            auto_max_workers=parallel_data.get('auto_max_workers', 0),
+            auto_memory_reserve_mb=parallel_data.get('auto_memory_reserve_mb', 512),
         )
         
+        run_data = data.get('run', {}) or {}
+        run = RunConfig(
+            max_failures=int(run_data.get('max_failures', 0) or 0),
+            max_consecutive_compile_errors=int(run_data.get('max_consecutive_compile_errors', 0) or 0),
+            time_budget_s=float(run_data.get('time_budget_s', 0) or 0),
+            order=str(run_data.get('order', 'default') or 'default').lower(),
+            failures_first=bool(run_data.get('failures_first', False)),
+        )
+        
+        jvm_data = data.get('jvm', {}) or {}
+        startup_flags = jvm_data.get('startup_flags', ["-XX:+UseSerialGC"]) or []
+        if isinstance(startup_flags, str):
+            startup_flags = startup_flags.split()
+        stage_options = {}
+        for stage, opts in (jvm_data.get('stage_options') or {}).items():
+            if isinstance(opts, str):
+                opts = opts.split()
+            stage_options[str(stage)] = [str(o) for o in (opts or [])]
+        jvm = JvmConfig(
+            startup_flags=[str(f) for f in startup_flags],
+            stage_options=stage_options,
+            cds=bool(jvm_data.get('cds', True)),
+            cds_training_cases=jvm_data.get('cds_training_cases', 3),
+            cds_dir=jvm_data.get('cds_dir', '.tmp/cds') or '.tmp/cds',
+        )
+        
+        commands = CommandsConfig()
+        for stage, value in (data.get('commands') or {}).items():
+            if stage not in ('compile', 'mars') or not value:
+                continue
+            templates = getattr(commands, stage)
+            if isinstance(value, str):
+                templates['*'] = value
+                templates.pop('java', None)
+            else:
+                templates.update({str(k): str(v) for k, v in value.items() if v})
+        
         tools_data = data.get('tools', {})
         tools = ToolsConfig(
             jdk_home=tools_data.get('jdk_home', ''),
@@ -181,6 +275,9 @@ class Config:
         return cls(
             compiler_project_dir=data.get('compiler_project_dir', 'zips/'),
             mars_jar=data.get('mars_jar', 'Mars.jar'),
+            work_root=data.get('work_root', '') or '',
+            work_root_min_free_mb=data.get('work_root_min_free_mb', 256),
+            history_db=data.get('history_db', '.tmp/history.sqlite3') or '.tmp/history.sqlite3',
             c_header=data.get('c_header', cls._default_c_header()),
             instruction_weights=data.get('instruction_weights', {
                 "Division": 15,
@@ -191,6 +288,9 @@ class Config:
             }),
             timeout=timeout,
             parallel=parallel,
+            run=run,
+            jvm=jvm,
+            commands=commands,
             tools=tools,
             gui=gui
         )
@@ -211,6 +311,9 @@ class Config:
             },
             timeout=TimeoutConfig(),
             parallel=ParallelConfig(),
+            run=RunConfig(),
+            jvm=JvmConfig(),
+            commands=CommandsConfig(),
             tools=ToolsConfig(),
             gui=GuiConfig()
         )
@@ -1,8 +1,9 @@
 """
 测试用例发现模块
 """
+import dataclasses
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from .models import TestCase
 
@@ -176,3 +177,55 @@ class TestDiscovery:
                 continue
 
         return max_num + 1
+
+
+class CaseIndex:
+    """测试库与用例的缓存索引（GUI 用例浏览器使用）。
+
+    首次访问某个库时扫描一次并缓存，之后切换库、过滤都不再访问文件系统；refresh() 时清空缓存。
+    用例的标签为其所在的各级子目录名（如 `07_community_contrib` 下的 `guluor-w`）。
+    """
+
+    def __init__(self, testcases_dir: Path):
+        self.testcases_dir = testcases_dir
+        self._libs: Optional[List[Path]] = None
+        # lib -> [(用例, 小写名称, 标签)]
+        self._entries: Dict[Path, List[Tuple[TestCase, str, Tuple[str, ...]]]] = {}
+
+    def refresh(self) -> None:
+        self._libs = None
+        self._entries.clear()
+
+    def libs(self) -> List[Path]:
+        if self._libs is None:
+            self._libs = TestDiscovery.discover_test_libs(self.testcases_dir)
+        return list(self._libs)
+
+    def _lib_entries(self, lib: Path) -> List[Tuple[TestCase, str, Tuple[str, ...]]]:
+        entries = self._entries.get(lib)
+        if entries is None:
+            entries = []
+            for case in TestDiscovery.discover_in_dir(lib):
+                tags = tuple(part.lower() for part in case.name.split("/")[:-1])
+                entries.append((case, case.name.lower(), tags))
+            self._entries[lib] = entries
+        return entries
+
+    def cases(self, lib: Path) -> List[TestCase]:
+        """库内全部用例（返回副本，调用方可以修改 name 而不影响缓存）"""
+        return [dataclasses.replace(case) for case, _, _ in self._lib_entries(lib)]
+
+    def filter(self, lib: Path, query: str) -> List[TestCase]:
+        """按空白分隔的关键词过滤（全部匹配）：普通关键词匹配名称子串，`#标签` 匹配以其开头的目录标签"""
+        terms = query.lower().split()
+        if not terms:
+            return self.cases(lib)
+        matched: List[TestCase] = []
+        for case, name, tags in self._lib_entries(lib):
+            if all(
+                any(tag.startswith(term[1:]) for tag in tags) if term.startswith("#") and len(term) > 1
+                else term in name
+                for term in terms
+            ):
+                matched.append(dataclasses.replace(case))
+        return matched
@@ -7,7 +7,6 @@ import asyncio
 import threading
 import queue
 import json
-from pathlib import Path
 from typing import TYPE_CHECKING, Optional
 
 from .base import BaseTab
@@ -30,6 +29,12 @@ class AgentTab(BaseTab):
         self.message_queue = queue.Queue()
         self.is_running = False
         self.agent_config: Optional[AgentConfig] = None
+        # 对话历史 token 上限（agent_config.json 的 context_budget，界面上不单独提供输入框）
+        self.context_budget = AgentConfig.context_budget
+        # 会话级事件循环（常驻线程），AgentClient 的连接池在其上复用
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 正在流式输出的助手文本块
+        self._streaming = False
     
     def build(self):
         """构建界面"""
@@ -74,6 +79,11 @@ class AgentTab(BaseTab):
         self.show_key_var = tk.BooleanVar(value=False)
         ttk.Checkbutton(row2, text="显示", variable=self.show_key_var,
                         command=self._toggle_key_visibility).pack(side=tk.LEFT)
+        
+        self.grammar_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(row2, text="附带文法参考", variable=self.grammar_var).pack(side=tk.RIGHT)
+        self.prompt_cache_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(row2, text="提示词缓存", variable=self.prompt_cache_var).pack(side=tk.RIGHT, padx=(0, 8))
     
     def _build_chat_section(self, parent):
         """聊天区"""
@@ -91,6 +101,10 @@ class AgentTab(BaseTab):
         IconButton(header, icon='clear', text='清空对话',
                    command=self._clear_chat).pack(side=tk.RIGHT)
         
+        # 缓存命中与费用统计
+        self.usage_label = ttk.Label(header, text="", style='Status.TLabel')
+        self.usage_label.pack(side=tk.RIGHT, padx=(0, 12))
+        
         # 聊天显示区
         chat_container = ttk.Frame(chat_frame)
         chat_container.pack(fill=tk.BOTH, expand=True)
@@ -170,6 +184,9 @@ class AgentTab(BaseTab):
                 self.base_url_var.set(data.get("base_url", "https://api.anthropic.com"))
                 self.api_key_var.set(data.get("api_key", ""))
                 self.model_var.set(data.get("model", "claude-sonnet-4-20250514"))
+                self.prompt_cache_var.set(bool(data.get("prompt_cache", True)))
+                self.grammar_var.set(bool(data.get("include_grammar", False)))
+                self.context_budget = int(data.get("context_budget", AgentConfig.context_budget))
             except Exception as e:
                 print(f"加载配置失败: {e}")
     
@@ -179,7 +196,10 @@ class AgentTab(BaseTab):
         data = {
             "base_url": self.base_url_var.get(),
             "api_key": self.api_key_var.get(),
-            "model": self.model_var.get()
+            "model": self.model_var.get(),
+            "prompt_cache": self.prompt_cache_var.get(),
+            "include_grammar": self.grammar_var.get(),
+            "context_budget": self.context_budget
         }
         try:
             with open(config_path, 'w', encoding='utf-8') as f:
@@ -196,6 +216,7 @@ class AgentTab(BaseTab):
         
         if self.agent_client:
             self.agent_client.reset()
+        self.usage_label.configure(text="")
     
     def _append_chat(self, tag: str, text: str):
         """添加聊天消息"""
@@ -220,6 +241,26 @@ class AgentTab(BaseTab):
         self.chat_text.see(tk.END)
         self.chat_text.config(state=tk.DISABLED)
     
+    def _append_delta(self, text: str):
+        """追加流式文本片段"""
+        self.chat_text.config(state=tk.NORMAL)
+        if not self._streaming:
+            self._streaming = True
+            self.chat_text.insert(tk.END, "🤖 AI: ", 'assistant')
+            self.status_label.configure(text="输出中...")
+        self.chat_text.insert(tk.END, text, 'assistant')
+        self.chat_text.see(tk.END)
+        self.chat_text.config(state=tk.DISABLED)
+    
+    def _end_stream(self):
+        """结束当前流式文本块"""
+        self._streaming = False
+        self.chat_text.config(state=tk.NORMAL)
+        self.chat_text.insert(tk.END, "\n\n", 'assistant')
+        self.chat_text.see(tk.END)
+        self.chat_text.config(state=tk.DISABLED)
+        self.status_label.configure(text="思考中...")
+    
     def _on_enter(self, event):
         """回车发送"""
         if not event.state & 0x1:  # 没有按 Shift
@@ -250,22 +291,23 @@ class AgentTab(BaseTab):
         self.stop_btn.configure(state=tk.NORMAL)
         self.status_label.configure(text="思考中...")
         
-        # 在后台线程运行
-        def run_agent():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
+        # 在会话事件循环中运行
+        async def run_agent():
             try:
-                loop.run_until_complete(
-                    self.agent_client.chat(message, self._on_agent_message)
-                )
+                await self.agent_client.chat(message, self._on_agent_message)
             except Exception as e:
                 self.message_queue.put(("error", str(e)))
             finally:
                 self.message_queue.put(("done", None))
-                loop.close()
         
-        threading.Thread(target=run_agent, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(run_agent(), self._get_loop())
+    
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """取会话事件循环（首次使用时在后台线程中启动）"""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name="agent-loop", daemon=True).start()
+        return self._loop
     
     def _init_agent(self):
         """初始化 Agent"""
@@ -278,29 +320,15 @@ class AgentTab(BaseTab):
         self.agent_config = AgentConfig(
             base_url=self.base_url_var.get(),
             api_key=self.api_key_var.get(),
-            model=self.model_var.get()
+            model=self.model_var.get(),
+            prompt_cache=self.prompt_cache_var.get(),
+            include_grammar=self.grammar_var.get(),
+            context_budget=self.context_budget
         )
         
         # 创建工具服务器（只在不存在时创建，保持状态）
         if not self.tool_server:
-            compiler_jar = self.test_dir / ".tmp" / "Compiler.jar"
-            
-            # Mars.jar 路径（从配置读取，支持相对路径）
-            mars_path = Path(self.config.mars_jar)
-            if not mars_path.is_absolute():
-                mars_path = (self.test_dir / mars_path).resolve()
-            
-            java_cmd = self.config.tools.get_java()
-            gcc_cmd = self.config.tools.get_gcc()
-            
-            self.tool_server = SysYToolServer(
-                test_dir=self.test_dir,
-                compiler_jar=compiler_jar,
-                mars_jar=mars_path,
-                java_cmd=java_cmd,
-                gcc_cmd=gcc_cmd,
-                c_header=self.config.c_header
-            )
+            self.tool_server = SysYToolServer.from_config(self.test_dir, self.config)
         
         # 创建客户端（如果不存在或配置变化）
         if not self.agent_client:
@@ -309,6 +337,12 @@ class AgentTab(BaseTab):
             self.agent_client.config = self.agent_config
             self.agent_client.tool_server = self.tool_server
     
+    def close(self):
+        """退出时释放工具服务器的后台线程池"""
+        if self.tool_server:
+            self.tool_server.close()
+            self.tool_server = None
+    
     def _on_agent_message(self, msg: Message):
         """Agent 消息回调"""
         self.message_queue.put(("message", msg))
@@ -327,10 +361,17 @@ class AgentTab(BaseTab):
                 
                 if msg_type == "message":
                     msg: Message = data
+                    if self._streaming and msg.role not in ("assistant", "assistant_delta"):
+                        self._end_stream()
                     if msg.role == "user":
                         self._append_chat("user", msg.content)
+                    elif msg.role == "assistant_delta":
+                        self._append_delta(msg.content)
                     elif msg.role == "assistant":
-                        self._append_chat("assistant", msg.content)
+                        if self._streaming:
+                            self._end_stream()
+                        else:
+                            self._append_chat("assistant", msg.content)
                     elif msg.role == "system":
                         self._append_chat("system", msg.content)
                     elif msg.role == "tool_call":
@@ -340,16 +381,25 @@ class AgentTab(BaseTab):
                         self._append_chat("tool_result", msg.content)
                 
                 elif msg_type == "error":
+                    if self._streaming:
+                        self._end_stream()
                     self._append_chat("error", f"错误: {data}")
                 
                 elif msg_type == "done":
+                    if self._streaming:
+                        self._end_stream()
                     self.is_running = False
                     self.send_btn.configure(state=tk.NORMAL)
                     self.stop_btn.configure(state=tk.DISABLED)
                     self.status_label.configure(text="")
+                    if self.agent_client:
+                        self.usage_label.configure(text=self.agent_client.usage.summary())
                     
                     # 刷新测试列表
                     if hasattr(self.app, 'test_tab') and self.app.test_tab:
                         self.app.test_tab.refresh_lists()
         except queue.Empty:
             pass
+        
+        if self.is_running and self.agent_client:
+            self.usage_label.configure(text=self.agent_client.usage.summary())
@@ -162,6 +162,8 @@ class TestApp:
         """处理消息队列"""
         if self.test_tab:
             self.test_tab.process_queue()
+        if self.editor_tab:
+            self.editor_tab.process_queue()
         if self.agent_tab:
             self.agent_tab.process_queue()
         self.root.after(50, self._process_queue)
@@ -169,6 +171,10 @@ class TestApp:
     def run(self):
         """运行应用"""
         self.root.mainloop()
+        if self.editor_tab:
+            self.editor_tab.close()
+        if self.agent_tab:
+            self.agent_tab.close()
 
 
 def run_gui():
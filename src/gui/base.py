@@ -4,7 +4,7 @@ GUI基础组件和工具类
 import tkinter as tk
 from tkinter import ttk
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 from ..config import get_config, Config
 from ..utils import normalize_output
@@ -14,6 +14,53 @@ if TYPE_CHECKING:
     from .app import TestApp
 
 
+def failure_lines(status: str, message: str, actual: Optional[str] = None,
+                  expected: Optional[str] = None) -> List[Tuple[str, Optional[str]]]:
+    """生成失败信息的 (文本, 标签) 行
+    
+    省略规则（仅 GUI）：
+    - 行长度：期望行长度 + 50 字符后省略
+    - 差异行数：期望行数 + 10 行后省略
+    """
+    lines: List[Tuple[str, Optional[str]]] = [(f"  状态: {status}", 'fail')]
+    if message:
+        lines.append((f"  原因: {message}", 'fail'))
+    if actual is None or expected is None:
+        return lines
+    
+    actual_lines = normalize_output(actual).split('\n')
+    expected_lines = normalize_output(expected).split('\n')
+    
+    # 输出行数统计
+    lines.append((f"  行数: 实际 {len(actual_lines)} | 期望 {len(expected_lines)}", 'info'))
+    
+    # 找出差异行
+    diff_lines = []
+    for i in range(max(len(actual_lines), len(expected_lines))):
+        a = actual_lines[i] if i < len(actual_lines) else ""
+        e = expected_lines[i] if i < len(expected_lines) else ""
+        if a != e:
+            diff_lines.append((i + 1, a, e))
+    if not diff_lines:
+        return lines
+    
+    lines.append((f"  差异: {len(diff_lines)} 处", 'warning'))
+    # 省略规则：期望行数 + 10
+    max_diff_lines = len(expected_lines) + 10
+    for line_no, actual_line, expected_line in diff_lines[:max_diff_lines]:
+        lines.append((f"  ┌ 第 {line_no} 行", 'dim'))
+        # 省略规则：期望行长度 + 50 字符（期望行完整显示）
+        max_line_len = len(expected_line) + 50
+        actual_display = actual_line[:max_line_len] + ("..." if len(actual_line) > max_line_len else "")
+        actual_show = "<空>" if actual_line == "" else actual_display
+        expected_show = "<空>" if expected_line == "" else expected_line
+        lines.append((f"  │ 实际: {actual_show}", 'fail'))
+        lines.append((f"  └ 期望: {expected_show}", 'pass'))
+    if len(diff_lines) > max_diff_lines:
+        lines.append((f"  ... 还有 {len(diff_lines) - max_diff_lines} 处差异", 'dim'))
+    return lines
+
+
 class BaseTab:
     """标签页基类"""
     
@@ -55,64 +102,12 @@ class OutputMixin:
     
     def _log_failure(self, name: str, status: str, message: str, 
                      actual: str = None, expected: str = None):
-        """美观地输出失败信息
-        
-        省略规则（仅 GUI）：
-        - 行长度：期望行长度 + 50 字符后省略
-        - 差异行数：期望行数 + 10 行后省略
-        """
+        """美观地输出失败信息（省略规则见 failure_lines）"""
         self.output_text.config(state=tk.NORMAL)
-        
-        # 分隔线和标题
         self._log("─" * 50, 'dim')
         self._log(f"✗ {name}", 'error')
-        self._log(f"  状态: {status}", 'fail')
-        
-        if message:
-            self._log(f"  原因: {message}", 'fail')
-        
-        if actual is not None and expected is not None:
-            actual_norm = normalize_output(actual)
-            expected_norm = normalize_output(expected)
-            actual_lines = actual_norm.split('\n')
-            expected_lines = expected_norm.split('\n')
-            
-            # 输出行数统计
-            self._log(f"  行数: 实际 {len(actual_lines)} | 期望 {len(expected_lines)}", 'info')
-            
-            # 找出差异行
-            diff_lines = []
-            max_len = max(len(actual_lines), len(expected_lines))
-            for i in range(max_len):
-                a = actual_lines[i] if i < len(actual_lines) else ""
-                e = expected_lines[i] if i < len(expected_lines) else ""
-                if a != e:
-                    diff_lines.append((i + 1, a, e))
-            
-            if diff_lines:
-                self._log(f"  差异: {len(diff_lines)} 处", 'warning')
-                
-                # 省略规则：期望行数 + 10
-                max_diff_lines = len(expected_lines) + 10
-                
-                for idx, (line_no, actual_line, expected_line) in enumerate(diff_lines[:max_diff_lines]):
-                    self._log(f"  ┌ 第 {line_no} 行", 'dim')
-                    
-                    # 省略规则：期望行长度 + 50 字符
-                    max_line_len = len(expected_line) + 50
-                    
-                    actual_display = actual_line[:max_line_len] + ("..." if len(actual_line) > max_line_len else "")
-                    expected_display = expected_line  # 期望行完整显示
-                    
-                    actual_show = "<空>" if actual_line == "" else actual_display
-                    expected_show = "<空>" if expected_line == "" else expected_display
-                    
-                    self._log(f"  │ 实际: {actual_show}", 'fail')
-                    self._log(f"  └ 期望: {expected_show}", 'pass')
-                
-                if len(diff_lines) > max_diff_lines:
-                    self._log(f"  ... 还有 {len(diff_lines) - max_diff_lines} 处差异", 'dim')
-        
+        for text, tag in failure_lines(status, message, actual, expected):
+            self._log(text, tag)
         self._log("", None)
         self.output_text.config(state=tk.DISABLED)
     
@@ -0,0 +1,92 @@
+"""
+运行仪表盘 - 吞吐、ETA、各阶段忙碌槽位、队列深度、各实例通过率与最近延迟曲线
+
+由测试标签页在运行期间约每 500ms 调用一次 update()，只修改几个 Label 与一条折线。
+"""
+import tkinter as tk
+from tkinter import ttk
+from typing import List, Optional
+
+from ..monitor import STAGES, MonitorSnapshot
+from .theme import COLORS
+
+_STAGE_LABELS = {"wait": "等待槽位", "compile": "编译", "mars": "Mars", "gcc": "g++"}
+
+
+def _format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class Sparkline(tk.Canvas):
+    """最近若干个延迟样本的折线"""
+
+    def __init__(self, parent, width: int = 180, height: int = 28):
+        super().__init__(parent, width=width, height=height, bg=COLORS['bg_tertiary'],
+                         highlightthickness=0, bd=0)
+        self._line = self.create_line(0, 0, 0, 0, fill=COLORS['accent'], width=1.5)
+        self._label = self.create_text(width - 4, 2, anchor=tk.NE, fill=COLORS['fg_muted'],
+                                       font=('微软雅黑', 7), text="")
+
+    def set_values(self, values: List[int]):
+        if len(values) < 2:
+            self.coords(self._line, 0, 0, 0, 0)
+            self.itemconfigure(self._label, text="")
+            return
+        width = self.winfo_width() if self.winfo_width() > 1 else int(self['width'])
+        height = int(self['height'])
+        top = max(values) or 1
+        step = width / (len(values) - 1)
+        points = []
+        for i, value in enumerate(values):
+            points.extend((i * step, height - 2 - (height - 6) * value / top))
+        self.coords(self._line, *points)
+        self.coords(self._label, width - 4, 2)
+        self.itemconfigure(self._label, text=f"max {top} ms")
+
+
+class DashboardPanel(ttk.Frame):
+    """运行仪表盘"""
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.throughput_label = ttk.Label(self, text="", style='Status.TLabel')
+        self.throughput_label.grid(row=0, column=0, sticky=tk.W)
+        self.stages_label = ttk.Label(self, text="", style='Status.TLabel')
+        self.stages_label.grid(row=1, column=0, sticky=tk.W)
+        self.compilers_label = ttk.Label(self, text="", style='Status.TLabel')
+        self.compilers_label.grid(row=2, column=0, sticky=tk.W)
+        self.sparkline = Sparkline(self)
+        self.sparkline.grid(row=0, column=1, rowspan=3, sticky=tk.E, padx=(12, 0))
+        self.columnconfigure(0, weight=1)
+
+    def clear(self):
+        for label in (self.throughput_label, self.stages_label, self.compilers_label):
+            label.configure(text="")
+        self.sparkline.set_values([])
+
+    def update_snapshot(self, snap: MonitorSnapshot, ui_backlog: int = 0):
+        done = snap.completed + snap.skipped
+        self.throughput_label.configure(text=(
+            f"⚡ {snap.rate:.1f} 个/s  |  ETA {_format_duration(snap.eta_s)}  |  "
+            f"已用 {_format_duration(snap.elapsed_s)}  |  {done}/{snap.total}"
+        ))
+        # 在途任务中除去等待槽位的，即为正在占用 worker 槽位的任务
+        busy = max(0, snap.in_flight - snap.busy.get("wait", 0))
+        stages = "  ".join(f"{_STAGE_LABELS[s]} {snap.busy.get(s, 0)}" for s in STAGES)
+        self.stages_label.configure(text=(
+            f"🧵 在途 {snap.in_flight}/{snap.limit}（忙 {busy}，空闲 {max(0, snap.limit - busy)}）  {stages}  |  "
+            f"待提交 {snap.queued}  界面待处理 {ui_backlog}"
+        ))
+        rates = []
+        for name, (passed, total) in snap.per_compiler.items():
+            rate = passed / total * 100 if total else 0.0
+            rates.append(f"{name} {rate:.1f}% ({passed}/{total})")
+        self.compilers_label.configure(text="✓ " + "  ".join(rates) if rates else "")
+        self.sparkline.set_values(snap.latencies_ms)
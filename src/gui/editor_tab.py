@@ -1,23 +1,55 @@
 """
 用例编写标签页 - 现代化设计
 """
+import hashlib
+import queue
+import shutil
+import tempfile
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import TYPE_CHECKING
+from pathlib import Path
+from typing import Dict, Optional, TYPE_CHECKING, Tuple
 
-from .base import BaseTab
+from .base import BaseTab, failure_lines
 from .theme import COLORS, create_styled_text
 from .widgets import IconButton
 from ..discovery import TestDiscovery
+from ..models import TestCase, TestResult
+from ..tester import CompilerTester, run_reference
+from ..zip_compilers import ZipCompilerInstance, extract_zip_instance
 
 if TYPE_CHECKING:
     from .app import TestApp
 
+# 停止输入多久后在后台重新生成 g++ 参考输出
+REFERENCE_DEBOUNCE_MS = 800
+# 参考输出缓存条数（按代码 + 输入的哈希）
+REFERENCE_CACHE_SIZE = 16
+
 
 class EditorTab(BaseTab):
     """用例编写标签页"""
     
+    def __init__(self, parent: ttk.Frame, app: 'TestApp'):
+        super().__init__(parent, app)
+        self.message_queue = queue.Queue()
+        # 常驻线程池：即时运行时被测编译器与 g++ 参考输出并发执行
+        self._executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="editor-run")
+        # zip 路径 -> (zip 修改时间, 已编译的实例)；zip 未变化时直接复用
+        self._warm_testers: Dict[Path, Tuple[float, CompilerTester]] = {}
+        self._running = False
+        # 参考输出：哈希 -> (stdout, 错误信息)；只在 UI 线程读写
+        self._reference_cache: "OrderedDict[str, Tuple[Optional[bytes], str]]" = OrderedDict()
+        self._reference_job: Optional[str] = None
+        self._reference_future: Optional[Future] = None
+        self._reference_key: Optional[str] = None
+        # 保存时参考输出尚未生成：ans.txt 路径 -> 最近一次保存内容的哈希（只写入最新版本的结果）
+        self._pending_answers: Dict[Path, str] = {}
+    
     def build(self):
         """构建用例编写标签页"""
         main_frame = ttk.Frame(self.parent, padding=12)
@@ -72,6 +104,8 @@ class EditorTab(BaseTab):
         right_frame = ttk.Frame(row2)
         right_frame.pack(side=tk.RIGHT)
         
+        IconButton(right_frame, icon='play', text='运行 (Ctrl+Enter)',
+                   command=self._run_buffer).pack(side=tk.LEFT, padx=(0, 12))
         IconButton(right_frame, icon='clear', text='清空',
                    command=self._clear_editor).pack(side=tk.LEFT, padx=(0, 4))
         IconButton(right_frame, text='保存并继续',
@@ -161,6 +195,25 @@ class EditorTab(BaseTab):
         ttk.Label(input_frame, text="💡 每行一个整数", 
                   style='Status.TLabel').pack(anchor=tk.W, pady=(6, 0))
         
+        # 即时运行结果
+        ttk.Label(input_frame, text="📤 运行结果",
+                  font=('微软雅黑', 10, 'bold')).pack(anchor=tk.W, pady=(10, 6))
+        self.run_output = create_styled_text(
+            input_frame,
+            font=(self.config.gui.get_font(), self.config.gui.font_size - 1),
+            wrap=tk.NONE, state=tk.DISABLED, height=12
+        )
+        self.run_output.pack(fill=tk.BOTH, expand=True)
+        for tag, color in (('pass', 'success'), ('fail', 'error'), ('info', 'info'),
+                           ('warning', 'warning'), ('dim', 'fg_muted'), ('header', 'accent')):
+            self.run_output.tag_configure(tag, foreground=COLORS[color])
+        
+        # 快捷键：Ctrl+Enter / F5 运行当前缓冲区；停止输入后在后台生成参考输出
+        for widget in (self.code_text, self.input_text):
+            widget.bind('<Control-Return>', self._on_run_hotkey)
+            widget.bind('<F5>', self._on_run_hotkey)
+            widget.bind('<KeyRelease>', self._schedule_reference, add='+')
+        
         # 初始化行号
         self._update_line_numbers()
     
@@ -181,6 +234,11 @@ class EditorTab(BaseTab):
         ttk.Label(status_frame, textvariable=self.char_count_var,
                   style='Status.TLabel').pack(side=tk.RIGHT)
         
+        # 参考输出状态
+        self.reference_var = tk.StringVar(value="")
+        ttk.Label(status_frame, textvariable=self.reference_var,
+                  style='Status.TLabel').pack(side=tk.RIGHT, padx=(0, 16))
+        
         # 绑定更新字符统计
         self.code_text.bind('<KeyRelease>', self._update_char_count, add='+')
     
@@ -294,13 +352,23 @@ class EditorTab(BaseTab):
         input_data = self.input_text.get(1.0, tk.END).rstrip()
         input_path = case_dir / "in.txt"
         if input_data:
-            with open(input_path, "w", encoding="utf-8", newline="\n") as f:
-                f.write(input_data)
+            self._write_input(input_path, input_data)
         else:
             if input_path.exists():
                 input_path.unlink()
 
+        # 保存 ans.txt：优先使用后台已生成的参考输出，否则先删除旧的 ans.txt（测试时回退到 g++），生成完成后再写入
+        answer_path = case_dir / "ans.txt"
+        key = self._reference_hash(code, input_data)
         self.editor_status_var.set(f"✓ 已保存: {lib_name}/testcase{num}/testfile.txt")
+        cached = self._reference_cache.get(key)
+        if cached is None:
+            answer_path.unlink(missing_ok=True)
+            self._pending_answers[answer_path] = key
+            self._start_reference(code, input_data)
+        else:
+            self._pending_answers.pop(answer_path, None)
+            self._write_answer(answer_path, *cached)
         self.app.test_tab.refresh_lists()
         return True
     
@@ -321,3 +389,227 @@ class EditorTab(BaseTab):
         self.input_text.delete(1.0, tk.END)
         self._update_line_numbers()
         self._update_char_count()
+
+    # ========== 即时运行 ==========
+    
+    def _on_run_hotkey(self, event=None):
+        self._run_buffer()
+        return 'break'
+    
+    def _warm_tester(self, inst: ZipCompilerInstance) -> Tuple[Optional[CompilerTester], str]:
+        """取已编译的实例；zip 有变化或首次使用时解包并编译（在线程池中调用）
+
+        实例名加 @editor 后缀：使用独立的工作目录与 worker 目录，不会改写「测试运行」页正在使用的
+        Compiler.jar 与 worker_N
+        """
+        zip_path = inst.zip_path.resolve()
+        mtime = zip_path.stat().st_mtime
+        cached = self._warm_testers.get(zip_path)
+        if cached and cached[0] == mtime and cached[1]._is_compiler_ready():
+            return cached[1], ""
+        
+        self.message_queue.put(('status', f"⚙️ 正在编译 {inst.name}（首次运行）..."))
+        extracted = extract_zip_instance(inst, self.test_dir / ".tmp" / "zip_sources")
+        tester = CompilerTester(extracted, self.test_dir, instance_name=f"{inst.name}@editor")
+        ok, msg = tester.compile_project()
+        if not ok:
+            return None, msg
+        self._warm_testers[zip_path] = (mtime, tester)
+        return tester, ""
+    
+    def close(self):
+        """退出时释放线程池（不等待仍在运行的 Mars / g++，尚未开始的任务直接取消）"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _run_buffer(self):
+        """用选中的编译器实例即时运行编辑器中的代码与输入"""
+        if self._running:
+            self.editor_status_var.set("⏳ 正在运行，请稍候")
+            return
+        if self.app.test_tab.is_running:
+            # 批量测试期间会重新解包同一份 zip 源码，即时运行需等待其结束
+            self.editor_status_var.set("⏳ 测试运行页正在运行测试，结束后再即时运行")
+            return
+        code = self.code_text.get(1.0, tk.END).rstrip()
+        if not code:
+            self.editor_status_var.set("请输入源代码")
+            return
+        instances = self.app.test_tab._get_selected_instances()
+        if not instances:
+            messagebox.showerror("错误", "未找到可用的编译器实例（请在测试运行页选择 zip 目录）")
+            return
+        inst = instances[0]
+        
+        run_dir = self.test_dir / ".tmp" / "editor_run"
+        run_dir.mkdir(parents=True, exist_ok=True)
+        testfile = run_dir / "testfile.txt"
+        testfile.write_text(code, encoding="utf-8", newline="\n")
+        input_data = self.input_text.get(1.0, tk.END).rstrip()
+        input_file: Optional[Path] = None
+        if input_data:
+            input_file = run_dir / "in.txt"
+            self._write_input(input_file, input_data)
+        
+        cached = self._reference_cache.get(self._reference_hash(code, input_data))
+        expected_out = cached[0] if cached else None
+        
+        self._running = True
+        self.editor_status_var.set(f"▶ 正在运行 [{inst.name}]...")
+        
+        def job():
+            start = time.monotonic()
+            try:
+                tester, err = self._warm_tester(inst)
+                if tester is None:
+                    self.message_queue.put(('run_error', inst.name, f"编译失败: {err}"))
+                    return
+                for msg in tester.prepare_jvm_archives([TestCase("editor", testfile, input_file)]):
+                    self.message_queue.put(('status', msg))
+                start = time.monotonic()
+                result = tester.run_source(testfile, input_file, expected_out, executor=self._executor)
+                self.message_queue.put(('run_result', inst.name, result, time.monotonic() - start))
+            except Exception as e:
+                self.message_queue.put(('run_error', inst.name, str(e)))
+        
+        self._executor.submit(job)
+    
+    def _show_run_result(self, name: str, result: TestResult, elapsed_s: float):
+        text = self.run_output
+        text.config(state=tk.NORMAL)
+        text.delete(1.0, tk.END)
+        icon = "✓" if result.passed else "✗"
+        text.insert(tk.END, f"{icon} [{name}] {result.status.value}  ({elapsed_s * 1000:.0f} ms)\n",
+                    'pass' if result.passed else 'fail')
+        if result.cycle is not None:
+            text.insert(tk.END, f"  cycle: {result.cycle}\n", 'header')
+            if result.cycle_breakdown:
+                text.insert(tk.END, f"  指令: {result.cycle_breakdown}\n", 'dim')
+        stages = result.stage_times_ms or {}
+        if stages:
+            text.insert(tk.END, "  耗时: " + ", ".join(f"{k} {v} ms" for k, v in stages.items()) + "\n", 'dim')
+        if result.passed:
+            text.insert(tk.END, "  输出与 g++ 参考输出一致\n", 'pass')
+        else:
+            for line, tag in failure_lines(result.status.value, result.message or "",
+                                           result.actual_output, result.expected_output):
+                text.insert(tk.END, line + "\n", tag or ())
+        text.config(state=tk.DISABLED)
+    
+    def process_queue(self):
+        """处理即时运行的消息"""
+        while True:
+            try:
+                msg = self.message_queue.get_nowait()
+            except queue.Empty:
+                return
+            if msg[0] == 'status':
+                self.editor_status_var.set(msg[1])
+            elif msg[0] == 'run_result':
+                _, name, result, elapsed = msg
+                self._running = False
+                self._show_run_result(name, result, elapsed)
+                self.editor_status_var.set(f"{'✓' if result.passed else '✗'} [{name}] {result.status.value}")
+            elif msg[0] == 'reference':
+                _, key, stdout, error = msg
+                self._finish_reference(key, stdout, error)
+            elif msg[0] == 'run_error':
+                _, name, error = msg
+                self._running = False
+                self.editor_status_var.set(f"✗ [{name}] {error.splitlines()[0] if error else '运行失败'}")
+                self.run_output.config(state=tk.NORMAL)
+                self.run_output.delete(1.0, tk.END)
+                self.run_output.insert(tk.END, f"✗ [{name}] {error}\n", 'fail')
+                self.run_output.config(state=tk.DISABLED)
+
+    # ========== 参考输出 ==========
+    
+    @staticmethod
+    def _write_input(path: Path, input_data: str):
+        """写入 in.txt；保存、即时运行与参考输出使用完全相同的内容"""
+        path.write_text(input_data + "\n", encoding="utf-8", newline="\n")
+    
+    @staticmethod
+    def _reference_hash(code: str, input_data: str) -> str:
+        return hashlib.sha1(f"{code}\0{input_data}".encode("utf-8")).hexdigest()
+    
+    def _schedule_reference(self, event=None):
+        """输入停止 REFERENCE_DEBOUNCE_MS 后再生成参考输出"""
+        if self._reference_job is not None:
+            self.parent.after_cancel(self._reference_job)
+        self._reference_job = self.parent.after(REFERENCE_DEBOUNCE_MS, self._reference_idle)
+    
+    def _reference_idle(self):
+        self._reference_job = None
+        code = self.code_text.get(1.0, tk.END).rstrip()
+        if code:
+            self._start_reference(code, self.input_text.get(1.0, tk.END).rstrip())
+    
+    def _start_reference(self, code: str, input_data: str):
+        """在后台用 g++ 生成参考输出；命中缓存或已在生成时不重复提交"""
+        key = self._reference_hash(code, input_data)
+        if key in self._reference_cache:
+            self._reference_cache.move_to_end(key)
+            self._show_reference_state(*self._reference_cache[key])
+            return
+        if key == self._reference_key:
+            return
+        # 取消尚未开始的旧任务（有待写入的 ans.txt 时保留）；已开始的任务结果仍会进入缓存
+        if self._reference_future is not None and self._reference_key not in self._pending_answers.values():
+            self._reference_future.cancel()
+        self._reference_key = key
+        self.reference_var.set("⏳ 参考输出生成中...")
+        
+        ref_root = self.test_dir / ".tmp" / "editor_ref"
+        
+        def job():
+            # 每个任务使用独立的临时目录：旧任务清理时不会删掉新任务的文件
+            work_dir = None
+            try:
+                ref_root.mkdir(parents=True, exist_ok=True)
+                work_dir = Path(tempfile.mkdtemp(prefix=f"{key[:12]}_", dir=ref_root))
+                source = work_dir / "testfile.txt"
+                source.write_text(code, encoding="utf-8", newline="\n")
+                input_file = None
+                if input_data:
+                    input_file = work_dir / "in.txt"
+                    self._write_input(input_file, input_data)
+                stdout, error = run_reference(source, input_file, work_dir)
+            except Exception as e:
+                stdout, error = None, str(e)
+            finally:
+                if work_dir is not None:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+            self.message_queue.put(('reference', key, stdout, error))
+        
+        self._reference_future = self._executor.submit(job)
+    
+    def _finish_reference(self, key: str, stdout: Optional[bytes], error: str):
+        self._reference_cache[key] = (stdout, error)
+        self._reference_cache.move_to_end(key)
+        while len(self._reference_cache) > REFERENCE_CACHE_SIZE:
+            self._reference_cache.popitem(last=False)
+        pending = [path for path, latest in self._pending_answers.items() if latest == key]
+        for path in pending:
+            del self._pending_answers[path]
+            self._write_answer(path, stdout, error)
+        if pending:
+            self.app.test_tab.refresh_lists()
+        if key == self._reference_key:
+            self._reference_key = None
+            self._reference_future = None
+            self._show_reference_state(stdout, error)
+    
+    def _show_reference_state(self, stdout: Optional[bytes], error: str):
+        if stdout is None:
+            self.reference_var.set("✗ 参考输出生成失败")
+            self.editor_status_var.set(f"✗ {error.splitlines()[0] if error else 'g++ 运行失败'}")
+        else:
+            self.reference_var.set(f"✓ 参考输出已就绪（{len(stdout)} 字节）")
+    
+    def _write_answer(self, path: Path, stdout: Optional[bytes], error: str):
+        if stdout is None:
+            # 不保留旧程序的 ans.txt，测试时回退到 g++ 对拍
+            path.unlink(missing_ok=True)
+            self.editor_status_var.set(f"✗ 未写入 ans.txt：{error.splitlines()[0] if error else 'g++ 运行失败'}")
+            return
+        path.write_bytes(stdout)
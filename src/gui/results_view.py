@@ -0,0 +1,345 @@
+"""
+测试结果表格 - 虚拟化的 Treeview，每个（编译器实例, 用例）一行
+
+- 结果只保存在模型（ResultRow 列表）中，Treeview 只保留可见的若干行并在滚动时复用
+- 点击列头排序，按状态 / 名称子串过滤
+- 选中行时才在右侧详情栏渲染失败详情（只有未通过的结果保留实际/期望输出）
+"""
+import bisect
+import tkinter as tk
+from tkinter import ttk
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..config import get_config
+from ..models import TestResult, TestStatus
+from .base import failure_lines
+from .theme import COLORS, create_styled_text
+
+
+@dataclass
+class ResultRow:
+    """结果表中的一行"""
+    compiler: str
+    case: str
+    status: TestStatus
+    cycle: Optional[int]
+    compile_ms: Optional[int]
+    mars_ms: Optional[int]
+    # 仅未通过的用例保留完整结果，用于详情栏
+    result: Optional[TestResult] = None
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.compiler, self.case
+
+
+# 列 id -> (标题, 宽度, 排序键)
+_COLUMNS: Dict[str, Tuple[str, int, Callable[[ResultRow], object]]] = {
+    'compiler': ("编译器", 110, lambda r: r.compiler),
+    'case': ("用例", 280, lambda r: r.case),
+    'status': ("状态", 110, lambda r: (r.status != TestStatus.PASSED, r.status.value)),
+    'cycle': ("cycle", 90, lambda r: r.cycle if r.cycle is not None else -1),
+    'compile': ("编译 ms", 70, lambda r: r.compile_ms if r.compile_ms is not None else -1),
+    'mars': ("Mars ms", 70, lambda r: r.mars_ms if r.mars_ms is not None else -1),
+}
+
+_STATUS_FILTERS = ["全部", "未通过", "通过"]
+
+
+class _Descending:
+    """降序排序键：比较结果取反，使降序视图也能用 bisect 插入"""
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Descending) and self.key == other.key
+
+    def __lt__(self, other: '_Descending') -> bool:
+        return other.key < self.key
+
+
+class ResultsView(ttk.Frame):
+    """虚拟化结果表 + 详情栏"""
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        config = get_config()
+        self._font = (config.gui.get_font(), config.gui.font_size - 1)
+        self.rows: List[ResultRow] = []
+        self._index: Dict[Tuple[str, str], int] = {}
+        self._view: List[int] = []
+        # 有排序列时与 _view 一一对应的 (排序键, 行号)（有序），新结果用 bisect 插入
+        self._view_keys: List[object] = []
+        self._view_dirty = False
+        # 最近一次重建视图时读取的过滤条件（避免每行都调用 Tcl 的 .get()）
+        self._filter_mode = _STATUS_FILTERS[0]
+        self._filter_text = ""
+        self._failed = 0
+        self._sort_column: Optional[str] = None
+        self._sort_reverse = False
+        self._offset = 0
+        self._visible = 20
+        self._items: List[str] = []
+        self._selected_key: Optional[Tuple[str, str]] = None
+        self._redraw_pending = False
+        self._build()
+
+    # ========== 构建 ==========
+
+    def _build(self):
+        toolbar = ttk.Frame(self)
+        toolbar.pack(fill=tk.X, pady=(0, 6))
+        ttk.Label(toolbar, text="过滤", style='Status.TLabel').pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add('write', lambda *_: self._invalidate_view())
+        ttk.Entry(toolbar, textvariable=self.filter_var, width=28).pack(side=tk.LEFT, padx=(6, 8))
+        self.status_filter = ttk.Combobox(toolbar, values=_STATUS_FILTERS, state='readonly', width=8)
+        self.status_filter.current(0)
+        self.status_filter.bind('<<ComboboxSelected>>', lambda e: self._invalidate_view())
+        self.status_filter.pack(side=tk.LEFT)
+        self.count_label = ttk.Label(toolbar, text="", style='Status.TLabel')
+        self.count_label.pack(side=tk.RIGHT)
+
+        panes = ttk.PanedWindow(self, orient=tk.HORIZONTAL)
+        panes.pack(fill=tk.BOTH, expand=True)
+
+        table = ttk.Frame(panes)
+        self.tree = ttk.Treeview(table, columns=list(_COLUMNS), show='headings', selectmode='browse')
+        for col, (title, width, _key) in _COLUMNS.items():
+            self.tree.heading(col, text=title, command=lambda c=col: self.sort_by(c))
+            anchor = tk.W if col in ('compiler', 'case', 'status') else tk.E
+            self.tree.column(col, width=width, anchor=anchor, stretch=(col == 'case'))
+        self.tree.tag_configure('pass', foreground=COLORS['success'])
+        self.tree.tag_configure('fail', foreground=COLORS['error'])
+        self.tree.tag_configure('skip', foreground=COLORS['fg_muted'])
+        self.scrollbar = ttk.Scrollbar(table, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind('<Configure>', self._on_resize)
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<MouseWheel>', lambda e: self._scroll(-1 if e.delta > 0 else 1, 3))
+        self.tree.bind('<Button-4>', lambda e: self._scroll(-1, 3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll(1, 3))
+        panes.add(table, weight=3)
+
+        detail = ttk.Frame(panes)
+        self.detail_text = create_styled_text(detail, font=self._font, wrap=tk.NONE, state=tk.DISABLED, width=48)
+        detail_scroll = ttk.Scrollbar(detail, orient=tk.VERTICAL, command=self.detail_text.yview)
+        self.detail_text.configure(yscrollcommand=detail_scroll.set)
+        self.detail_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        detail_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        for tag in ('pass', 'fail', 'info', 'warning', 'dim'):
+            color = {'pass': 'success', 'fail': 'error', 'dim': 'fg_muted'}.get(tag, tag)
+            self.detail_text.tag_configure(tag, foreground=COLORS[color])
+        self.detail_text.tag_configure('header', foreground=COLORS['accent'], font=self._font + ('bold',))
+        panes.add(detail, weight=2)
+
+    # ========== 模型 ==========
+
+    def clear(self):
+        self.rows.clear()
+        self._index.clear()
+        self._view.clear()
+        self._view_keys.clear()
+        self._failed = 0
+        self._offset = 0
+        self._selected_key = None
+        self._show_detail(None)
+        self._schedule_redraw()
+
+    def add_result(self, compiler: str, case: str, result: TestResult):
+        """新增或更新一行"""
+        stages = result.stage_times_ms or {}
+        row = ResultRow(
+            compiler=compiler,
+            case=case,
+            status=result.status,
+            cycle=result.cycle,
+            compile_ms=stages.get('compile', result.compile_time_ms),
+            mars_ms=stages.get('mars'),
+            result=None if result.passed else result,
+        )
+        idx = self._index.get(row.key)
+        if idx is None:
+            idx = len(self.rows)
+            self._index[row.key] = idx
+            self.rows.append(row)
+        else:
+            old = self.rows[idx]
+            self._failed -= old.status != TestStatus.PASSED
+            self.rows[idx] = row
+            if not self._view_dirty and self._matches(old):
+                pos = self._view.index(idx)
+                del self._view[pos]
+                if self._sort_column is not None:
+                    del self._view_keys[pos]
+            if row.key == self._selected_key:
+                self._show_detail(row)
+        self._failed += row.status != TestStatus.PASSED
+        if not self._view_dirty and self._matches(row):
+            self._insert_into_view(idx, row)
+        self._schedule_redraw()
+
+    def failed_count(self) -> int:
+        return self._failed
+
+    def _matches(self, row: ResultRow) -> bool:
+        mode = self._filter_mode
+        if mode == "通过" and row.status != TestStatus.PASSED:
+            return False
+        if mode == "未通过" and row.status == TestStatus.PASSED:
+            return False
+        text = self._filter_text
+        return not text or text in row.case.lower() or text in row.compiler.lower()
+
+    def _sort_key(self) -> Callable[[ResultRow], object]:
+        key = _COLUMNS[self._sort_column][2]
+        return (lambda r: _Descending(key(r))) if self._sort_reverse else key
+
+    def _insert_into_view(self, idx: int, row: ResultRow):
+        """把一行放进当前视图：按行号（无排序时）或 (排序键, 行号) 二分插入，与重建视图的顺序一致"""
+        if self._sort_column is None:
+            bisect.insort(self._view, idx)
+            return
+        key = (self._sort_key()(row), idx)
+        pos = bisect.bisect_left(self._view_keys, key)
+        self._view.insert(pos, idx)
+        self._view_keys.insert(pos, key)
+
+    def _rebuild_view(self):
+        self._filter_mode = self.status_filter.get()
+        self._filter_text = self.filter_var.get().strip().lower()
+        view = [i for i, row in enumerate(self.rows) if self._matches(row)]
+        keys: List[object] = []
+        if self._sort_column is not None:
+            sort_key = self._sort_key()
+            keys = sorted((sort_key(self.rows[i]), i) for i in view)
+            view = [i for _key, i in keys]
+        self._view = view
+        self._view_keys = keys
+        self._view_dirty = False
+        self._offset = min(self._offset, max(0, len(view) - self._visible))
+
+    def _invalidate_view(self):
+        self._view_dirty = True
+        self._schedule_redraw()
+
+    def sort_by(self, column: str):
+        if self._sort_column == column:
+            self._sort_reverse = not self._sort_reverse
+        else:
+            self._sort_column, self._sort_reverse = column, False
+        for col, (title, _w, _k) in _COLUMNS.items():
+            mark = (" ▼" if self._sort_reverse else " ▲") if col == column else ""
+            self.tree.heading(col, text=title + mark)
+        self._invalidate_view()
+
+    # ========== 渲染 ==========
+
+    def _schedule_redraw(self):
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self._redraw)
+
+    def _redraw(self):
+        self._redraw_pending = False
+        if self._view_dirty:
+            self._rebuild_view()
+
+        # 只保留可见行数的 Treeview 项，滚动时复用
+        while len(self._items) < self._visible:
+            self._items.append(self.tree.insert('', tk.END, values=()))
+        while len(self._items) > self._visible:
+            self.tree.delete(self._items.pop())
+
+        selected_item = None
+        for pos, item in enumerate(self._items):
+            view_pos = self._offset + pos
+            if view_pos >= len(self._view):
+                self.tree.item(item, values=(), tags=())
+                continue
+            row = self.rows[self._view[view_pos]]
+            tag = 'pass' if row.status == TestStatus.PASSED else 'skip' if row.status == TestStatus.SKIPPED else 'fail'
+            self.tree.item(item, values=(
+                row.compiler, row.case, row.status.value,
+                '' if row.cycle is None else row.cycle,
+                '' if row.compile_ms is None else row.compile_ms,
+                '' if row.mars_ms is None else row.mars_ms,
+            ), tags=(tag,))
+            if row.key == self._selected_key:
+                selected_item = item
+        current = self.tree.selection()
+        if selected_item is not None and current != (selected_item,):
+            self.tree.selection_set(selected_item)
+        elif selected_item is None and current:
+            self.tree.selection_remove(*current)
+
+        total = len(self._view)
+        if total:
+            self.scrollbar.set(self._offset / total, min(1.0, (self._offset + self._visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        failed = self.failed_count()
+        self.count_label.configure(text=f"显示 {total} / {len(self.rows)} 行，未通过 {failed}")
+
+    def _on_resize(self, event):
+        style = ttk.Style()
+        row_height = int(style.lookup('Treeview', 'rowheight') or 20)
+        visible = max(1, (event.height - 24) // row_height + 1)
+        if visible != self._visible:
+            self._visible = visible
+            self._schedule_redraw()
+
+    def _scroll(self, direction: int, amount: int):
+        max_offset = max(0, len(self._view) - self._visible + 1)
+        offset = max(0, min(max_offset, self._offset + direction * amount))
+        if offset != self._offset:
+            self._offset = offset
+            self._schedule_redraw()
+        return 'break'
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == 'moveto':
+            self._offset = 0
+            self._scroll(1, int(float(value) * len(self._view)))
+        elif action == 'scroll':
+            step = self._visible - 1 if unit == 'pages' else 1
+            self._scroll(int(value), max(1, step))
+
+    # ========== 详情 ==========
+
+    def _on_select(self, event=None):
+        selection = self.tree.selection()
+        if not selection:
+            return
+        pos = self._items.index(selection[0]) if selection[0] in self._items else -1
+        view_pos = self._offset + pos
+        if pos < 0 or view_pos >= len(self._view):
+            return
+        row = self.rows[self._view[view_pos]]
+        if row.key != self._selected_key:
+            self._selected_key = row.key
+            self._show_detail(row)
+
+    def _show_detail(self, row: Optional[ResultRow]):
+        text = self.detail_text
+        text.config(state=tk.NORMAL)
+        text.delete('1.0', tk.END)
+        if row is not None:
+            text.insert(tk.END, f"[{row.compiler}] {row.case}\n", 'header')
+            result = row.result
+            if result is None:
+                text.insert(tk.END, f"  状态: {row.status.value}\n", 'pass')
+                if row.cycle is not None:
+                    text.insert(tk.END, f"  cycle: {row.cycle}\n", 'info')
+            else:
+                for line, tag in failure_lines(
+                    result.status.value, result.message or "", result.actual_output, result.expected_output
+                ):
+                    text.insert(tk.END, line + '\n', tag or ())
+                if result.cycle_breakdown:
+                    text.insert(tk.END, f"  指令: {result.cycle_breakdown}\n", 'dim')
+        text.config(state=tk.DISABLED)
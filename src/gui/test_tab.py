@@ -9,11 +9,17 @@ from typing import List, Optional, TYPE_CHECKING, Tuple
 import threading
 import queue
 import subprocess
+import time
 
 from .base import BaseTab, OutputMixin
+from .dashboard import DashboardPanel
 from .theme import COLORS, create_styled_listbox, create_styled_text
+from .results_view import ResultsView
 from .widgets import AnimatedProgressBar, IconButton
-from ..discovery import TestDiscovery
+from ..discovery import CaseIndex
+from ..history import open_history
+from ..models import TestCase
+from ..monitor import RunMonitor
 from ..multi_runner import compile_testers, test_multi
 from ..tester import CompilerTester
 from ..zip_compilers import ZipCompilerInstance, discover_zip_compilers, extract_zip_instance
@@ -21,6 +27,14 @@ from ..zip_compilers import ZipCompilerInstance, discover_zip_compilers, extract
 if TYPE_CHECKING:
     from .app import TestApp
 
+# 每次 process_queue 最多处理的消息数与耗时，剩余消息留到下一帧，避免阻塞 Tk 事件循环
+QUEUE_BATCH = 200
+QUEUE_BUDGET_S = 0.008
+# 用例列表分批插入，首批立即显示，其余在空闲时补齐
+CASE_LIST_CHUNK = 300
+# 仪表盘刷新间隔（约 2Hz）
+DASHBOARD_INTERVAL_MS = 500
+
 
 class TestTab(BaseTab, OutputMixin):
     """测试运行标签页"""
@@ -31,9 +45,19 @@ class TestTab(BaseTab, OutputMixin):
         self.is_running = False
         self.message_queue = queue.Queue()
         self.current_lib_path: Optional[Path] = None
+        self.case_index = CaseIndex(self.test_dir / "testcases")
+        self._libs: List[Path] = []
+        # 用例列表当前显示的（已过滤的）用例，与 case_listbox 的行一一对应
+        self._shown_cases: List[TestCase] = []
+        self._populate_job: Optional[str] = None
+        self._filter_job: Optional[str] = None
+        self._monitor: Optional[RunMonitor] = None
         self.case_menu: Optional[tk.Menu] = None
         self.zip_instances: List[ZipCompilerInstance] = []
         self._stop_event = threading.Event()
+        # 进度快照 (completed, total, passed, failed)：工作线程覆盖写入，界面每帧读取一次
+        self._progress_snapshot: Optional[Tuple[int, int, int, int]] = None
+        self._shown_snapshot: Optional[Tuple[int, int, int, int]] = None
     
     def build(self):
         """构建测试运行标签页"""
@@ -161,6 +185,15 @@ class TestTab(BaseTab, OutputMixin):
         IconButton(right_header, text='记事本打开',
                    command=self._open_selected_testfile_in_notepad).pack(side=tk.RIGHT, padx=(0, 6))
         
+        # 过滤：关键词匹配用例名，#标签 匹配子目录
+        filter_frame = ttk.Frame(right_frame)
+        filter_frame.pack(fill=tk.X, pady=(0, 6))
+        ttk.Label(filter_frame, text="过滤", style='Status.TLabel').pack(side=tk.LEFT)
+        self.case_filter_var = tk.StringVar()
+        self.case_filter_var.trace_add('write', lambda *_: self._schedule_case_filter())
+        ttk.Entry(filter_frame, textvariable=self.case_filter_var).pack(
+            side=tk.LEFT, fill=tk.X, expand=True, padx=(6, 0))
+        
         # 列表框容器
         case_container = ttk.Frame(right_frame)
         case_container.pack(fill=tk.BOTH, expand=True)
@@ -229,11 +262,27 @@ class TestTab(BaseTab, OutputMixin):
         self.status_label = ttk.Label(status_frame, textvariable=self.status_var,
                                        style='Status.TLabel')
         self.status_label.pack(side=tk.LEFT)
+        
+        # 运行仪表盘
+        self.dashboard = DashboardPanel(parent)
+        self.dashboard.pack(fill=tk.X, pady=(0, 8))
     
     def _build_output_section(self, parent):
-        """输出日志区"""
-        output_frame = ttk.Frame(parent)
-        output_frame.pack(fill=tk.BOTH, expand=True)
+        """结果表与输出日志区"""
+        panes = ttk.PanedWindow(parent, orient=tk.VERTICAL)
+        panes.pack(fill=tk.BOTH, expand=True)
+        
+        # 结果表：每个（实例, 用例）一行，选中后显示失败详情
+        results_frame = ttk.Frame(panes)
+        ttk.Label(results_frame, text="📊 测试结果", style='Card.TLabel',
+                  font=('微软雅黑', 10, 'bold')).pack(anchor=tk.W, pady=(0, 6))
+        self.results_view = ResultsView(results_frame)
+        self.results_view.pack(fill=tk.BOTH, expand=True)
+        panes.add(results_frame, weight=3)
+        
+        # 输出日志：只记录标题、编译信息与汇总
+        output_frame = ttk.Frame(panes)
+        panes.add(output_frame, weight=1)
         
         # 标题栏
         header = ttk.Frame(output_frame)
@@ -252,7 +301,7 @@ class TestTab(BaseTab, OutputMixin):
         self.output_text = create_styled_text(
             text_container,
             font=(self.config.gui.get_font(), self.config.gui.font_size - 1),
-            wrap=tk.WORD, state=tk.DISABLED
+            wrap=tk.WORD, state=tk.DISABLED, height=8
         )
         output_scroll = ttk.Scrollbar(text_container, orient=tk.VERTICAL,
                                        command=self.output_text.yview)
@@ -364,22 +413,33 @@ class TestTab(BaseTab, OutputMixin):
         threading.Thread(target=compile_task, daemon=True).start()
     
     def refresh_lists(self):
-        """刷新测试库列表"""
+        """刷新测试库列表（重新扫描磁盘，保留当前库与用例的选择）"""
+        current_lib = self.current_lib_path
+        selected_names = self._selected_case_names()
         self.lib_listbox.delete(0, tk.END)
-        self.case_listbox.delete(0, tk.END)
         
         testcases_dir = self.test_dir / "testcases"
-        libs = TestDiscovery.discover_test_libs(testcases_dir)
+        self.case_index.refresh()
+        self._libs = self.case_index.libs()
         
         total_cases = 0
-        for lib in libs:
+        for lib in self._libs:
             rel_path = lib.relative_to(testcases_dir)
-            cases = TestDiscovery.discover_in_dir(lib)
-            total_cases += len(cases)
-            self.lib_listbox.insert(tk.END, f"{rel_path} ({len(cases)})")
+            count = len(self.case_index.cases(lib))
+            total_cases += count
+            self.lib_listbox.insert(tk.END, f"{rel_path} ({count})")
+        
+        if current_lib in self._libs:
+            idx = self._libs.index(current_lib)
+            self.lib_listbox.selection_set(idx)
+            self.lib_listbox.see(idx)
+            self._show_cases(selected_names)
+        else:
+            self.current_lib_path = None
+            self._show_cases(set())
         
-        self.lib_count_label.configure(text=f"{len(libs)} 个库")
-        self._log(f"📚 发现 {len(libs)} 个测试库，共 {total_cases} 个用例", 'info')
+        self.lib_count_label.configure(text=f"{len(self._libs)} 个库")
+        self._log(f"📚 发现 {len(self._libs)} 个测试库，共 {total_cases} 个用例", 'info')
         self.refresh_compilers()
 
     def _get_zip_dir(self) -> Optional[Path]:
@@ -489,23 +549,79 @@ class TestTab(BaseTab, OutputMixin):
         return selected
     
     def _on_lib_select(self, event):
-        """选择测试库时更新用例列表"""
+        """选择测试库时更新用例列表（来自缓存索引）"""
         selection = self.lib_listbox.curselection()
-        if not selection:
+        if not selection or selection[0] >= len(self._libs):
             return
         
+        self.current_lib_path = self._libs[selection[0]]
+        self._show_cases(set())
+    
+    def _schedule_case_filter(self):
+        """输入过滤词时稍作延迟再过滤，连续输入只触发一次"""
+        if self._filter_job is not None:
+            self.parent.after_cancel(self._filter_job)
+        self._filter_job = self.parent.after(120, self._apply_case_filter)
+    
+    def _apply_case_filter(self):
+        self._filter_job = None
+        self._show_cases(self._selected_case_names())
+    
+    def _selected_case_names(self) -> set:
+        return {
+            self._shown_cases[i].name for i in self.case_listbox.curselection()
+            if i < len(self._shown_cases)
+        }
+    
+    def _show_cases(self, selected_names: set):
+        """按过滤词显示当前库的用例，并恢复 selected_names 中的选择"""
+        if self._populate_job is not None:
+            self.parent.after_cancel(self._populate_job)
+            self._populate_job = None
         self.case_listbox.delete(0, tk.END)
-        lib_name = self.lib_listbox.get(selection[0]).split(' (')[0]
-        self.current_lib_path = self.test_dir / "testcases" / lib_name
         
-        cases = TestDiscovery.discover_in_dir(self.current_lib_path)
-        for case in cases:
-            self.case_listbox.insert(tk.END, case.name)
+        lib = self.current_lib_path
+        if lib is None:
+            self._shown_cases = []
+            self.case_count_label.configure(text="")
+            return
         
-        self.case_count_label.configure(text=f"{len(cases)} 个用例")
+        query = self.case_filter_var.get()
+        self._shown_cases = self.case_index.filter(lib, query)
+        total = len(self.case_index.cases(lib)) if query.strip() else len(self._shown_cases)
+        count_text = f"{len(self._shown_cases)} 个用例"
+        if query.strip():
+            count_text = f"{len(self._shown_cases)} / {total} 个用例"
+        self.case_count_label.configure(text=count_text)
+        self._populate_cases(0, selected_names)
+    
+    def _populate_cases(self, start: int, selected_names: set):
+        """插入一批用例行；剩余的行在空闲时继续插入"""
+        end = min(start + CASE_LIST_CHUNK, len(self._shown_cases))
+        chunk = self._shown_cases[start:end]
+        if chunk:
+            self.case_listbox.insert(tk.END, *(case.name for case in chunk))
+        for offset, case in enumerate(chunk):
+            if case.name in selected_names:
+                self.case_listbox.selection_set(start + offset)
+        if end < len(self._shown_cases):
+            self._populate_job = self.parent.after(1, self._populate_cases, end, selected_names)
+        else:
+            self._populate_job = None
+    
+    def _finish_populating(self):
+        """立即插入剩余的用例行（全选 / 运行选中前调用）"""
+        if self._populate_job is None:
+            return
+        self.parent.after_cancel(self._populate_job)
+        self._populate_job = None
+        start = self.case_listbox.size()
+        if start < len(self._shown_cases):
+            self.case_listbox.insert(tk.END, *(case.name for case in self._shown_cases[start:]))
     
     def _select_all_cases(self):
         """全选测试用例"""
+        self._finish_populating()
         self.case_listbox.select_set(0, tk.END)
     
     def _get_current_lib_path(self) -> Optional[Path]:
@@ -521,12 +637,11 @@ class TestTab(BaseTab, OutputMixin):
         if not selection:
             return None
         
-        all_cases = TestDiscovery.discover_in_dir(lib_path)
         idx = selection[0]
-        if idx < 0 or idx >= len(all_cases):
+        if idx < 0 or idx >= len(self._shown_cases):
             return None
         
-        return all_cases[idx]
+        return self._shown_cases[idx]
     
     def _open_in_notepad(self, file_path: Path):
         if not file_path.exists():
@@ -594,8 +709,7 @@ class TestTab(BaseTab, OutputMixin):
             messagebox.showwarning("提示", "请选择要运行的测试用例")
             return
         
-        all_cases = TestDiscovery.discover_in_dir(lib_path)
-        selected_cases = [all_cases[i] for i in case_selection]
+        selected_cases = [self._shown_cases[i] for i in case_selection if i < len(self._shown_cases)]
         self._run_tests(selected_cases, f"运行 {len(selected_cases)} 个选中测试")
     
     def _run_current_lib(self):
@@ -605,17 +719,16 @@ class TestTab(BaseTab, OutputMixin):
             messagebox.showwarning("提示", "请先选择测试库")
             return
         
-        cases = TestDiscovery.discover_in_dir(lib_path)
+        cases = self.case_index.cases(lib_path)
         self._run_tests(cases, f"运行测试库: {lib_path.name}")
     
     def _run_all(self):
         """运行所有测试"""
         testcases_dir = self.test_dir / "testcases"
-        libs = TestDiscovery.discover_test_libs(testcases_dir)
         
         all_cases = []
-        for lib in libs:
-            cases = TestDiscovery.discover_in_dir(lib)
+        for lib in self.case_index.libs():
+            cases = self.case_index.cases(lib)
             rel = lib.relative_to(testcases_dir)
             for case in cases:
                 if str(rel) == ".":
@@ -631,6 +744,9 @@ class TestTab(BaseTab, OutputMixin):
         if self.is_running:
             messagebox.showwarning("提示", "测试正在运行中")
             return
+        if self.app.editor_tab and self.app.editor_tab._running:
+            messagebox.showwarning("提示", "用例编写页正在即时运行，请稍候")
+            return
 
         zip_dir = self._get_zip_dir()
         if not zip_dir:
@@ -645,15 +761,23 @@ class TestTab(BaseTab, OutputMixin):
         self.is_running = True
         self.stop_btn.configure(state=tk.NORMAL)
         self._clear_output()
+        self.results_view.clear()
+        self._progress_snapshot = None
+        self._shown_snapshot = None
+        self._monitor = RunMonitor()
+        self.dashboard.clear()
         self.progress.set(0)
         self.result_label.configure(text="")
         self._stop_event.clear()
         
         max_workers = self.config.parallel.max_workers
         self._log(f"🚀 {title}", 'header')
-        self._log(f"   并行线程: {max_workers}", 'dim')
+        self._log(f"   并行线程: {'auto' if self.config.parallel.auto else max_workers}", 'dim')
         self._log(f"   编译器实例: {len(selected)}", 'dim')
         
+        monitor = self._monitor
+        self.parent.after(DASHBOARD_INTERVAL_MS, self._refresh_dashboard)
+        
         def test_task():
             testers: List[CompilerTester] = []
             for inst in selected:
@@ -691,18 +815,30 @@ class TestTab(BaseTab, OutputMixin):
                     return
                 if result.passed:
                     passed += 1
-                    self.message_queue.put(("result", tester.instance_name, case.name, result, True))
                 else:
                     failed += 1
-                    self.message_queue.put(("result", tester.instance_name, case.name, result, False))
-                progress = completed / total * 100 if total else 100.0
-                self.message_queue.put(("progress", progress, f"{passed + failed}/{total_tasks}"))
+                self.message_queue.put(("result", tester.instance_name, case.name, result, result.passed))
+                self._progress_snapshot = (completed, total, passed, failed)
 
+            history = open_history(self.test_dir, self.config.history_db, source="gui")
             try:
-                test_multi(ok_testers, cases, max_workers=max_workers, stop_event=self._stop_event, callback=on_result)
+                test_multi(
+                    ok_testers, cases,
+                    max_workers=max_workers,
+                    stop_event=self._stop_event,
+                    callback=on_result,
+                    adaptive=self.config.parallel.auto,
+                    log=lambda m: self.message_queue.put(("status", m)),
+                    run=self.config.run,
+                    history=history,
+                    monitor=monitor,
+                )
             except Exception as e:
                 self.message_queue.put(("error", str(e)))
                 return
+            finally:
+                if history:
+                    history.close()
 
             if self.is_running and not self._stop_event.is_set():
                 self.message_queue.put(("done", passed, failed, total_tasks))
@@ -719,75 +855,88 @@ class TestTab(BaseTab, OutputMixin):
     # ========== 消息处理 ==========
     
     def process_queue(self):
-        """处理消息队列"""
-        try:
-            while True:
+        """处理消息队列：每帧最多处理一批消息，进度只按最新快照刷新一次"""
+        deadline = time.perf_counter() + QUEUE_BUDGET_S
+        for _ in range(QUEUE_BATCH):
+            try:
                 msg = self.message_queue.get_nowait()
-                
-                if msg[0] == 'status':
-                    _, status = msg
-                    self.status_var.set(status)
-                    self._log(f"⏳ {status}", 'info')
-                
-                elif msg[0] == 'compile_done':
-                    _, success, text = msg
-                    icon = '✓' if success else '✗'
-                    self._log(f"{icon} {text}", 'pass' if success else 'error')
-                    self.status_var.set("编译完成")
-                
-                elif msg[0] == 'compile_failed':
-                    _, error_msg = msg
-                    self._log(f"✗ 编译失败: {error_msg}", 'error')
-                    self._finish_test(0, 0, stopped=True)
-
-                elif msg[0] == "compile_instance":
-                    _, name, ok, text = msg
-                    icon = "✓" if ok else "✗"
-                    self._log(f"{icon} [{name}] {text}", "pass" if ok else "error")
-
-                elif msg[0] == "compile_all_done":
-                    self.status_var.set("编译完成")
-
-                elif msg[0] == 'progress':
-                    _, progress, status = msg
-                    self.progress.set(progress)
-                    self.status_var.set(f"测试中... {status}")
-                
-                elif msg[0] == 'result':
-                    _, inst_name, case_name, result, passed = msg
-                    if passed:
-                        self._log(f"✓ [{inst_name}] {case_name}", 'pass')
-                    else:
-                        self._log_failure(
-                            name=f"[{inst_name}] {case_name}",
-                            status=result.status.value,
-                            message=result.message or "",
-                            actual=result.actual_output,
-                            expected=result.expected_output
-                        )
-                
-                elif msg[0] == 'error':
-                    _, error_msg = msg
-                    self._log(f"✗ 错误: {error_msg}", 'error')
-                    self._finish_test(0, 0, stopped=True)
-                
-                elif msg[0] == 'done':
-                    _, passed, failed, total = msg
-                    self._finish_test(passed, failed, total=total)
-                
-                elif msg[0] == 'stopped':
-                    _, passed, failed, total = msg
-                    self._log("⏹ 测试已停止", 'warning')
-                    self._finish_test(passed, failed, total=total, stopped=True)
-                
-        except:
-            pass
+            except queue.Empty:
+                break
+            try:
+                self._handle_message(msg)
+            except Exception:
+                pass
+            if time.perf_counter() > deadline:
+                break
+        self._apply_progress()
+    
+    def _apply_progress(self):
+        snapshot = self._progress_snapshot
+        if not self.is_running or snapshot is None or snapshot == self._shown_snapshot:
+            return
+        self._shown_snapshot = snapshot
+        completed, total, passed, failed = snapshot
+        self.progress.set(completed / total * 100 if total else 100.0)
+        self.status_var.set(f"测试中... {passed + failed}/{total}")
+    
+    def _refresh_dashboard(self):
+        """运行期间定期读取运行指标刷新仪表盘"""
+        if self._monitor is None:
+            return
+        self.dashboard.update_snapshot(self._monitor.snapshot(), ui_backlog=self.message_queue.qsize())
+        if self.is_running:
+            self.parent.after(DASHBOARD_INTERVAL_MS, self._refresh_dashboard)
+    
+    def _handle_message(self, msg):
+        """处理单条消息"""
+        if msg[0] == 'status':
+            _, status = msg
+            self.status_var.set(status)
+            self._log(f"⏳ {status}", 'info')
+        
+        elif msg[0] == 'compile_done':
+            _, success, text = msg
+            icon = '✓' if success else '✗'
+            self._log(f"{icon} {text}", 'pass' if success else 'error')
+            self.status_var.set("编译完成")
+        
+        elif msg[0] == 'compile_failed':
+            _, error_msg = msg
+            self._log(f"✗ 编译失败: {error_msg}", 'error')
+            self._finish_test(0, 0, stopped=True)
+
+        elif msg[0] == "compile_instance":
+            _, name, ok, text = msg
+            icon = "✓" if ok else "✗"
+            self._log(f"{icon} [{name}] {text}", "pass" if ok else "error")
+
+        elif msg[0] == "compile_all_done":
+            self.status_var.set("编译完成")
+
+        elif msg[0] == 'result':
+            _, inst_name, case_name, result, passed = msg
+            self.results_view.add_result(inst_name, case_name, result)
+        
+        elif msg[0] == 'error':
+            _, error_msg = msg
+            self._log(f"✗ 错误: {error_msg}", 'error')
+            self._finish_test(0, 0, stopped=True)
+        
+        elif msg[0] == 'done':
+            _, passed, failed, total = msg
+            self._finish_test(passed, failed, total=total)
+        
+        elif msg[0] == 'stopped':
+            _, passed, failed, total = msg
+            self._log("⏹ 测试已停止", 'warning')
+            self._finish_test(passed, failed, total=total, stopped=True)
     
     def _finish_test(self, passed: int, failed: int, total: Optional[int] = None, stopped: bool = False):
         """完成测试"""
         self.is_running = False
         self.stop_btn.configure(state=tk.DISABLED)
         self.progress.set(100)
+        self._refresh_dashboard()
         
         total = int(total if total is not None else (passed + failed))
         self.status_var.set("已停止" if stopped else "完成")
@@ -799,6 +948,6 @@ class TestTab(BaseTab, OutputMixin):
         elif total > 0:
             self.result_label.configure(text=f"✗ {failed} 失败 ({passed}/{total})",
                                          style='Error.TLabel')
-            self._log(f"\n📊 结果: {passed} 通过, {failed} 失败", 'fail')
+            self._log(f"\n📊 结果: {passed} 通过, {failed} 失败（在结果表中选中失败用例查看详情）", 'fail')
         else:
             self.result_label.configure(text="无测试运行", style='Status.TLabel')
@@ -1,6 +1,7 @@
 """
 自定义组件
 """
+import time
 import tkinter as tk
 from tkinter import ttk
 from .theme import COLORS
@@ -15,6 +16,7 @@ class AnimatedProgressBar(ttk.Frame):
         self._value = 0
         self._target = 0
         self._animating = False
+        self._last_frame = 0.0
         
         # 进度条容器
         self.container = tk.Canvas(
@@ -44,19 +46,23 @@ class AnimatedProgressBar(ttk.Frame):
         """设置进度值（带动画）"""
         self._target = max(0, min(100, value))
         if not self._animating:
-            self._animate()
+            self._animating = True
+            self._last_frame = time.perf_counter()
+            self.after(16, self._animate)
     
     def _animate(self):
-        """动画更新"""
-        if abs(self._value - self._target) < 0.5:
+        """动画更新：按实际经过的时间缓动，事件循环繁忙导致掉帧时直接追上目标，不会越来越落后"""
+        now = time.perf_counter()
+        elapsed = now - self._last_frame
+        self._last_frame = now
+        if abs(self._value - self._target) < 0.5 or elapsed > 0.25:
             self._value = self._target
             self._update_fill()
             self._animating = False
             return
         
-        self._animating = True
-        diff = self._target - self._value
-        self._value += diff * 0.2  # 缓动
+        # 每 16ms 逼近剩余距离的 20%
+        self._value += (self._target - self._value) * (1 - 0.8 ** (elapsed / 0.016))
         self._update_fill()
         self.after(16, self._animate)  # ~60fps
 
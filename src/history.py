@@ -0,0 +1,302 @@
+"""
+运行历史模块 - 用 SQLite 保存每次运行的元数据与每个用例的结果
+
+- runs / run_compilers：运行元数据，以及每个编译器实例的产物哈希、语言与命令指纹
+- results：每个用例的状态、cycle、指令分布、各阶段耗时、峰值 RSS 与信息（不保存完整输出）
+- case_state：每个编译器实例在每个用例上的最近状态（历史优先排序使用）
+
+写入先缓冲、批量提交；查询用于 flaky 检测、通过率趋势与最慢用例等。
+"""
+import json
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .models import TestCase, TestResult, TestStatus
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS case_state (
+    compiler   TEXT NOT NULL,
+    case_key   TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    file_sig   TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (compiler, case_key)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at  REAL NOT NULL,
+    finished_at REAL,
+    source      TEXT NOT NULL,
+    host        TEXT NOT NULL,
+    case_count  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_compilers (
+    run_id        INTEGER NOT NULL,
+    compiler      TEXT NOT NULL,
+    language      TEXT NOT NULL,
+    artifact_hash TEXT,
+    command_fp    TEXT,
+    PRIMARY KEY (run_id, compiler)
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id          INTEGER NOT NULL,
+    compiler        TEXT NOT NULL,
+    case_key        TEXT NOT NULL,
+    status          TEXT NOT NULL,
+    cycle           INTEGER,
+    cycle_breakdown TEXT,
+    compile_ms      INTEGER,
+    mars_ms         INTEGER,
+    gcc_ms          INTEGER,
+    max_rss_kb      INTEGER,
+    timed_out       INTEGER NOT NULL DEFAULT 0,
+    stage_times     TEXT,
+    message         TEXT,
+    finished_at     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_compiler_case ON results (compiler, case_key);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results (run_id);
+"""
+
+# 信息只保存前若干字符（失败详情中的完整输出不入库）
+_MESSAGE_LIMIT = 500
+
+
+def case_key(case: TestCase, testcases_dir: Path) -> str:
+    """用例的稳定标识：用例目录相对 testcases/ 的路径（CLI/GUI 中用例名不同也能对应）"""
+    case_dir = case.testfile.parent.resolve()
+    try:
+        return case_dir.relative_to(testcases_dir.resolve()).as_posix()
+    except ValueError:
+        return case_dir.as_posix()
+
+
+def file_signature(case: TestCase) -> str:
+    """用例文件（testfile / in / ans）的大小与修改时间签名"""
+    parts = []
+    for path in (case.testfile, case.input_file, case.expected_output_file):
+        if path is None:
+            parts.append("-")
+            continue
+        try:
+            st = path.stat()
+            parts.append(f"{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            parts.append("-")
+    return "|".join(parts)
+
+
+@dataclass
+class RunCompiler:
+    """一次运行中某个编译器实例的标识信息"""
+    name: str
+    language: str
+    artifact_hash: Optional[str] = None
+    command_fp: Optional[str] = None
+
+
+class HistoryStore:
+    """运行历史（线程安全；写入先缓冲，批量提交）"""
+
+    def __init__(self, path: Path, source: str = "cli", batch_size: int = 200):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.source = source
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._pending_states: List[tuple] = []
+        self._pending_results: List[tuple] = []
+
+    # ---------- 写入 ----------
+
+    def begin_run(self, compilers: Sequence[RunCompiler], case_count: int) -> int:
+        """登记一次运行，返回 run_id"""
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO runs (started_at, source, host, case_count) VALUES (?, ?, ?, ?)",
+                (time.time(), self.source, socket.gethostname(), case_count),
+            )
+            run_id = cur.lastrowid
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO run_compilers (run_id, compiler, language, artifact_hash, command_fp) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(run_id, c.name, c.language, c.artifact_hash, c.command_fp) for c in compilers],
+            )
+        return run_id
+
+    def end_run(self, run_id: int) -> None:
+        with self._lock:
+            self._flush_locked()
+            with self._conn:
+                self._conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def record_result(self, run_id: int, compiler: str, key: str, result: TestResult, file_sig: str) -> None:
+        """记录一个用例结果（SKIPPED 只入 results，不覆盖最近状态）"""
+        now = time.time()
+        stages = result.stage_times_ms or {}
+        gcc_ms = None
+        if "gcc_compile" in stages or "gcc_run" in stages:
+            gcc_ms = stages.get("gcc_compile", 0) + stages.get("gcc_run", 0)
+        max_rss = max(result.stage_rss_kb.values()) if result.stage_rss_kb else None
+        row = (
+            run_id, compiler, key, result.status.name,
+            result.cycle, result.cycle_breakdown,
+            stages.get("compile", result.compile_time_ms), stages.get("mars"), gcc_ms, max_rss,
+            int(result.timed_out), json.dumps(stages, sort_keys=True) if stages else None,
+            (result.message or "")[:_MESSAGE_LIMIT], now,
+        )
+        with self._lock:
+            self._pending_results.append(row)
+            if result.status != TestStatus.SKIPPED:
+                self._pending_states.append((compiler, key, result.status.name, file_sig, now))
+            if len(self._pending_results) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._pending_results and not self._pending_states:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO results (run_id, compiler, case_key, status, cycle, cycle_breakdown, "
+                "compile_ms, mars_ms, gcc_ms, max_rss_kb, timed_out, stage_times, message, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._pending_results,
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO case_state (compiler, case_key, status, file_sig, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                self._pending_states,
+            )
+        self._pending_results.clear()
+        self._pending_states.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+    # ---------- 查询 ----------
+
+    def _query(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def last_states(self, compiler: str) -> Dict[str, Tuple[str, str]]:
+        """compiler 在各用例上的最近状态：case_key -> (status, file_sig)"""
+        rows = self._query("SELECT case_key, status, file_sig FROM case_state WHERE compiler = ?", (compiler,))
+        return {key: (status, sig) for key, status, sig in rows}
+
+    def recent_runs(self, limit: int = 20) -> List[tuple]:
+        """最近的运行：(run_id, started_at, finished_at, source, case_count)"""
+        return self._query(
+            "SELECT run_id, started_at, finished_at, source, case_count FROM runs ORDER BY run_id DESC LIMIT ?",
+            (limit,),
+        )
+
+    def run_cycles(self, run_id: int) -> Dict[str, Dict[str, int]]:
+        """某次运行中通过用例的 cycle：compiler -> case_key -> cycle"""
+        rows = self._query(
+            "SELECT compiler, case_key, cycle FROM results "
+            "WHERE run_id = ? AND status = 'PASSED' AND cycle IS NOT NULL",
+            (run_id,),
+        )
+        table: Dict[str, Dict[str, int]] = {}
+        for name, key, cycle in rows:
+            table.setdefault(name, {})[key] = cycle
+        return table
+
+    def flaky_cases(self, compiler: Optional[str] = None, runs: int = 20, limit: int = 50) -> List[tuple]:
+        """同一编译器产物在最近 runs 次运行中结果不一致的用例。
+
+        返回 (compiler, case_key, 通过次数, 未通过次数, 出现过的状态)，按不一致程度排序。
+        """
+        return self._query(
+            """
+            SELECT r.compiler, r.case_key,
+                   SUM(r.status = 'PASSED') AS passes,
+                   SUM(r.status != 'PASSED') AS fails,
+                   GROUP_CONCAT(DISTINCT r.status) AS statuses
+            FROM results r
+            JOIN run_compilers rc ON rc.run_id = r.run_id AND rc.compiler = r.compiler
+            WHERE r.run_id > (SELECT COALESCE(MAX(run_id), 0) - ? FROM runs)
+              AND r.status != 'SKIPPED'
+              AND (? IS NULL OR r.compiler = ?)
+            GROUP BY r.compiler, rc.artifact_hash, r.case_key
+            HAVING COUNT(DISTINCT r.status) > 1
+            ORDER BY MIN(passes, fails) DESC, r.compiler, r.case_key
+            LIMIT ?
+            """,
+            (runs, compiler, compiler, limit),
+        )
+
+    def pass_rate_trend(self, compiler: Optional[str] = None, runs: int = 20) -> List[tuple]:
+        """最近 runs 次运行中各编译器的通过率：(run_id, started_at, compiler, passed, total)"""
+        return self._query(
+            """
+            SELECT r.run_id, ru.started_at, r.compiler,
+                   SUM(r.status = 'PASSED') AS passed, COUNT(*) AS total
+            FROM results r JOIN runs ru ON ru.run_id = r.run_id
+            WHERE r.run_id > (SELECT COALESCE(MAX(run_id), 0) - ? FROM runs)
+              AND r.status != 'SKIPPED'
+              AND (? IS NULL OR r.compiler = ?)
+            GROUP BY r.run_id, r.compiler
+            ORDER BY r.run_id, r.compiler
+            """,
+            (runs, compiler, compiler),
+        )
+
+    def slowest_cases(
+        self, compiler: Optional[str] = None, stage: str = "total", runs: int = 5, limit: int = 20
+    ) -> List[tuple]:
+        """最近 runs 次运行中平均耗时最长的用例：(compiler, case_key, 平均 ms, 最大 ms, 次数)
+
+        stage 为 compile / mars / gcc / total（compile + mars）。
+        """
+        column = {
+            "compile": "r.compile_ms",
+            "mars": "r.mars_ms",
+            "gcc": "r.gcc_ms",
+            "total": "(COALESCE(r.compile_ms, 0) + COALESCE(r.mars_ms, 0))",
+        }[stage]
+        return self._query(
+            f"""
+            SELECT r.compiler, r.case_key, AVG({column}) AS avg_ms, MAX({column}) AS max_ms, COUNT(*) AS n
+            FROM results r
+            WHERE r.run_id > (SELECT COALESCE(MAX(run_id), 0) - ? FROM runs)
+              AND r.status != 'SKIPPED'
+              AND (? IS NULL OR r.compiler = ?)
+              AND {column} IS NOT NULL
+            GROUP BY r.compiler, r.case_key
+            ORDER BY avg_ms DESC
+            LIMIT ?
+            """,
+            (runs, compiler, compiler, limit),
+        )
+
+
+def open_history(
+    test_dir: Path, db_path: str = ".tmp/history.sqlite3", source: str = "cli"
+) -> Optional[HistoryStore]:
+    """打开运行历史数据库；失败时返回 None（历史只是辅助手段，不影响测试本身）"""
+    path = Path(db_path)
+    if not path.is_absolute():
+        path = Path(test_dir) / path
+    try:
+        return HistoryStore(path, source=source)
+    except (sqlite3.Error, OSError) as e:
+        print(f"打开运行历史失败: {e}")
+        return None
@@ -0,0 +1,230 @@
+"""
+排行榜模块 - 多个编译器实例的通过数与加权 cycle 排名
+
+结果到达时逐条累加（只保存每个通过用例的 cycle 与各类指令条数，不保存输出）：
+- 通过数 / 总数，按测试库分别统计
+- 在「所有实例都通过」的公共用例上计算加权 cycle 之和与几何平均，以及按测试库的几何平均
+- 公共用例上各类指令占加权 cycle 的比例（来自 cycle_breakdown）
+
+排名：通过数降序，其次几何平均 cycle 升序。输出为终端表格、CSV 或 HTML。
+"""
+import csv
+import html
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .history import case_key
+from .models import TestCase, TestResult, TestStatus
+from .ordering import case_library
+
+
+def parse_breakdown(breakdown: Optional[str]) -> Dict[str, int]:
+    """解析 `Division=3, Multiply=5, ...` 形式的 cycle_breakdown"""
+    counts: Dict[str, int] = {}
+    for part in (breakdown or "").split(","):
+        name, sep, value = part.partition("=")
+        if not sep:
+            continue
+        try:
+            counts[name.strip()] = int(value.strip())
+        except ValueError:
+            continue
+    return counts
+
+
+@dataclass
+class _InstanceTally:
+    """单个编译器实例的累计数据"""
+    passed: int = 0
+    total: int = 0
+    # library -> [passed, total]
+    libraries: Dict[str, List[int]] = field(default_factory=dict)
+    # case_key -> (cycle, {指令类别: 条数})
+    cycles: Dict[str, Tuple[int, Dict[str, int]]] = field(default_factory=dict)
+
+
+@dataclass
+class LeaderboardRow:
+    """排行榜中的一行"""
+    rank: int
+    name: str
+    passed: int
+    total: int
+    cycle_sum: Optional[int]
+    cycle_geomean: Optional[float]
+    # library -> (passed, total, 公共用例上的几何平均 cycle)
+    libraries: Dict[str, Tuple[int, int, Optional[float]]]
+    # 指令类别 -> 占加权 cycle 的比例
+    mix: Dict[str, float]
+
+
+class Leaderboard:
+    """增量排行榜；add() 可在 test_multi 的回调中调用（线程安全由调用方保证，回调本身是串行的）"""
+
+    def __init__(self, testcases_dir: Path, weights: Dict[str, int]):
+        self.testcases_dir = testcases_dir
+        self.weights = dict(weights)
+        self._tallies: Dict[str, _InstanceTally] = {}
+
+    def add(self, name: str, case: TestCase, result: TestResult) -> None:
+        if result.status == TestStatus.SKIPPED:
+            return
+        tally = self._tallies.setdefault(name, _InstanceTally())
+        library = case_library(case)
+        lib_counts = tally.libraries.setdefault(library, [0, 0])
+        tally.total += 1
+        lib_counts[1] += 1
+        if not result.passed:
+            return
+        tally.passed += 1
+        lib_counts[0] += 1
+        if result.cycle is not None and result.cycle > 0:
+            key = case_key(case, self.testcases_dir)
+            tally.cycles[key] = (result.cycle, parse_breakdown(result.cycle_breakdown))
+
+    def common_cases(self) -> Set[str]:
+        """所有实例都通过且有 cycle 的用例"""
+        keys: Optional[Set[str]] = None
+        for tally in self._tallies.values():
+            keys = set(tally.cycles) if keys is None else keys & tally.cycles.keys()
+        return keys or set()
+
+    def rows(self) -> List[LeaderboardRow]:
+        common = self.common_cases()
+        rows: List[LeaderboardRow] = []
+        for name, tally in self._tallies.items():
+            cycles = [tally.cycles[k][0] for k in common]
+            lib_logs: Dict[str, List[float]] = {}
+            weighted: Dict[str, int] = {}
+            for key in common:
+                cycle, counts = tally.cycles[key]
+                lib_logs.setdefault(key.split("/", 1)[0], []).append(math.log(cycle))
+                for cls, count in counts.items():
+                    weighted[cls] = weighted.get(cls, 0) + count * self.weights.get(cls, 0)
+            weighted_total = sum(weighted.values())
+            libraries = {}
+            for library, (p, t) in sorted(tally.libraries.items()):
+                logs = lib_logs.get(library)
+                libraries[library] = (p, t, math.exp(sum(logs) / len(logs)) if logs else None)
+            rows.append(LeaderboardRow(
+                rank=0,
+                name=name,
+                passed=tally.passed,
+                total=tally.total,
+                cycle_sum=sum(cycles) if cycles else None,
+                cycle_geomean=_geomean(cycles),
+                libraries=libraries,
+                mix={cls: w / weighted_total for cls, w in weighted.items() if w} if weighted_total else {},
+            ))
+        rows.sort(key=lambda r: (-r.passed, r.cycle_geomean if r.cycle_geomean is not None else math.inf, r.name))
+        for i, row in enumerate(rows, 1):
+            row.rank = i
+        return rows
+
+    def format_table(self) -> List[str]:
+        """终端表格"""
+        rows = self.rows()
+        common = len(self.common_cases())
+        name_width = max([len(r.name) for r in rows] + [4])
+        lines = [
+            f"排行榜（公共通过用例 {common} 个）",
+            f"{'#':>3}  {'实例':<{name_width}}  {'通过':>11}  {'cycle 之和':>14}  {'几何平均':>12}  指令占比",
+        ]
+        for r in rows:
+            mix = " ".join(f"{cls} {share * 100:.0f}%" for cls, share in _sorted_mix(r.mix))
+            lines.append(
+                f"{r.rank:>3}  {r.name:<{name_width}}  {f'{r.passed}/{r.total}':>11}  "
+                f"{_fmt_int(r.cycle_sum):>14}  {_fmt_float(r.cycle_geomean):>12}  {mix}"
+            )
+        for r in rows:
+            libs = ", ".join(
+                f"{lib or '.'} {p}/{t}" + (f" ({gm:.0f})" if gm is not None else "")
+                for lib, (p, t, gm) in r.libraries.items()
+            )
+            lines.append(f"     [{r.name}] {libs}")
+        return lines
+
+    def write_csv(self, path: Path) -> None:
+        """CSV：每个实例一行，测试库与指令类别各占若干列"""
+        rows = self.rows()
+        libraries = sorted({lib for r in rows for lib in r.libraries})
+        classes = _mix_classes(rows)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(
+                ["rank", "compiler", "passed", "total", "cycle_sum", "cycle_geomean"]
+                + [f"{lib or '.'}:passed" for lib in libraries]
+                + [f"{lib or '.'}:geomean" for lib in libraries]
+                + [f"mix:{cls}" for cls in classes]
+            )
+            for r in rows:
+                writer.writerow(
+                    [r.rank, r.name, r.passed, r.total, _fmt_int(r.cycle_sum, ""), _fmt_float(r.cycle_geomean, "")]
+                    + [r.libraries[lib][0] if lib in r.libraries else "" for lib in libraries]
+                    + [_fmt_float(r.libraries[lib][2], "") if lib in r.libraries else "" for lib in libraries]
+                    + [f"{r.mix[cls]:.4f}" if cls in r.mix else "" for cls in classes]
+                )
+
+    def write_html(self, path: Path) -> None:
+        """独立的 HTML 页面（无外部资源）"""
+        rows = self.rows()
+        libraries = sorted({lib for r in rows for lib in r.libraries})
+        classes = _mix_classes(rows)
+        e = html.escape
+        head = (
+            "<tr><th>#</th><th>实例</th><th>通过</th><th>cycle 之和</th><th>几何平均</th>"
+            + "".join(f"<th>{e(lib or '.')}</th>" for lib in libraries)
+            + "".join(f"<th>{e(cls)}</th>" for cls in classes)
+            + "</tr>"
+        )
+        body = []
+        for r in rows:
+            cells = [str(r.rank), e(r.name), f"{r.passed}/{r.total}", _fmt_int(r.cycle_sum), _fmt_float(r.cycle_geomean)]
+            for lib in libraries:
+                if lib not in r.libraries:
+                    cells.append("")
+                    continue
+                p, t, gm = r.libraries[lib]
+                cells.append(f"{p}/{t}" + (f"<br><small>{gm:.0f}</small>" if gm is not None else ""))
+            cells += [f"{r.mix[cls] * 100:.1f}%" if cls in r.mix else "" for cls in classes]
+            body.append("<tr>" + "".join(f"<td>{c}</td>" for c in cells) + "</tr>")
+        page = (
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Leaderboard</title>\n"
+            "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+            "th,td{border:1px solid #ccc;padding:4px 8px;text-align:right}td:nth-child(2){text-align:left}"
+            "tr:nth-child(even){background:#f6f6f6}</style></head><body>\n"
+            f"<h2>排行榜（公共通过用例 {len(self.common_cases())} 个）</h2>\n"
+            f"<table>\n{head}\n" + "\n".join(body) + "\n</table>\n</body></html>\n"
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(page, encoding="utf-8")
+
+
+def _geomean(values: List[int]) -> Optional[float]:
+    if not values:
+        return None
+    return math.exp(sum(math.log(v) for v in values) / len(values))
+
+
+def _sorted_mix(mix: Dict[str, float]) -> List[Tuple[str, float]]:
+    return sorted(mix.items(), key=lambda kv: -kv[1])
+
+
+def _mix_classes(rows: List[LeaderboardRow]) -> List[str]:
+    classes: List[str] = []
+    for r in rows:
+        for cls in r.mix:
+            if cls not in classes:
+                classes.append(cls)
+    return classes
+
+
+def _fmt_int(value: Optional[int], empty: str = "-") -> str:
+    return str(value) if value is not None else empty
+
+
+def _fmt_float(value: Optional[float], empty: str = "-") -> str:
+    return f"{value:.1f}" if value is not None else empty
@@ -4,7 +4,7 @@
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
 
 class TestStatus(Enum):
@@ -27,6 +27,11 @@ class TestResult:
     compile_time_ms: Optional[int] = None
     cycle: Optional[int] = None
     cycle_breakdown: Optional[str] = None
+    # 各阶段耗时（ms）与峰值 RSS（KB），键为 compile / mars / gcc_compile / gcc_run
+    stage_times_ms: Optional[Dict[str, int]] = None
+    stage_rss_kb: Optional[Dict[str, int]] = None
+    # 是否有阶段因超时被终止
+    timed_out: bool = False
     
     @property
     def passed(self) -> bool:
@@ -0,0 +1,118 @@
+"""
+运行监控模块 - 收集运行中的吞吐、排队与各阶段忙碌情况，供 GUI 仪表盘定期读取
+
+由 test_multi 与 CompilerTester 在关键位置更新（均为 O(1) 计数），读取方调用 snapshot()
+获得一致的快照；不持有任何用例输出。
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from .models import TestResult, TestStatus
+
+# 仪表盘展示的阶段（wait 为等待空闲 worker 槽位）
+STAGES = ("wait", "compile", "mars", "gcc")
+
+
+@dataclass
+class MonitorSnapshot:
+    """某一时刻的运行指标"""
+    elapsed_s: float
+    total: int
+    completed: int
+    skipped: int
+    queued: int
+    in_flight: int
+    limit: int
+    busy: Dict[str, int]
+    rate: float
+    eta_s: Optional[float]
+    # compiler -> (passed, done)
+    per_compiler: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    latencies_ms: List[int] = field(default_factory=list)
+
+
+class RunMonitor:
+    """线程安全的运行指标收集器；吞吐按最近 window_s 秒的完成数计算"""
+
+    def __init__(self, window_s: float = 30.0, latency_samples: int = 80):
+        self.window_s = window_s
+        self._lock = threading.Lock()
+        self._latencies: Deque[int] = deque(maxlen=latency_samples)
+        self.start(0)
+
+    def start(self, total: int) -> None:
+        with self._lock:
+            self._started = time.monotonic()
+            self._total = total
+            self._submitted = 0
+            self._completed = 0
+            self._skipped = 0
+            self._limit = 0
+            self._busy: Dict[str, int] = {stage: 0 for stage in STAGES}
+            self._done_times: Deque[float] = deque()
+            self._per_compiler: Dict[str, List[int]] = {}
+            self._latencies.clear()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        with self._lock:
+            self._busy[name] = self._busy.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._busy[name] -= 1
+
+    def set_limit(self, limit: int) -> None:
+        self._limit = limit
+
+    def on_submit(self) -> None:
+        with self._lock:
+            self._submitted += 1
+
+    def on_skip(self) -> None:
+        with self._lock:
+            self._skipped += 1
+
+    def on_complete(self, compiler: str, result: TestResult) -> None:
+        now = time.monotonic()
+        stages = result.stage_times_ms or {}
+        latency = sum(stages.values()) if stages else result.compile_time_ms
+        with self._lock:
+            self._completed += 1
+            self._done_times.append(now)
+            counts = self._per_compiler.setdefault(compiler, [0, 0])
+            if result.status != TestStatus.SKIPPED:
+                counts[1] += 1
+                if result.passed:
+                    counts[0] += 1
+            if latency is not None:
+                self._latencies.append(latency)
+
+    def snapshot(self) -> MonitorSnapshot:
+        now = time.monotonic()
+        with self._lock:
+            while self._done_times and now - self._done_times[0] > self.window_s:
+                self._done_times.popleft()
+            elapsed = now - self._started
+            window = min(self.window_s, elapsed)
+            rate = len(self._done_times) / window if window > 0 else 0.0
+            remaining = self._total - self._completed - self._skipped
+            return MonitorSnapshot(
+                elapsed_s=elapsed,
+                total=self._total,
+                completed=self._completed,
+                skipped=self._skipped,
+                queued=max(0, self._total - self._submitted - self._skipped),
+                in_flight=self._submitted - self._completed,
+                limit=self._limit,
+                busy=dict(self._busy),
+                rate=rate,
+                eta_s=remaining / rate if rate > 0 and remaining > 0 else None,
+                per_compiler={name: (p, d) for name, (p, d) in self._per_compiler.items()},
+                latencies_ms=list(self._latencies),
+            )
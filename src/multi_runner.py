@@ -1,16 +1,23 @@
 """
 多编译器实例的编译与测试调度。
 
-目标：在 `parallel.max_workers` 限制下，对多个 CompilerTester 实例并发运行测试用例。
+目标：在 `parallel.max_workers` 限制下（或 `auto` 时由 ConcurrencyController 自动调节），
+对多个 CompilerTester 实例并发运行测试用例。
 """
 
 from __future__ import annotations
 
 import threading
+import time
 from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
+from .concurrency import ConcurrencyController
+from .config import RunConfig
 from .models import TestCase, TestResult, TestStatus
+from .monitor import RunMonitor
+from .history import HistoryStore, RunCompiler, case_key, file_signature
+from .ordering import history_order, order_cases
 from .tester import CompilerTester
 
 
@@ -47,14 +54,101 @@ def compile_testers(
     return results
 
 
-def iter_round_robin_tasks(testers: List[CompilerTester], cases: List[TestCase]) -> Iterable[Tuple[CompilerTester, TestCase]]:
+def prepare_archives(
+    testers: List[CompilerTester],
+    cases: List[TestCase],
+    max_workers: int,
+    stop_event: Optional[threading.Event] = None,
+    log: Optional[Callable[[str], None]] = None,
+) -> None:
+    """各实例并发准备 AppCDS 归档（只有 jar 内容或 JDK 变化时才需要训练）"""
+    if not testers:
+        return
+    workers = max(1, min(int(max_workers or 1), len(testers)))
+
+    def run_one(tester: CompilerTester) -> List[str]:
+        if stop_event and stop_event.is_set():
+            return []
+        return tester.prepare_jvm_archives(cases)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for messages in executor.map(run_one, testers):
+            for msg in messages:
+                if log:
+                    log(msg)
+
+
+def iter_round_robin_tasks(
+    testers: List[CompilerTester],
+    cases: List[TestCase],
+    per_tester: Optional[Dict[str, List[TestCase]]] = None,
+) -> Iterable[Tuple[CompilerTester, TestCase]]:
+    """在多个实例之间轮转提交用例；per_tester 可为每个实例指定各自的用例顺序"""
     if not testers or not cases:
         return
     n = len(testers)
-    for case_i, case in enumerate(cases):
+    orders = [(per_tester or {}).get(t.instance_name, cases) for t in testers]
+    for case_i in range(len(cases)):
         start = case_i % n
         for j in range(n):
-            yield testers[(start + j) % n], case
+            k = (start + j) % n
+            yield testers[k], orders[k][case_i]
+
+
+class RunGuard:
+    """fail-fast / 时间预算：决定某个实例的下一个用例是否还需要运行，并统计跳过的用例"""
+
+    def __init__(self, run: RunConfig, log: Optional[Callable[[str], None]] = None):
+        self.run = run
+        self.log = log
+        self.deadline = time.monotonic() + run.time_budget_s if run.time_budget_s > 0 else None
+        self.budget_reason: Optional[str] = None
+        self.stopped: Dict[str, str] = {}        # instance -> 停止原因
+        self.skipped: Dict[str, int] = {}        # instance -> 跳过的用例数
+        self._failures: Dict[str, int] = {}
+        self._compile_errors: Dict[str, int] = {}
+
+    def skip_reason(self, instance_name: str) -> Optional[str]:
+        reason = self.stopped.get(instance_name)
+        if reason:
+            return reason
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            if self.budget_reason is None:
+                self.budget_reason = f"时间预算 {self.run.time_budget_s:g}s 已用尽"
+                self._emit(f"{self.budget_reason}，不再提交新用例")
+            return self.budget_reason
+        return None
+
+    def record_skip(self, instance_name: str) -> None:
+        self.skipped[instance_name] = self.skipped.get(instance_name, 0) + 1
+
+    def on_result(self, instance_name: str, result: TestResult) -> None:
+        if instance_name in self.stopped or result.status == TestStatus.SKIPPED:
+            return
+        if result.status == TestStatus.COMPILE_ERROR:
+            self._compile_errors[instance_name] = self._compile_errors.get(instance_name, 0) + 1
+        else:
+            self._compile_errors[instance_name] = 0
+        if not result.passed:
+            self._failures[instance_name] = self._failures.get(instance_name, 0) + 1
+
+        run = self.run
+        if run.max_failures and self._failures.get(instance_name, 0) >= run.max_failures:
+            self.stopped[instance_name] = f"失败达到 {run.max_failures} 次，已停止该实例"
+        elif (run.max_consecutive_compile_errors
+              and self._compile_errors[instance_name] >= run.max_consecutive_compile_errors):
+            self.stopped[instance_name] = f"连续 {run.max_consecutive_compile_errors} 次编译错误，已停止该实例"
+        if instance_name in self.stopped:
+            self._emit(f"[{instance_name}] {self.stopped[instance_name]}")
+
+    def report(self) -> None:
+        for instance_name, count in self.skipped.items():
+            reason = self.stopped.get(instance_name) or self.budget_reason or ""
+            self._emit(f"[{instance_name}] 跳过 {count} 个用例（{reason}）")
+
+    def _emit(self, msg: str) -> None:
+        if self.log:
+            self.log(msg)
 
 
 def test_multi(
@@ -63,12 +157,48 @@ def test_multi(
     max_workers: int,
     stop_event: Optional[threading.Event] = None,
     callback: Optional[TestCallback] = None,
+    adaptive: bool = False,
+    log: Optional[Callable[[str], None]] = None,
+    run: Optional[RunConfig] = None,
+    history: Optional[HistoryStore] = None,
+    monitor: Optional[RunMonitor] = None,
 ) -> List[Tuple[str, TestCase, TestResult]]:
-    """对多个编译器实例运行用例，返回 [(instance_name, case, result), ...]。"""
+    """对多个编译器实例运行用例，返回 [(instance_name, case, result), ...]。
+
+    adaptive=True 时并发由 ConcurrencyController 按吞吐量、内存与超时情况自动调节，
+    max_workers 仅作为参考。log 用于输出准备阶段（如 AppCDS 归档生成）与运行模式的信息。
+
+    run 指定运行模式（fail-fast / 时间预算 / 冒烟顺序）：被跳过的用例不会触发 callback，
+    以 SKIPPED 结果出现在返回值中，并通过 log 按实例汇总。
+
+    history 不为空时记录每个结果；run.failures_first 时按该实例的历史调整各自的用例顺序。
+
+    monitor 不为空时更新运行指标（吞吐、排队/在途任务数、各阶段忙碌数），供界面定期读取。
+    """
     if not testers or not cases:
         return []
 
-    tasks = iter_round_robin_tasks(testers, cases)
+    run = run or RunConfig()
+    cases = order_cases(cases, run.order)
+    guard = RunGuard(run, log)
+
+    testcases_dir = testers[0].test_dir / "testcases"
+    case_keys = {id(c): case_key(c, testcases_dir) for c in cases} if history else {}
+    run_id = history.begin_run(
+        [RunCompiler(t.instance_name, t.get_compiler_language(), t.artifact_hash(), t.command_fingerprint())
+         for t in testers],
+        len(cases),
+    ) if history else 0
+    per_tester: Dict[str, List[TestCase]] = {}
+    if history and run.failures_first:
+        for tester in testers:
+            states = history.last_states(tester.instance_name)
+            ordered = history_order(cases, states, lambda c: case_keys[id(c)], file_signature)
+            per_tester[tester.instance_name] = ordered
+            if log and states:
+                rerun = sum(1 for c in cases if states.get(case_keys[id(c)], ("PASSED",))[0] != "PASSED")
+                log(f"[{tester.instance_name}] 历史优先：先运行上次失败的 {rerun} 个用例")
+    tasks = iter_round_robin_tasks(testers, cases, per_tester)
     total = len(testers) * len(cases)
     completed = 0
     results: List[Tuple[str, TestCase, TestResult]] = []
@@ -76,38 +206,80 @@ def test_multi(
     def run_one(tester: CompilerTester, case: TestCase) -> Tuple[str, TestCase, TestResult]:
         if stop_event and stop_event.is_set():
             return tester.instance_name, case, TestResult(TestStatus.SKIPPED, "已停止")
-        worker_id = tester.allocate_worker_id(max_workers=max(1, int(max_workers or 1)))
-        result = tester.test(case.testfile, case.input_file, case.expected_output_file, worker_id)
+        result = tester.test_case(case)
         return tester.instance_name, case, result
 
-    workers = max(1, int(max_workers or 1))
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        in_flight: Dict[Future, Tuple[CompilerTester, TestCase]] = {}
-
-        def submit_next():
-            if stop_event and stop_event.is_set():
-                return False
-            try:
-                tester, case = next(tasks)
-            except StopIteration:
-                return False
-            in_flight[executor.submit(run_one, tester, case)] = (tester, case)
-            return True
-
-        for _ in range(min(workers, total)):
-            if not submit_next():
-                break
-
-        while in_flight:
-            done, _pending = wait(in_flight.keys(), return_when=FIRST_COMPLETED)
-            for fut in done:
-                tester, case = in_flight.pop(fut)
-                instance_name, case_obj, result = fut.result()
-                results.append((instance_name, case_obj, result))
-                completed += 1
-                if callback:
-                    callback(tester, case_obj, result, completed, total)
-                if len(in_flight) < workers:
-                    submit_next()
+    controller = ConcurrencyController.create(max_workers, adaptive=adaptive)
+    for tester in testers:
+        tester.worker_slots.set_limit(controller.max_limit)
+        tester.monitor = monitor
+    if monitor:
+        monitor.start(total)
+        monitor.set_limit(controller.limit)
+
+    # 首次运行某个 jar（或 jar 内容/JDK 变化后）先训练生成 AppCDS 归档，之后的用例直接复用
+    prepare_archives(testers, cases, controller.max_limit, stop_event, log)
+
+    try:
+        with ThreadPoolExecutor(max_workers=controller.max_limit) as executor:
+            in_flight: Dict[Future, Tuple[CompilerTester, TestCase]] = {}
+
+            def submit_next():
+                while True:
+                    if stop_event and stop_event.is_set():
+                        return False
+                    try:
+                        tester, case = next(tasks)
+                    except StopIteration:
+                        return False
+                    reason = guard.skip_reason(tester.instance_name)
+                    if reason is None:
+                        break
+                    guard.record_skip(tester.instance_name)
+                    if monitor:
+                        monitor.on_skip()
+                    skipped = TestResult(TestStatus.SKIPPED, reason)
+                    results.append((tester.instance_name, case, skipped))
+                    if history:
+                        history.record_result(
+                            run_id, tester.instance_name, case_keys[id(case)], skipped, file_signature(case)
+                        )
+                in_flight[executor.submit(run_one, tester, case)] = (tester, case)
+                if monitor:
+                    monitor.on_submit()
+                return True
+
+            def fill():
+                while len(in_flight) < controller.limit:
+                    if not submit_next():
+                        break
+
+            fill()
+
+            while in_flight:
+                done, _pending = wait(in_flight.keys(), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    tester, case = in_flight.pop(fut)
+                    instance_name, case_obj, result = fut.result()
+                    results.append((instance_name, case_obj, result))
+                    completed += 1
+                    controller.on_result(result)
+                    guard.on_result(instance_name, result)
+                    if monitor:
+                        monitor.on_complete(instance_name, result)
+                        monitor.set_limit(controller.limit)
+                    if history:
+                        history.record_result(
+                            run_id, instance_name, case_keys[id(case_obj)], result, file_signature(case_obj)
+                        )
+                    if callback:
+                        callback(tester, case_obj, result, completed, total)
+                fill()
+    finally:
+        if history:
+            history.end_run(run_id)
+        for tester in testers:
+            tester.monitor = None
 
+    guard.report()
     return results
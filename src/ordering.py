@@ -0,0 +1,63 @@
+"""
+用例排序模块 - 决定用例的提交顺序
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+from .models import TestCase
+
+
+def case_library(case: TestCase) -> str:
+    """用例所属的顶层测试库（用例名形如 `<库>/<子目录>/<用例>`）"""
+    return case.name.split("/", 1)[0] if "/" in case.name else ""
+
+
+def smoke_order(cases: List[TestCase]) -> List[TestCase]:
+    """冒烟顺序：各测试库轮流取用例（先每个库一个，再每个库第二个……）。
+
+    库内保持原顺序；配合 fail-fast 可以在很短时间内覆盖所有测试库。
+    """
+    groups: Dict[str, List[TestCase]] = OrderedDict()
+    for case in cases:
+        groups.setdefault(case_library(case), []).append(case)
+
+    ordered: List[TestCase] = []
+    queues = list(groups.values())
+    depth = 0
+    while len(ordered) < len(cases):
+        for queue in queues:
+            if depth < len(queue):
+                ordered.append(queue[depth])
+        depth += 1
+    return ordered
+
+
+def history_order(
+    cases: List[TestCase],
+    states: Dict[str, Tuple[str, str]],
+    key_fn: Callable[[TestCase], str],
+    sig_fn: Callable[[TestCase], str],
+) -> List[TestCase]:
+    """历史优先顺序：上次失败的用例 → 上次运行后文件有改动（或从未运行）的用例 → 其余用例。
+
+    states 为该编译器实例的最近状态（case_key -> (status, file_sig)），各档内保持原顺序。
+    """
+    failed: List[TestCase] = []
+    changed: List[TestCase] = []
+    rest: List[TestCase] = []
+    for case in cases:
+        state = states.get(key_fn(case))
+        if state is not None and state[0] != "PASSED":
+            failed.append(case)
+        elif state is None or state[1] != sig_fn(case):
+            changed.append(case)
+        else:
+            rest.append(case)
+    return failed + changed + rest
+
+
+def order_cases(cases: List[TestCase], order: str) -> List[TestCase]:
+    """按 run.order 配置排序用例"""
+    if order == "smoke":
+        return smoke_order(cases)
+    return list(cases)
@@ -0,0 +1,154 @@
+"""
+子进程运行模块 - 统一记录各阶段耗时与峰值内存（RSS）
+"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class ProcessResult:
+    """子进程运行结果（stdout/stderr 为原始字节）"""
+    returncode: int
+    stdout: bytes
+    stderr: bytes
+    wall_ms: int
+    max_rss_kb: Optional[int] = None
+
+
+def _rss_to_kb(ru_maxrss: int) -> int:
+    # Linux 以 KB 计，macOS 以字节计
+    if sys.platform == "darwin":
+        return int(ru_maxrss // 1024)
+    return int(ru_maxrss)
+
+
+def _exit_code(status: int) -> int:
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _read_stream(stream, chunks: List[bytes]):
+    try:
+        chunks.append(stream.read())
+    finally:
+        stream.close()
+
+
+def run_process(
+    cmd: List[str],
+    input: Optional[bytes] = None,
+    timeout: Optional[float] = None,
+    cwd: Optional[str] = None,
+    env: Optional[dict] = None,
+) -> ProcessResult:
+    """运行子进程并捕获输出，语义同 subprocess.run(capture_output=True)。
+
+    - 超时抛出 subprocess.TimeoutExpired（进程已被杀死）
+    - POSIX 下通过 wait4 获取该进程的峰值 RSS；其他平台 max_rss_kb 为 None
+    """
+    start = time.monotonic()
+    if not hasattr(os, "wait4"):
+        result = subprocess.run(cmd, input=input, capture_output=True, timeout=timeout, cwd=cwd, env=env)
+        return ProcessResult(
+            result.returncode, result.stdout, result.stderr,
+            int((time.monotonic() - start) * 1000),
+        )
+
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if input is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        env=env,
+    )
+
+    # 进程退出但尚未回收前 pid 不会被复用；kill 与回收之间用锁互斥
+    reap_lock = threading.Lock()
+    exited = False
+    timed_out = False
+
+    def on_timeout():
+        nonlocal timed_out
+        with reap_lock:
+            if exited:
+                return
+            timed_out = True
+            try:
+                os.kill(proc.pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    out_chunks: List[bytes] = []
+    err_chunks: List[bytes] = []
+    readers = [
+        threading.Thread(target=_read_stream, args=(proc.stdout, out_chunks), daemon=True),
+        threading.Thread(target=_read_stream, args=(proc.stderr, err_chunks), daemon=True),
+    ]
+    for t in readers:
+        t.start()
+
+    timer = threading.Timer(timeout, on_timeout) if timeout else None
+    if timer:
+        timer.daemon = True
+        timer.start()
+
+    try:
+        if proc.stdin is not None:
+            try:
+                if input:
+                    proc.stdin.write(input)
+            except (BrokenPipeError, OSError):
+                pass
+            finally:
+                try:
+                    proc.stdin.close()
+                except OSError:
+                    pass
+
+        waitid = getattr(os, "waitid", None)
+        if waitid is not None:
+            # 等待退出但不回收（WNOWAIT），保证超时 kill 不会误杀复用的 pid
+            waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+            with reap_lock:
+                exited = True
+            _, status, rusage = os.wait4(proc.pid, 0)
+        else:
+            _, status, rusage = os.wait4(proc.pid, 0)
+            with reap_lock:
+                exited = True
+    except BaseException:
+        with reap_lock:
+            exited = True
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except OSError:
+                pass
+            proc.wait()
+        raise
+    finally:
+        if timer:
+            timer.cancel()
+
+    proc.returncode = _exit_code(status)
+    for t in readers:
+        t.join()
+
+    stdout = out_chunks[0] if out_chunks else b""
+    stderr = err_chunks[0] if err_chunks else b""
+    if timed_out:
+        raise subprocess.TimeoutExpired(cmd, timeout, output=stdout, stderr=stderr)
+
+    return ProcessResult(
+        proc.returncode, stdout, stderr,
+        int((time.monotonic() - start) * 1000),
+        _rss_to_kb(rusage.ru_maxrss),
+    )
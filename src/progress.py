@@ -0,0 +1,108 @@
+"""
+命令行进度渲染模块 - 在独立线程中输出结果行与进度
+
+回调线程只把要输出的行放入队列，不直接写 stdout：
+- TTY 上进度行以固定帧率原地刷新（\\r），失败等普通行打印在进度行上方
+- 非 TTY（CI 日志、重定向到文件）不输出原地刷新，改为每隔若干秒打印一行进度
+"""
+import queue
+import sys
+import threading
+import time
+from typing import IO, List, Optional
+
+# 输出级别
+QUIET = 0      # 只输出失败摘要（不含输出对比）与最终汇总
+NORMAL = 1     # 失败详情 + 进度
+VERBOSE = 2    # 另外输出每个 PASS 行
+
+
+class ProgressRenderer:
+    """进度渲染器；result() / message() 可在任意线程调用，不会阻塞在 stdout 上"""
+
+    def __init__(
+        self,
+        total: int,
+        verbosity: int = NORMAL,
+        stream: Optional[IO[str]] = None,
+        fps: float = 10.0,
+        plain_interval_s: float = 10.0,
+    ):
+        self.total = total
+        self.verbosity = verbosity
+        self.stream = stream or sys.stdout
+        self.tty = bool(getattr(self.stream, "isatty", lambda: False)())
+        self.frame_s = 1.0 / max(1.0, fps)
+        self.plain_interval_s = plain_interval_s
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.passed = 0
+        self.failed = 0
+        self._started = 0.0
+        self._line_shown = False
+
+    def start(self) -> "ProgressRenderer":
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._loop, name="progress-renderer", daemon=True)
+        self._thread.start()
+        return self
+
+    def result(self, passed: bool, lines: Optional[List[str]] = None) -> None:
+        """记录一个结果；lines 为需要打印的行（可为空）"""
+        self._queue.put((passed, lines or []))
+
+    def message(self, line: str) -> None:
+        self._queue.put((None, [line]))
+
+    def stop(self) -> None:
+        """输出剩余内容并结束渲染线程（清除进度行）"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _drain(self) -> List[str]:
+        lines: List[str] = []
+        while True:
+            try:
+                passed, item_lines = self._queue.get_nowait()
+            except queue.Empty:
+                return lines
+            if passed is True:
+                self.passed += 1
+            elif passed is False:
+                self.failed += 1
+            lines.extend(item_lines)
+
+    def _status(self) -> str:
+        done = self.passed + self.failed
+        elapsed = time.monotonic() - self._started
+        pct = done / self.total * 100 if self.total else 100.0
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = f", 剩余约 {(self.total - done) / rate:.0f}s" if rate > 0 and done < self.total else ""
+        return f"[INFO] 进度: {done}/{self.total} ({pct:.1f}%) 通过 {self.passed} 失败 {self.failed}, {rate:.1f} 个/s{eta}"
+
+    def _loop(self) -> None:
+        last_plain = time.monotonic()
+        while True:
+            stopping = self._stop.is_set()
+            lines = self._drain()
+            out: List[str] = []
+            if self._line_shown and (lines or stopping):
+                out.append("\r\033[K")
+                self._line_shown = False
+            out.extend(line + "\n" for line in lines)
+            if self.verbosity >= NORMAL and not stopping:
+                if self.tty:
+                    out.append("\r\033[K" + self._status())
+                    self._line_shown = True
+                elif time.monotonic() - last_plain >= self.plain_interval_s:
+                    out.append(self._status() + "\n")
+                    last_plain = time.monotonic()
+            if out:
+                self.stream.write("".join(out))
+                self.stream.flush()
+            if stopping:
+                return
+            time.sleep(self.frame_s)
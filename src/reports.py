@@ -0,0 +1,229 @@
+"""
+机器可读报告模块 - 随结果到达增量写出 JSON Lines 与 JUnit XML
+
+- JSON Lines：每个结果一行，写完即 flush；进程中途崩溃时已写出的行仍完整可用
+- JUnit XML：按（编译器实例, 测试库）分组为 testsuite；各组的 testcase 片段先缓存在内存中，
+  超过阈值时追加到临时文件（只在写入时打开），结束时拼接并原子替换目标文件
+- 失败用例的实际/期望输出写入 artifacts 目录，报告中只引用文件路径，不在内存中保留
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, IO, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from .history import case_key
+from .models import TestCase, TestResult, TestStatus
+from .ordering import case_library
+
+# JUnit 中按 <failure> 报告的状态；其余未通过状态按 <error> 报告
+_JUNIT_FAILURE = {TestStatus.FAILED}
+_MESSAGE_LIMIT = 2000
+# 每个 testsuite 在内存中缓存的片段字符数上限，超过后追加到临时文件
+_SUITE_BUFFER_CHARS = 64 * 1024
+
+
+def _safe_name(text: str) -> str:
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in text)
+
+
+def _stage_seconds(result: TestResult) -> float:
+    stages = result.stage_times_ms or {}
+    total = sum(stages.values()) if stages else (result.compile_time_ms or 0)
+    return total / 1000.0
+
+
+class ArtifactSpiller:
+    """把失败用例的完整输出写入文件，返回 {种类: 路径}"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def spill(self, compiler: str, key: str, result: TestResult) -> Dict[str, str]:
+        if result.passed:
+            return {}
+        outputs = (("actual", result.actual_output), ("expected", result.expected_output))
+        if all(text is None for _, text in outputs):
+            return {}
+        target = self.root / _safe_name(compiler)
+        target.mkdir(parents=True, exist_ok=True)
+        stem = _safe_name(key.replace("/", "__"))
+        paths: Dict[str, str] = {}
+        for kind, text in outputs:
+            if text is None:
+                continue
+            path = target / f"{stem}.{kind}.txt"
+            path.write_text(text, encoding="utf-8")
+            paths[kind] = str(path)
+        return paths
+
+
+class JsonlReport:
+    """JSON Lines 报告：每个结果一行"""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._file: IO[str] = open(path, "w", encoding="utf-8")
+
+    def add(self, compiler: str, key: str, library: str, result: TestResult, artifacts: Dict[str, str]) -> None:
+        record = {
+            "compiler": compiler,
+            "case": key,
+            "library": library,
+            "status": result.status.name,
+            "passed": result.passed,
+            "message": (result.message or "")[:_MESSAGE_LIMIT],
+            "cycle": result.cycle,
+            "cycle_breakdown": result.cycle_breakdown,
+            "compile_time_ms": result.compile_time_ms,
+            "stage_times_ms": result.stage_times_ms,
+            "stage_rss_kb": result.stage_rss_kb,
+            "timed_out": result.timed_out,
+            "artifacts": artifacts or None,
+            "timestamp": time.time(),
+        }
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+
+@dataclass
+class _JunitSuite:
+    """一个 testsuite 的计数与尚未写入临时文件的片段"""
+    fragment: Path
+    counts: List[int] = field(default_factory=lambda: [0, 0, 0, 0])  # tests, failures, errors, skipped
+    seconds: float = 0.0
+    buffer: List[str] = field(default_factory=list)
+    buffered_chars: int = 0
+    spilled: bool = False
+
+    def write(self, text: str) -> None:
+        self.buffer.append(text)
+        self.buffered_chars += len(text)
+        if self.buffered_chars > _SUITE_BUFFER_CHARS:
+            self.flush()
+
+    def flush(self) -> None:
+        """把缓存的片段追加到临时文件；文件只在写入期间打开，testsuite 再多也不会占满文件描述符"""
+        if not self.buffer:
+            return
+        with open(self.fragment, "a", encoding="utf-8") as f:
+            f.writelines(self.buffer)
+        self.buffer.clear()
+        self.buffered_chars = 0
+        self.spilled = True
+
+
+class JunitReport:
+    """JUnit XML 报告：testsuite 名为 `<编译器实例>.<测试库>`"""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._spill_dir = Path(tempfile.mkdtemp(prefix=".junit_", dir=str(path.parent)))
+        self._suites: Dict[Tuple[str, str], _JunitSuite] = {}
+
+    def add(self, compiler: str, key: str, library: str, result: TestResult, artifacts: Dict[str, str]) -> None:
+        suite = self._suites.get((compiler, library))
+        if suite is None:
+            suite = _JunitSuite(self._spill_dir / f"{len(self._suites)}.xml")
+            self._suites[(compiler, library)] = suite
+        counts = suite.counts
+        elapsed = _stage_seconds(result)
+        counts[0] += 1
+        suite.seconds += elapsed
+
+        name = key.split("/", 1)[1] if library and "/" in key else key
+        classname = f"{compiler}.{library or '.'}"
+        parts = [f"    <testcase classname={quoteattr(classname)} name={quoteattr(name)} time=\"{elapsed:.3f}\">"]
+        if result.status == TestStatus.SKIPPED:
+            counts[3] += 1
+            parts.append(f"<skipped message={quoteattr(result.message or '')}/>")
+        elif not result.passed:
+            tag = "failure" if result.status in _JUNIT_FAILURE else "error"
+            counts[1 if tag == "failure" else 2] += 1
+            message = f"{result.status.value} {result.message or ''}".strip()[:_MESSAGE_LIMIT]
+            detail = "\n".join(f"{kind}: {path}" for kind, path in artifacts.items())
+            parts.append(
+                f"<{tag} message={quoteattr(message)} type={quoteattr(result.status.name)}>{escape(detail)}</{tag}>"
+            )
+        if result.cycle is not None:
+            parts.append(f"<system-out>cycle={result.cycle}</system-out>")
+        parts.append("</testcase>\n")
+        suite.write("".join(parts))
+
+    def close(self) -> None:
+        if self._spill_dir is None:
+            return
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        totals = [0, 0, 0, 0]
+        for suite in self._suites.values():
+            totals = [a + b for a, b in zip(totals, suite.counts)]
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            out.write(
+                f'<testsuites tests="{totals[0]}" failures="{totals[1]}" errors="{totals[2]}" skipped="{totals[3]}">\n'
+            )
+            for (compiler, library), suite in sorted(self._suites.items()):
+                counts = suite.counts
+                suite_name = f"{compiler}.{library or '.'}"
+                out.write(
+                    f"  <testsuite name={quoteattr(suite_name)} tests=\"{counts[0]}\" "
+                    f"failures=\"{counts[1]}\" errors=\"{counts[2]}\" skipped=\"{counts[3]}\" time=\"{suite.seconds:.3f}\">\n"
+                )
+                if suite.spilled:
+                    with open(suite.fragment, encoding="utf-8") as fragment:
+                        shutil.copyfileobj(fragment, out)
+                out.writelines(suite.buffer)
+                out.write("  </testsuite>\n")
+            out.write("</testsuites>\n")
+        os.replace(tmp_path, self.path)
+        shutil.rmtree(self._spill_dir, ignore_errors=True)
+        self._spill_dir = None
+
+
+class StreamingReports:
+    """按命令行参数组合的报告输出；add() 在 test_multi 的回调（串行）中调用"""
+
+    def __init__(
+        self,
+        testcases_dir: Path,
+        jsonl_path: Optional[Path] = None,
+        junit_path: Optional[Path] = None,
+        artifacts_dir: Optional[Path] = None,
+    ):
+        self.testcases_dir = testcases_dir
+        self.writers: List = []
+        if jsonl_path:
+            self.writers.append(JsonlReport(jsonl_path))
+        if junit_path:
+            self.writers.append(JunitReport(junit_path))
+        first = jsonl_path or junit_path
+        if artifacts_dir is None and first is not None:
+            artifacts_dir = first.with_name(first.stem + "_artifacts")
+        self.spiller = ArtifactSpiller(artifacts_dir) if artifacts_dir else None
+
+    def __bool__(self) -> bool:
+        return bool(self.writers)
+
+    def add(self, compiler: str, case: TestCase, result: TestResult) -> None:
+        key = case_key(case, self.testcases_dir)
+        artifacts = self.spiller.spill(compiler, key, result) if self.spiller else {}
+        library = case_library(case)
+        for writer in self.writers:
+            writer.add(compiler, key, library, result, artifacts)
+
+    def close(self) -> None:
+        for writer in self.writers:
+            writer.close()
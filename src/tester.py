@@ -7,15 +7,29 @@ import json
 import os
 import hashlib
 from pathlib import Path
-from typing import Optional, Tuple, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, List
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+import heapq
 import threading
 import time
+from contextlib import contextmanager, nullcontext
 
+from .cds import TrainingRun, archive_flags, get_cds_cache
+from .commands import build_command, command_fingerprint, stage_jvm_options
+from .concurrency import ConcurrencyController
 from .config import get_config
 from .models import TestCase, TestResult, TestStatus
-from .utils import read_file_safe, compare_outputs
+from .monitor import RunMonitor
+from .process import ProcessResult, run_process
+from .utils import (
+    read_file_safe,
+    read_bytes_safe,
+    decode_bytes,
+    place_text_file,
+    compare_output_bytes,
+    compare_outputs,
+)
 
 
 SUPPORTED_LANGUAGES = {"java", "c", "cpp"}
@@ -35,12 +49,162 @@ class CompilerConfig:
 class TestTask:
     """测试任务
     
-    注意：worker_id 由 _get_thread_worker_id 动态分配，
-    确保每个线程有独立的工作目录，避免并行时文件冲突。
+    注意：worker_id 在任务执行期间从 WorkerSlotPool 租用，
+    确保同一时刻每个 worker 目录只被一个任务使用，避免并行时文件冲突。
     """
     case: TestCase
 
 
+class StageRecorder:
+    """记录单个用例各阶段的耗时、峰值 RSS 与超时情况"""
+
+    def __init__(self):
+        self.times_ms: Dict[str, int] = {}
+        self.rss_kb: Dict[str, int] = {}
+        self.timed_out = False
+
+    def record(self, stage: str, result: ProcessResult) -> None:
+        self.times_ms[stage] = result.wall_ms
+        if result.max_rss_kb is not None:
+            self.rss_kb[stage] = result.max_rss_kb
+
+    def record_timeout(self, stage: str, timeout_s: float) -> None:
+        self.times_ms[stage] = int(timeout_s * 1000)
+        self.timed_out = True
+
+    def apply(self, result: TestResult) -> TestResult:
+        result.stage_times_ms = dict(self.times_ms) or None
+        result.stage_rss_kb = dict(self.rss_kb) or None
+        result.timed_out = self.timed_out
+        return result
+
+
+class WorkerSlotPool:
+    """worker 槽位池。
+
+    每个任务执行前 acquire 一个空闲槽位（对应 worker_N 目录），结束后 release。
+    槽位按需创建，数量不超过 limit（<=0 表示不限制）；达到上限时 acquire 阻塞等待。
+    与线程无关，线程池复用/回收线程也不会让两个在途任务拿到同一个槽位。
+    """
+
+    def __init__(self, limit: int = 0):
+        self._cond = threading.Condition()
+        self._free: List[int] = []
+        self._in_use: set = set()
+        self._created = 0
+        self._limit = max(0, int(limit or 0))
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def in_use(self) -> int:
+        with self._cond:
+            return len(self._in_use)
+
+    def set_limit(self, limit: int) -> None:
+        """调整并发上限（只影响后续新建槽位；已创建的槽位可继续复用）"""
+        with self._cond:
+            self._limit = max(0, int(limit or 0))
+            self._cond.notify_all()
+
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._free and (self._limit <= 0 or len(self._in_use) < self._limit):
+                    slot = heapq.heappop(self._free)
+                    break
+                if self._limit <= 0 or self._created < self._limit:
+                    slot = self._created
+                    self._created += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("等待空闲 worker 槽位超时")
+                self._cond.wait(remaining)
+            self._in_use.add(slot)
+            return slot
+
+    def release(self, slot: int) -> None:
+        with self._cond:
+            if slot not in self._in_use:
+                raise RuntimeError(f"worker 槽位 {slot} 未被租用")
+            self._in_use.remove(slot)
+            heapq.heappush(self._free, slot)
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self):
+        slot = self.acquire()
+        try:
+            yield slot
+        finally:
+            self.release(slot)
+
+
+def run_reference(
+    source_file: Path,
+    input_file: Optional[Path],
+    work_dir: Path,
+    recorder: Optional[StageRecorder] = None,
+) -> Tuple[Optional[bytes], str]:
+    """使用 g++ 编译运行（c_header + 源码）获取期望输出；返回 (stdout, 错误信息)"""
+    config = get_config()
+    tmp_src = work_dir / "tmp_test.c"
+    tmp_exe = work_dir / "tmp_test.exe"
+    
+    full_code = config.c_header.encode("utf-8") + read_bytes_safe(source_file)
+    
+    gcc = config.tools.get_gcc()
+    stage = "gcc_compile"
+    
+    try:
+        work_dir.mkdir(parents=True, exist_ok=True)
+        tmp_src.write_bytes(full_code)
+        
+        # 编译
+        compile_result = run_process(
+            [gcc, str(tmp_src), "-o", str(tmp_exe)],
+            timeout=config.timeout.gcc_compile
+        )
+        if recorder:
+            recorder.record(stage, compile_result)
+        
+        if compile_result.returncode != 0:
+            error_msg = decode_bytes(compile_result.stderr or compile_result.stdout) or "(无错误信息)"
+            return None, f"g++编译失败:\n{error_msg}"
+        
+        # 运行
+        input_data = read_bytes_safe(input_file)
+        
+        stage = "gcc_run"
+        run_result = run_process([str(tmp_exe)], input=input_data, timeout=config.timeout.gcc_run)
+        if recorder:
+            recorder.record(stage, run_result)
+        
+        return run_result.stdout, ""
+        
+    except subprocess.TimeoutExpired:
+        if recorder:
+            timeout = config.timeout.gcc_compile if stage == "gcc_compile" else config.timeout.gcc_run
+            recorder.record_timeout(stage, timeout)
+        return None, "g++执行超时"
+    except FileNotFoundError:
+        return None, f"找不到{gcc}，请确保已安装或在config.yaml中配置路径"
+    except Exception as e:
+        return None, str(e)
+    finally:
+        # 清理临时文件
+        for f in [tmp_src, tmp_exe]:
+            if f.exists():
+                try:
+                    f.unlink()
+                except:
+                    pass
+
+
 class CompilerTester:
     """编译器测试器 - 支持多线程和多语言"""
 
@@ -65,43 +229,37 @@ class CompilerTester:
         # 主工作目录（为多编译器实例隔离）
         safe_instance_name = "".join(ch if ch.isalnum() or ch in "._-" else "_" for ch in self.instance_name)
         instance_key = hashlib.md5(f"{safe_instance_name}|{self.project_dir}".encode("utf-8")).hexdigest()[:10]
-        self.work_dir = self.test_dir / ".tmp" / "compilers" / f"{safe_instance_name}_{instance_key}"
+        instance_dir_name = f"{safe_instance_name}_{instance_key}"
+        self.work_dir = self.test_dir / ".tmp" / "compilers" / instance_dir_name
         self.work_dir.mkdir(parents=True, exist_ok=True)
 
+        # worker 目录根（可放到内存盘；编译产物仍保存在 work_dir）
+        # preferred_worker_root 为配置解析出的根，worker_root 为当前使用的根（空间不足时回退到 work_dir）
+        self.preferred_worker_root = self._resolve_worker_root(instance_dir_name)
+        self.worker_root = self.preferred_worker_root
+        self._space_checked_at = 0.0
+
         self.compiler_jar = self.work_dir / "Compiler.jar"  # Java
         self.compiler_exe = self.work_dir / ("Compiler.exe" if os.name == "nt" else "Compiler")  # C/C++
         
-        # 线程本地存储
-        self._local = threading.local()
-        # 线程 -> worker_id 映射，避免并行线程复用同一 worker 目录导致互相覆盖
-        self._worker_id_lock = threading.Lock()
-        self._thread_worker_ids = {}
-        self._next_worker_id = 0
+        # worker 槽位池：每个任务执行期间独占一个 worker 目录
+        self.worker_slots = WorkerSlotPool()
+        # 运行监控（由 test_multi 在运行期间设置），记录各阶段的忙碌数
+        self.monitor: Optional[RunMonitor] = None
+        # jar -> 本次运行使用的 AppCDS 归档（None 表示不使用）；由 prepare_jvm_archives 解析，编译后失效
+        self._cds_archives: Dict[Path, Optional[Path]] = {}
 
-    def _get_thread_worker_id(self, max_workers: int) -> int:
-        """为当前线程分配一个稳定的 worker_id（0..max_workers-1）。
-        
-        每个线程首次调用时分配一个唯一 ID，后续调用返回相同 ID。
-        这确保了同一线程始终使用同一个工作目录，避免并行时文件冲突。
-        
-        注意：依赖 ThreadPoolExecutor 的线程数不超过 max_workers 的假设。
-        """
-        tid = threading.get_ident()
-        cached = self._thread_worker_ids.get(tid)
-        if cached is not None:
-            return cached
-        with self._worker_id_lock:
-            cached = self._thread_worker_ids.get(tid)
-            if cached is not None:
-                return cached
-            worker_id = self._next_worker_id
-            self._next_worker_id = (self._next_worker_id + 1) % max_workers
-            self._thread_worker_ids[tid] = worker_id
-            return worker_id
-
-    def allocate_worker_id(self, max_workers: int) -> int:
-        """为当前线程分配 worker_id（用于多编译器/全局线程池场景）。"""
-        return self._get_thread_worker_id(max_workers)
+    def _activity(self, stage: str):
+        return self.monitor.stage(stage) if self.monitor else nullcontext()
+
+    def test_case(self, case: TestCase) -> TestResult:
+        """租用一个空闲 worker 槽位运行单个用例（多线程/全局线程池场景）"""
+        with self._activity("wait"):
+            worker_id = self.worker_slots.acquire()
+        try:
+            return self.test(case.testfile, case.input_file, case.expected_output_file, worker_id)
+        finally:
+            self.worker_slots.release(worker_id)
     
     def _load_compiler_config(self) -> CompilerConfig:
         """从编译器项目读取config.json"""
@@ -143,10 +301,78 @@ class CompilerTester:
     def get_compiler_language(self) -> str:
         """获取编译器语言"""
         return self.compiler_config.language
+
+    def artifact_hash(self) -> str:
+        """编译器版本标识：项目源码（含 config.json / CMakeLists.txt）的内容哈希。
+
+        jar/exe 每次打包的时间戳不同，按源码计算才能在多次运行之间识别同一版本。
+        """
+        h = hashlib.sha256()
+        suffixes = {".java", ".c", ".cc", ".cpp", ".h", ".hpp", ".json", ".txt"}
+        files = [
+            p for p in self.project_dir.rglob("*")
+            if p.is_file() and p.suffix.lower() in suffixes and "build" not in p.relative_to(self.project_dir).parts
+        ]
+        for path in sorted(files):
+            h.update(path.relative_to(self.project_dir).as_posix().encode("utf-8"))
+            h.update(b"\0")
+            h.update(path.read_bytes())
+        return h.hexdigest()[:16]
     
+    def _has_free_space(self, path: Path) -> bool:
+        """检查 path 所在文件系统的剩余空间是否满足 work_root_min_free_mb"""
+        try:
+            min_free = max(0, int(self.config.work_root_min_free_mb or 0)) * 1024 * 1024
+            return shutil.disk_usage(path).free >= min_free
+        except (OSError, ValueError, TypeError):
+            return False
+
+    def _resolve_worker_root(self, instance_dir_name: str) -> Path:
+        """解析 worker 目录根。
+
+        - work_root 为空：使用 work_dir（.tmp/compilers/<实例>）
+        - work_root 为 "auto"：优先 /dev/shm，不存在或空间不足时回退
+        - 其他：视为路径（相对路径基于测试框架目录）
+        """
+        raw = (self.config.work_root or "").strip()
+        if not raw:
+            return self.work_dir
+
+        if raw.lower() == "auto":
+            base = Path("/dev/shm")
+            if not base.is_dir():
+                return self.work_dir
+        else:
+            base = Path(raw)
+            if not base.is_absolute():
+                base = (self.test_dir / base).resolve()
+
+        if not self._has_free_space(base):
+            print(f"work_root 空间不足或不可用: {base}，回退到 {self.work_dir}")
+            return self.work_dir
+
+        root = base / "sysytest" / instance_dir_name
+        try:
+            root.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            print(f"创建 work_root 失败: {e}，回退到 {self.work_dir}")
+            return self.work_dir
+        return root
+
+    # 运行中检查 work_root 剩余空间的最小间隔（秒）
+    SPACE_CHECK_INTERVAL_S = 5.0
+
     def _get_worker_dir(self, worker_id: int) -> Path:
         """获取工作线程的独立目录"""
-        worker_dir = self.work_dir / f"worker_{worker_id}"
+        worker_root = self.worker_root
+        if worker_root != self.work_dir:
+            now = time.monotonic()
+            if now - self._space_checked_at >= self.SPACE_CHECK_INTERVAL_S:
+                self._space_checked_at = now
+                if not self._has_free_space(worker_root):
+                    # 运行中内存盘空间不足：后续用例回退到持久化目录（已有目录由 cleanup_workers 清理）
+                    self.worker_root = worker_root = self.work_dir
+        worker_dir = worker_root / f"worker_{worker_id}"
         worker_dir.mkdir(parents=True, exist_ok=True)
         return worker_dir
     
@@ -156,6 +382,7 @@ class CompilerTester:
         if lang not in SUPPORTED_LANGUAGES:
             return False, f"不支持的编程语言: {lang}，仅支持: {', '.join(SUPPORTED_LANGUAGES)}"
         
+        self._cds_archives.clear()
         if lang == "java":
             return self.compile_java_project()
         elif lang in ("c", "cpp"):
@@ -482,15 +709,107 @@ class CompilerTester:
         except Exception as e:
             return False, str(e)
 
-    def _run_compiler(self, source_file: Path, worker_dir: Path) -> Tuple[bool, str]:
+    def _cds_cache(self):
+        cds_dir = Path(self.config.jvm.cds_dir)
+        if not cds_dir.is_absolute():
+            cds_dir = self.test_dir / cds_dir
+        return get_cds_cache(cds_dir)
+
+    def _jvm_options(self, stage: str, jar: Path) -> List[str]:
+        """某阶段的 JVM 参数：公共/阶段参数，以及已生成的 AppCDS 归档"""
+        options = stage_jvm_options(self.config, stage)
+        if self.config.jvm.cds:
+            archive = self._cds_archive(jar)
+            if archive is not None:
+                options += archive_flags(archive)
+        return options
+
+    def _cds_archive(self, jar: Path) -> Optional[Path]:
+        """本次运行 jar 使用的归档；每个 jar 只查询一次缓存（避免每个阶段都 stat jar、读 stamp）"""
+        if jar not in self._cds_archives:
+            self._cds_archives[jar] = self._cds_cache().lookup(self.config.tools.get_java(), jar)
+        return self._cds_archives[jar]
+
+    def _stage_cmd(self, stage: str, worker_dir: Path) -> List[str]:
+        """按 config.yaml 的命令模板构造 compile / mars 阶段的命令"""
+        jar = self.compiler_jar if stage == "compile" else self.mars_jar
+        template = self.config.commands.template(stage, self.compiler_config.language)
+        return build_command(
+            template,
+            jvm_options=self._jvm_options(stage, jar),
+            java=self.config.tools.get_java(),
+            jar=str(jar),
+            exe=str(self.compiler_exe),
+            mips=str(worker_dir / "mips.txt"),
+        )
+
+    def command_fingerprint(self) -> str:
+        """当前语言下影响运行结果的命令配置指纹（用于结果缓存/历史记录的键）"""
+        return command_fingerprint(self.config, self.compiler_config.language)
+
+    def prepare_jvm_archives(self, cases: List[TestCase]) -> List[str]:
+        """为 Compiler.jar（Java 项目）与 Mars.jar 准备 AppCDS 归档。
+
+        已缓存（jar 哈希与 JDK 版本均未变化）时直接返回；否则取前几个非 compile-only 用例
+        作为训练运行生成归档。返回需要展示的信息列表。
+        """
+        jvm = self.config.jvm
+        self._cds_archives.clear()
+        if not jvm.cds or not self._is_compiler_ready():
+            return []
+        cache = self._cds_cache()
+        java = self.config.tools.get_java()
+        jars = [self.mars_jar]
+        if self.compiler_config.language == "java":
+            jars.insert(0, self.compiler_jar)
+        pending = [jar for jar in jars if jar.exists() and cache.needs_build(java, jar)]
+        if not pending:
+            return []
+
+        samples = [c for c in cases if not self._is_compile_only_case(c.testfile)]
+        samples = samples[:max(1, jvm.cds_training_cases)]
+        messages = []
+        with self.worker_slots.lease() as worker_id:
+            worker_dir = self._get_worker_dir(worker_id)
+            train_dirs = []
+            compiler_runs: List[TrainingRun] = []
+            mars_runs: List[TrainingRun] = []
+            try:
+                for i, case in enumerate(samples):
+                    train_dir = worker_dir / f"cds_train_{i}"
+                    train_dir.mkdir(parents=True, exist_ok=True)
+                    train_dirs.append(train_dir)
+                    # 先正常编译一次，得到训练 Mars 所需的 mips.txt
+                    ok, _ = self._run_compiler(case.testfile, train_dir)
+                    compiler_runs.append(TrainingRun([], train_dir))
+                    if ok:
+                        mars_runs.append(TrainingRun(
+                            ["nc", str(train_dir / "mips.txt")], train_dir, read_bytes_safe(case.input_file)
+                        ))
+
+                for jar in pending:
+                    if jar == self.mars_jar:
+                        runs, timeout = mars_runs, self.config.timeout.mars
+                    else:
+                        runs, timeout = compiler_runs, self.config.timeout.compile
+                    archive, msg = cache.ensure(java, jar, runs, timeout)
+                    self._cds_archives[jar] = archive
+                    if msg:
+                        messages.append(f"[CDS] {jar.name}: {msg}")
+            finally:
+                for train_dir in train_dirs:
+                    shutil.rmtree(train_dir, ignore_errors=True)
+        return messages
+
+    def _run_compiler(
+        self, source_file: Path, worker_dir: Path, recorder: Optional["StageRecorder"] = None
+    ) -> Tuple[bool, str]:
         """运行编译器生成MIPS代码"""
         testfile_path = worker_dir / "testfile.txt"
         mips_path = worker_dir / "mips.txt"
         
-        # 写入 testfile.txt
-        content = read_file_safe(source_file)
-        with open(testfile_path, "w", encoding="utf-8", newline="\n") as f:
-            f.write(content)
+        # 放置 testfile.txt（无需转码时直接拷贝）
+        place_text_file(source_file, testfile_path)
         
         # 清理旧的 mips.txt
         if mips_path.exists():
@@ -498,28 +817,27 @@ class CompilerTester:
         
         # 根据语言选择运行方式
         lang = self.compiler_config.language
-        tools = self.config.tools
         
         if lang == "java":
             if not self.compiler_jar.exists():
                 return False, "Compiler.jar不存在，请先编译项目"
-            cmd = [tools.get_java(), "-jar", str(self.compiler_jar)]
         else:  # c/cpp
             if not self.compiler_exe.exists():
                 return False, "Compiler.exe不存在，请先编译项目"
-            cmd = [str(self.compiler_exe)]
         
         try:
-            result = subprocess.run(
-                cmd, capture_output=True, text=True, errors="replace",
-                timeout=self.config.timeout.compile, cwd=str(worker_dir)
-            )
+            cmd = self._stage_cmd("compile", worker_dir)
+            result = run_process(cmd, timeout=self.config.timeout.compile, cwd=str(worker_dir))
+            if recorder:
+                recorder.record("compile", result)
             if result.returncode != 0:
-                return False, f"编译器错误:\n{result.stderr}\n{result.stdout}"
+                return False, f"编译器错误:\n{decode_bytes(result.stderr)}\n{decode_bytes(result.stdout)}"
             if not mips_path.exists():
                 return False, "编译器未生成mips.txt"
             return True, ""
         except subprocess.TimeoutExpired:
+            if recorder:
+                recorder.record_timeout("compile", self.config.timeout.compile)
             return False, "编译超时"
         except Exception as e:
             return False, str(e)
@@ -570,79 +888,34 @@ class CompilerTester:
 
         return int(final_cycle), breakdown
      
-    def _run_mars(self, input_file: Optional[Path], worker_dir: Path) -> Tuple[Optional[str], str]:
-        """运行Mars模拟器"""
-        mips_path = worker_dir / "mips.txt"
-        tools = self.config.tools
-        cmd = [tools.get_java(), "-jar", str(self.mars_jar), "nc", str(mips_path)]
-        
-        input_data = ""
-        if input_file and input_file.exists():
-            input_data = read_file_safe(input_file)
+    def _run_mars(
+        self, input_file: Optional[Path], worker_dir: Path, recorder: Optional["StageRecorder"] = None
+    ) -> Tuple[Optional[bytes], str]:
+        """运行Mars模拟器（返回原始 stdout 字节，仅在需要展示时解码）"""
+        input_data = read_bytes_safe(input_file)
         
         try:
-            result = subprocess.run(
-                cmd, input=input_data, capture_output=True, text=True, errors="replace",
-                timeout=self.config.timeout.mars, cwd=str(worker_dir)
-            )
+            cmd = self._stage_cmd("mars", worker_dir)
+            result = run_process(cmd, input=input_data, timeout=self.config.timeout.mars, cwd=str(worker_dir))
+            if recorder:
+                recorder.record("mars", result)
             return result.stdout, ""
         except subprocess.TimeoutExpired:
+            if recorder:
+                recorder.record_timeout("mars", self.config.timeout.mars)
             return None, "Mars执行超时"
         except Exception as e:
             return None, str(e)
     
-    def _run_gcc(self, source_file: Path, input_file: Optional[Path], worker_dir: Path) -> Tuple[Optional[str], str]:
+    def _run_gcc(
+        self,
+        source_file: Path,
+        input_file: Optional[Path],
+        worker_dir: Path,
+        recorder: Optional["StageRecorder"] = None,
+    ) -> Tuple[Optional[bytes], str]:
         """使用g++编译运行获取期望结果"""
-        tmp_src = worker_dir / "tmp_test.c"
-        tmp_exe = worker_dir / "tmp_test.exe"
-        
-        source_code = read_file_safe(source_file)
-        full_code = self.config.c_header + source_code
-        
-        tools = self.config.tools
-        gcc = tools.get_gcc()
-        
-        try:
-            with open(tmp_src, "w", encoding="utf-8", newline="\n") as f:
-                f.write(full_code)
-            
-            # 编译
-            compile_result = subprocess.run(
-                [gcc, str(tmp_src), "-o", str(tmp_exe)],
-                capture_output=True, text=True, errors="replace",
-                timeout=self.config.timeout.gcc_compile
-            )
-            
-            if compile_result.returncode != 0:
-                error_msg = compile_result.stderr or compile_result.stdout or "(无错误信息)"
-                return None, f"g++编译失败:\n{error_msg}"
-            
-            # 运行
-            input_data = ""
-            if input_file and input_file.exists():
-                input_data = read_file_safe(input_file)
-            
-            run_result = subprocess.run(
-                [str(tmp_exe)], input=input_data, capture_output=True, text=True, errors="replace",
-                timeout=self.config.timeout.gcc_run
-            )
-            
-            return run_result.stdout, ""
-            
-        except subprocess.TimeoutExpired:
-            return None, "g++执行超时"
-        except FileNotFoundError:
-            return None, f"找不到{gcc}，请确保已安装或在config.yaml中配置路径"
-        except Exception as e:
-            return None, str(e)
-        finally:
-            # 清理临时文件
-            for f in [tmp_src, tmp_exe]:
-                if f.exists():
-                    try:
-                        f.unlink()
-                    except:
-                        pass
+        return run_reference(source_file, input_file, worker_dir, recorder)
 
     def _is_compiler_ready(self) -> bool:
         """检查编译器是否已编译"""
@@ -682,146 +955,206 @@ class CompilerTester:
         
         # 获取工作目录
         worker_dir = self._get_worker_dir(worker_id)
+        recorder = StageRecorder()
+        
+        # 1-2. 编译并运行Mars
+        mars_out, partial = self._compile_and_simulate(
+            testfile, input_file, worker_dir, recorder, compile_only=self._is_compile_only_case(testfile)
+        )
+        if mars_out is None:
+            return partial
         
-        # 1. 编译
+        # 3. 获取期望结果（优先 ans.txt）
+        expected_out: Optional[bytes] = None
+        expected_err: str = ""
+        if expected_output_file and expected_output_file.exists():
+            expected_out = read_bytes_safe(expected_output_file)
+        else:
+            with self._activity("gcc"):
+                expected_out, expected_err = self._run_gcc(testfile, input_file, worker_dir, recorder)
+
+        if expected_out is None:
+            return recorder.apply(replace(partial, status=TestStatus.SKIPPED, message=f"获取期望输出失败: {expected_err}"))
+        
+        # 4. 比较结果
+        return self._judge(mars_out, expected_out, partial, recorder)
+    
+    def _compile_and_simulate(
+        self,
+        testfile: Path,
+        input_file: Optional[Path],
+        worker_dir: Path,
+        recorder: StageRecorder,
+        compile_only: bool = False,
+    ) -> Tuple[Optional[bytes], TestResult]:
+        """编译并运行 Mars，返回 (Mars 输出, 结果)。
+
+        Mars 输出为 None 时结果即最终结果（编译错误 / compile-only / Mars 运行失败）；
+        否则结果只带有编译耗时与 cycle，由调用方比较输出后得到最终状态
+        """
         compile_start = time.monotonic()
-        success, msg = self._run_compiler(testfile, worker_dir)
+        with self._activity("compile"):
+            success, msg = self._run_compiler(testfile, worker_dir, recorder)
         compile_time_ms = int((time.monotonic() - compile_start) * 1000)
         if not success:
-            return TestResult(TestStatus.COMPILE_ERROR, msg, compile_time_ms=compile_time_ms)
-
-        if self._is_compile_only_case(testfile):
-            return TestResult(TestStatus.PASSED, "compile-only", compile_time_ms=compile_time_ms)
+            return None, recorder.apply(TestResult(TestStatus.COMPILE_ERROR, msg, compile_time_ms=compile_time_ms))
+        if compile_only:
+            return None, recorder.apply(TestResult(TestStatus.PASSED, "compile-only", compile_time_ms=compile_time_ms))
 
         # 清理旧的统计文件，避免误读上一次结果
         stats_path = worker_dir / "InstructionStatistics.txt"
         if stats_path.exists():
             stats_path.unlink()
         
-        # 2. 运行Mars
-        mars_out, mars_err = self._run_mars(input_file, worker_dir)
+        with self._activity("mars"):
+            mars_out, mars_err = self._run_mars(input_file, worker_dir, recorder)
         cycle, cycle_breakdown = self._read_instruction_statistics(worker_dir)
+        partial = TestResult(
+            TestStatus.PASSED, compile_time_ms=compile_time_ms, cycle=cycle, cycle_breakdown=cycle_breakdown
+        )
         if mars_out is None:
-            return TestResult(
-                TestStatus.RUNTIME_ERROR,
-                f"Mars运行失败: {mars_err}",
-                compile_time_ms=compile_time_ms,
-                cycle=cycle,
-                cycle_breakdown=cycle_breakdown,
+            return None, recorder.apply(
+                replace(partial, status=TestStatus.RUNTIME_ERROR, message=f"Mars运行失败: {mars_err}")
             )
-        
-        # 3. 获取期望结果（优先 ans.txt）
-        expected_out: Optional[str] = None
-        expected_err: str = ""
-        if expected_output_file and expected_output_file.exists():
-            expected_out = read_file_safe(expected_output_file)
-        else:
-            expected_out, expected_err = self._run_gcc(testfile, input_file, worker_dir)
+        return mars_out, partial
+    
+    def _judge(
+        self,
+        mars_out: bytes,
+        expected_out: bytes,
+        partial: TestResult,
+        recorder: StageRecorder,
+    ) -> TestResult:
+        """比较 Mars 输出与期望输出（先按字节比较；不一致时再解码比较，兼容两侧编码不同的情况）
 
-        if expected_out is None:
-            return TestResult(
-                TestStatus.SKIPPED,
-                f"获取期望输出失败: {expected_err}",
-                compile_time_ms=compile_time_ms,
-                cycle=cycle,
-                cycle_breakdown=cycle_breakdown,
-            )
-        
-        # 4. 比较结果
-        if compare_outputs(mars_out, expected_out):
-            return TestResult(
-                TestStatus.PASSED,
-                compile_time_ms=compile_time_ms,
-                cycle=cycle,
-                cycle_breakdown=cycle_breakdown,
-            )
+        partial 为 _compile_and_simulate 返回的结果（编译耗时与 cycle）
+        """
+        if compare_output_bytes(mars_out, expected_out):
+            return recorder.apply(partial)
+        actual_text = decode_bytes(mars_out)
+        expected_text = decode_bytes(expected_out)
+        if compare_outputs(actual_text, expected_text):
+            return recorder.apply(partial)
         else:
-            return TestResult(
-                TestStatus.FAILED, "输出不匹配",
-                actual_output=mars_out, expected_output=expected_out,
-                compile_time_ms=compile_time_ms,
-                cycle=cycle,
-                cycle_breakdown=cycle_breakdown,
+            return recorder.apply(replace(
+                partial, status=TestStatus.FAILED, message="输出不匹配",
+                actual_output=actual_text, expected_output=expected_text,
+            ))
+    
+    def run_source(
+        self,
+        testfile: Path,
+        input_file: Optional[Path] = None,
+        expected_out: Optional[bytes] = None,
+        executor: Optional[Executor] = None,
+    ) -> TestResult:
+        """即时运行单个源文件（编辑器使用）：被测编译器（编译 + Mars）与 g++ 参考输出并发执行。
+        
+        expected_out 不为空时直接作为期望输出，不再运行 g++；executor 为空时 g++ 在最后顺序执行。
+        """
+        if not self._is_compiler_ready():
+            return TestResult(TestStatus.SKIPPED, "请先编译项目")
+        
+        def reference() -> Tuple[Optional[bytes], str]:
+            with self.worker_slots.lease() as ref_id:
+                return run_reference(testfile, input_file, self._get_worker_dir(ref_id))
+        
+        pending: Optional[Future] = None
+        if expected_out is None and executor is not None:
+            pending = executor.submit(reference)
+        
+        recorder = StageRecorder()
+        with self.worker_slots.lease() as worker_id:
+            mars_out, partial = self._compile_and_simulate(
+                testfile, input_file, self._get_worker_dir(worker_id), recorder
             )
+        if mars_out is None:
+            return partial
+        
+        expected_err = ""
+        if expected_out is None:
+            expected_out, expected_err = pending.result() if pending is not None else reference()
+        if expected_out is None:
+            return recorder.apply(replace(partial, status=TestStatus.SKIPPED, message=f"获取期望输出失败: {expected_err}"))
+        return self._judge(mars_out, expected_out, partial, recorder)
     
     def test_parallel(
         self,
         cases: List[TestCase],
         max_workers: int = 4,
         callback=None,
-        ramp_up_time: float = 5.0,
-        ramp_up_threshold: int = 64
+        adaptive: bool = False,
     ) -> List[Tuple[TestCase, TestResult]]:
         """
         并行测试多个用例
         
         Args:
             cases: 测试用例列表
-            max_workers: 最大并行数
+            max_workers: 最大并行数（adaptive=True 时作为初始并发的参考）
             callback: 回调函数 callback(case, result, progress)
-            ramp_up_time: 渐进启动总时间（秒）
-            ramp_up_threshold: 测试用例数量阈值，低于此值立即全部启动
+            adaptive: 是否按 CPU/内存/观测到的 RSS 自动调节并发（AIMD）
         
         Returns:
             [(case, result), ...]
         """
-        import time
-        
         if not self._is_compiler_ready():
             return [(c, TestResult(TestStatus.SKIPPED, "请先编译项目")) for c in cases]
         
         results = []
         total = len(cases)
         completed = 0
-        lock = threading.Lock()
         
-        def run_test(task: TestTask) -> Tuple[TestCase, TestResult]:
-            # worker_id 由线程动态分配，确保每个线程有独立工作目录
-            worker_id = self._get_thread_worker_id(max_workers)
-            result = self.test(
-                task.case.testfile,
-                task.case.input_file,
-                task.case.expected_output_file,
-                worker_id,
-            )
-            return task.case, result
+        self.prepare_jvm_archives(cases)
         
-        tasks = [TestTask(case) for case in cases]
+        # 并发由控制器决定：固定并发，或从较低并发起步按吞吐量逐步爬升（取代固定时长的渐进启动）
+        controller = ConcurrencyController.create(max_workers, adaptive=adaptive)
+        self.worker_slots.set_limit(controller.max_limit)
         
-        # 决定是否渐进启动
-        use_ramp_up = total >= ramp_up_threshold
+        def run_test(task: TestTask) -> Tuple[TestCase, TestResult]:
+            # 每个任务租用独立的 worker 目录，结束后归还
+            return task.case, self.test_case(task.case)
+        
+        tasks = iter([TestTask(case) for case in cases])
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {}
+        with ThreadPoolExecutor(max_workers=controller.max_limit) as executor:
+            in_flight = set()
             
-            if use_ramp_up:
-                # 渐进式启动：在 ramp_up_time 秒内均匀提交所有任务
-                interval = ramp_up_time / total if total > 0 else 0
-                for i, task in enumerate(tasks):
-                    futures[executor.submit(run_test, task)] = task
-                    if i < total - 1:  # 最后一个不需要等待
-                        time.sleep(interval)
-            else:
-                # 立即全部启动
-                futures = {executor.submit(run_test, task): task for task in tasks}
+            def fill():
+                while len(in_flight) < controller.limit:
+                    task = next(tasks, None)
+                    if task is None:
+                        return
+                    in_flight.add(executor.submit(run_test, task))
             
-            for future in as_completed(futures):
-                case, result = future.result()
-                with lock:
+            fill()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.discard(future)
+                    case, result = future.result()
                     results.append((case, result))
                     completed += 1
-                
-                if callback:
-                    callback(case, result, completed / total * 100)
+                    controller.on_result(result)
+                    
+                    if callback:
+                        callback(case, result, completed / total * 100)
+                fill()
         
         return results
     
     def cleanup_workers(self):
         """清理所有工作目录"""
-        if self.work_dir.exists():
-            for item in self.work_dir.iterdir():
+        for root in {self.work_dir, self.preferred_worker_root, self.worker_root}:
+            if not root.exists():
+                continue
+            for item in root.iterdir():
                 if item.is_dir() and item.name.startswith("worker_"):
                     try:
                         shutil.rmtree(item)
                     except:
                         pass
+        # 内存盘等外部根下的实例目录（<work_root>/sysytest/<实例>）一并删除，下次运行时重新创建
+        if self.preferred_worker_root != self.work_dir:
+            shutil.rmtree(self.preferred_worker_root, ignore_errors=True)
+        self.worker_root = self.preferred_worker_root
+        self._space_checked_at = 0.0
@@ -1,26 +1,100 @@
 """
 工具函数模块
 """
+import os
+import shutil
 from pathlib import Path
 from typing import Optional
 
 
-def read_file_safe(filepath: Path) -> str:
-    """安全读取文件，自动处理编码和换行符"""
-    if not filepath.exists():
-        return ""
-    
-    for encoding in ['utf-8', 'gbk', 'gb2312', 'latin-1']:
+_CANDIDATE_ENCODINGS = ('utf-8', 'gbk', 'gb2312', 'latin-1')
+
+
+def decode_bytes(data: bytes) -> str:
+    """在同一块缓冲区上依次尝试候选编码解码，并统一换行符"""
+    for encoding in _CANDIDATE_ENCODINGS:
         try:
-            content = filepath.read_bytes().decode(encoding)
+            content = data.decode(encoding)
             return content.replace('\r\n', '\n').replace('\r', '\n')
         except (UnicodeDecodeError, LookupError):
             continue
-    
-    content = filepath.read_bytes().decode('utf-8', errors='ignore')
+
+    content = data.decode('utf-8', errors='ignore')
     return content.replace('\r\n', '\n').replace('\r', '\n')
 
 
+def read_file_safe(filepath: Path) -> str:
+    """安全读取文件，自动处理编码和换行符（只读取一次）"""
+    if not filepath.exists():
+        return ""
+    return decode_bytes(filepath.read_bytes())
+
+
+def normalize_text_bytes(data: bytes) -> bytes:
+    """将任意编码的文本字节转换为 UTF-8 + LF 换行。
+
+    已经是 UTF-8 且不含 CR 的内容原样返回（不做解码/重编码）。
+    """
+    if b'\r' not in data:
+        try:
+            data.decode('utf-8')
+            return data
+        except UnicodeDecodeError:
+            pass
+    return decode_bytes(data).encode('utf-8')
+
+
+def read_bytes_safe(filepath: Optional[Path]) -> bytes:
+    """读取文本文件为 UTF-8 + LF 字节；文件不存在时返回空字节串"""
+    if filepath is None or not filepath.exists():
+        return b""
+    return normalize_text_bytes(filepath.read_bytes())
+
+
+def _copy_file_fast(src: Path, dst: Path) -> None:
+    """优先使用 copy_file_range（内核态拷贝），不可用时回退到 shutil.copyfile"""
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is not None:
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+                if remaining == 0:
+                    return
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+
+
+def place_text_file(src: Path, dst: Path) -> None:
+    """把文本文件放到 dst（UTF-8 + LF）。
+
+    - 内容无需转换时：copy_file_range / 普通拷贝
+      （不用硬链接：被测编译器可能改写 testfile.txt，硬链接会连带改坏测试库中的源文件）
+    - 需要转换编码或换行符时：读取一次并写入转换后的字节
+    """
+    data = src.read_bytes()
+    normalized = normalize_text_bytes(data)
+
+    try:
+        dst.unlink()
+    except FileNotFoundError:
+        pass
+
+    if normalized is data:
+        try:
+            _copy_file_fast(src, dst)
+            return
+        except OSError:
+            pass
+
+    dst.write_bytes(normalized)
+
+
 def normalize_output(output: Optional[str]) -> str:
     """标准化输出用于比较"""
     if output is None:
@@ -32,6 +106,22 @@ def normalize_output(output: Optional[str]) -> str:
     return '\n'.join(lines)
 
 
+def normalize_output_bytes(output: Optional[bytes]) -> bytes:
+    """normalize_output 的字节版本（热路径上避免解码）"""
+    if output is None:
+        return b""
+    lines = output.replace(b'\r\n', b'\n').replace(b'\r', b'\n').split(b'\n')
+    lines = [line.rstrip() for line in lines]
+    while lines and lines[-1] == b'':
+        lines.pop()
+    return b'\n'.join(lines)
+
+
 def compare_outputs(actual: str, expected: str) -> bool:
     """比较两个输出是否相同"""
     return normalize_output(actual) == normalize_output(expected)
+
+
+def compare_output_bytes(actual: bytes, expected: bytes) -> bool:
+    """比较两个字节输出是否相同"""
+    return normalize_output_bytes(actual) == normalize_output_bytes(expected)
@@ -0,0 +1,53 @@
+"""src/agent/context.py 的上下文压缩"""
+from src.agent.context import compact_messages, estimate_tokens
+
+
+def _tool_round(step: int):
+    """一次 generate_testfile + run_compiler 调用及其结果"""
+    assistant = {"role": "assistant", "content": [
+        {"type": "text", "text": f"第 {step} 次修改：" + "根据编译器输出调整代码。" * 60},
+        {"type": "tool_use", "id": f"g{step}", "name": "generate_testfile",
+         "input": {"content": "int main(){return 0;}\n" * 40}},
+        {"type": "tool_use", "id": f"r{step}", "name": "run_compiler", "input": {}},
+    ]}
+    results = {"role": "user", "content": [
+        {"type": "tool_result", "tool_use_id": f"g{step}", "content": "✓ 已生成 testfile.txt"},
+        {"type": "tool_result", "tool_use_id": f"r{step}", "content": "【Mars 输出】\n" + "12345\n" * 800},
+    ]}
+    return [assistant, results]
+
+
+def _assert_well_formed(messages):
+    assert messages[0]["role"] == "user"
+    for prev, cur in zip(messages, messages[1:]):
+        assert prev["role"] != cur["role"]
+    for i, message in enumerate(messages):
+        if message["role"] != "assistant":
+            continue
+        uses = {b["id"] for b in message["content"] if b.get("type") == "tool_use"}
+        if uses and i + 1 < len(messages):
+            results = {b["tool_use_id"] for b in messages[i + 1]["content"] if b.get("type") == "tool_result"}
+            assert uses == results
+
+
+def test_single_prompt_session_stays_within_budget():
+    budget = 24000
+    messages = [{"role": "user", "content": "生成一个测试递归函数的用例"}]
+    sizes = []
+    for step in range(60):
+        messages.extend(_tool_round(step))
+        messages, _dropped = compact_messages(messages, budget)
+        sizes.append(sum(estimate_tokens(m) for m in messages))
+        _assert_well_formed(messages)
+    assert max(sizes) <= budget
+    # 最新一次工具调用与最新版 testfile 保留
+    assert messages[-1]["content"][-1]["tool_use_id"] == "r59"
+    assert "int main" in messages[-2]["content"][1]["input"]["content"]
+    assert messages[0]["content"].endswith("生成一个测试递归函数的用例")
+
+
+def test_under_budget_is_unchanged():
+    messages = [{"role": "user", "content": "你好"}, {"role": "assistant", "content": [{"type": "text", "text": "好"}]}]
+    compacted, dropped = compact_messages(messages, 24000)
+    assert dropped == 0
+    assert compacted == messages